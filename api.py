@@ -1,15 +1,43 @@
-from flask import Flask, jsonify, render_template
+from flask import Flask, Response, jsonify, render_template, request
 from flask_cors import CORS
+import gzip
+import hashlib
 import json
 import os
-import re
+import queue
 from datetime import datetime
+from log_reader import LogIndex, read_lines_after, tail_lines
+from stream import StatsBroadcaster, STREAM_LOG_LINES
+from timeseries import TimeSeriesReader
+from stats_segment import StatsSegmentReader
+from latency import LatencyReader, LATENCY_METRICS, PERCENTILES
+from deadletter import DeadLetterReader
+from profiling import ProfileReader
+from monitor import BOTTLENECK_BLOCKED_RATIO
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 CORS(app)
 
 STATS_FILE = "stats.json"
+STATS_SEGMENT_FILE = "stats.seg"
 LOG_FILE = "system.log"
+HISTORY_FILE = "history.bin"
+LATENCY_FILE = "latency.bin"
+DEAD_LETTER_FILE = "deadletter.bin"
+PROFILE_FILE = "profile.bin"
+MAX_LOG_LINES = 1000
+STREAM_INTERVAL = 0.5
+STREAM_KEEPALIVE = 15.0
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+STATS_SECTIONS = ("metadata", "statistics", "producers", "consumers", "last_update")
+
+_log_index = LogIndex(LOG_FILE)
+_history_reader = TimeSeriesReader(HISTORY_FILE)
+_stats_segment = StatsSegmentReader(STATS_SEGMENT_FILE)
+_latency_reader = LatencyReader(LATENCY_FILE)
+_dead_letter_reader = DeadLetterReader(DEAD_LETTER_FILE)
+_profile_reader = ProfileReader(PROFILE_FILE)
 
 _stats_cache = {
     "metadata": {},
@@ -18,9 +46,95 @@ _stats_cache = {
     "consumers": [],
     "last_update": None
 }
+_response_cache = {}
+
+def stats_from_segment(segment):
+    produced = segment["produced"]
+    consumed = segment["consumed"]
+    return {
+        "metadata": {
+            "total_time_seconds": round(segment["updated_at"] - segment["start_time"], 2),
+            "start_time": datetime.fromtimestamp(segment["start_time"]).isoformat(),
+            "end_time": datetime.fromtimestamp(segment["updated_at"]).isoformat()
+        },
+        "statistics": {
+            "total_produced": produced,
+            "total_consumed": consumed,
+            "average_throughput_per_sec": round(segment["average_throughput"], 2),
+            "efficiency_percent": round((consumed / produced * 100) if produced > 0 else 0, 2),
+            "queue_size": segment["queue_size"],
+            "current": {
+                "throughput_per_sec": segment["current_throughput"],
+                "consume_rate_per_sec": segment["consume_rate"],
+                "lag_trend_per_sec": segment["lag_trend"]
+            },
+            "priorities": [
+                {
+                    "priority": level,
+                    "depth": segment[f"priority_{level}_depth"],
+                    "avg_wait_ms": segment[f"priority_{level}_wait_ms"]
+                }
+                for level in range(segment["priority_levels"])
+            ],
+            "shards": [
+                {
+                    "consumer_id": shard,
+                    "depth": segment[f"shard_{shard}_depth"],
+                    "routed": segment[f"shard_{shard}_routed"],
+                    "stolen": segment[f"shard_{shard}_stolen"],
+                    "service_time_ms": segment[f"shard_{shard}_service_ms"]
+                }
+                for shard in range(1, segment["shard_count"] + 1)
+            ],
+            "autoscaling": {
+                "active_consumers": segment["active_consumers"],
+                "scale_ups": segment["scale_ups"],
+                "scale_downs": segment["scale_downs"]
+            },
+            "latency": {
+                metric: {f"p{percent}_ms": segment[f"latency_{metric}_p{percent}_ms"] for percent in PERCENTILES}
+                for metric in LATENCY_METRICS
+            },
+            "durability": {
+                "pending": segment["wal_pending"],
+                "segments": segment["wal_segments"],
+                "replayed": segment["wal_replayed"],
+                "syncs": segment["wal_syncs"],
+                "avg_commit_ms": segment["wal_commit_ms"],
+                "avg_sync_batch": segment["wal_sync_batch"]
+            },
+            "replay": {"avg_drift_ms": segment["replay_drift_ms"]},
+            "pacing": {
+                "blocked_ratio": segment["producer_blocked_ratio"],
+                "bottleneck": "consumers" if segment["producer_blocked_ratio"] >= BOTTLENECK_BLOCKED_RATIO else "producers",
+                "spilled": segment["spilled"]
+            },
+            "buffers": {
+                "produced_dropped": segment["produced_dropped"],
+                "consumed_dropped": segment["consumed_dropped"],
+                "log_dropped": segment["log_dropped"]
+            },
+            "shed": segment["shed"],
+            "defective": segment["defective"],
+            "dead_lettered": segment["dead_lettered"],
+            "accepted": segment["accepted"],
+            "rejected": segment["rejected"],
+            "in_flight": segment["in_flight"]
+        },
+        "producers": [],
+        "consumers": []
+    }
 
 def read_stats_file():
     global _stats_cache
+    try:
+        segment = _stats_segment.read()
+        if segment:
+            _stats_cache = stats_from_segment(segment)
+            _stats_cache["last_update"] = datetime.now().isoformat()
+            return _stats_cache
+    except Exception:
+        pass
     try:
         if os.path.exists(STATS_FILE):
             with open(STATS_FILE, 'r', encoding='utf-8') as f:
@@ -32,87 +146,224 @@ def read_stats_file():
         pass
     return _stats_cache
 
-def read_log_file(lines=50):
+def read_log_file(lines=50, after=None):
     try:
         if os.path.exists(LOG_FILE):
-            with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                all_lines = f.readlines()
-                return [line.rstrip() for line in all_lines[-lines:]]
+            if after is not None:
+                result = read_lines_after(LOG_FILE, after, lines)
+                if result is not None:
+                    return result[0], result[1], False
+            log_lines, offset = tail_lines(LOG_FILE, lines)
+            return log_lines, offset, after is not None
     except Exception:
         pass
-    return []
+    return [], 0, bool(after)
 
-def parse_producers_and_consumers_from_logs():
-    producers = {}
-    consumers = {}
-    
+def refresh_log_index():
     try:
-        if os.path.exists(LOG_FILE):
-            with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                for line in f:
-                    prod_match = re.search(r'PRODUCENT (\d+).*Wyprodukowano: (\d+)', line)
-                    if prod_match:
-                        pid = int(prod_match.group(1))
-                        item = int(prod_match.group(2))
-                        if pid not in producers:
-                            producers[pid] = []
-                        producers[pid].append(item)
-                    
-                    cons_match = re.search(r'KONSUMENT (\d+).*Przetwarzam: (\d+)', line)
-                    if cons_match:
-                        cid = int(cons_match.group(1))
-                        item = int(cons_match.group(2))
-                        if cid not in consumers:
-                            consumers[cid] = []
-                        consumers[cid].append(item)
+        _log_index.refresh()
     except Exception:
         pass
-    
-    return producers, consumers
 
-@app.route('/api/stats', methods=['GET'])
-def get_stats():
+def parse_producers_and_consumers_from_logs():
+    refresh_log_index()
+    return _log_index.snapshot()
+
+def stats_version():
+    version = _stats_segment.version()
+    if version is not None:
+        return version
+    try:
+        stat = os.stat(STATS_FILE)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+def parse_fields(raw):
+    if not raw:
+        return STATS_SECTIONS
+    requested = {field.strip() for field in raw.split(',')}
+    return tuple(section for section in STATS_SECTIONS if section in requested)
+
+def worker_list(workers, summary):
+    result = []
+    for worker_id in sorted(workers.keys()):
+        if summary:
+            result.append({"id": worker_id, "count": workers[worker_id]})
+        else:
+            items = workers[worker_id]
+            result.append({"id": worker_id, "count": len(items), "items": items})
+    return result
+
+def cached_response(key, version, build):
+    entry = _response_cache.get(key)
+    if entry is None or entry["version"] != version:
+        body = app.json.dumps(build()).encode('utf-8')
+        entry = {
+            "version": version,
+            "etag": hashlib.sha1(body).hexdigest(),
+            "body": body,
+            "gzip": gzip.compress(body, GZIP_LEVEL) if len(body) >= GZIP_MIN_BYTES else None
+        }
+        _response_cache[key] = entry
+
+    compressed = entry["gzip"] is not None and request.accept_encodings["gzip"] > 0
+    etag = f"{entry['etag']}-gzip" if compressed else entry["etag"]
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry["gzip"] if compressed else entry["body"], mimetype='application/json')
+        if compressed:
+            response.headers["Content-Encoding"] = "gzip"
+    response.set_etag(etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def build_stream_state():
     stats = read_stats_file()
     producers, consumers = parse_producers_and_consumers_from_logs()
-    
-    producers_list = []
-    for pid in sorted(producers.keys()):
-        items = producers[pid]
-        producers_list.append({
-            "id": pid,
-            "count": len(items),
-            "items": items
-        })
-    
-    consumers_list = []
-    for cid in sorted(consumers.keys()):
-        items = consumers[cid]
-        consumers_list.append({
-            "id": cid,
-            "count": len(items),
-            "items": items
-        })
-    
-    stats["producers"] = producers_list
-    stats["consumers"] = consumers_list
-    
-    return jsonify(stats)
+    return {
+        "metadata": stats.get("metadata", {}),
+        "statistics": stats.get("statistics", {}),
+        "producers": producers,
+        "consumers": consumers
+    }
+
+def read_stream_logs(after):
+    return read_log_file(STREAM_LOG_LINES, after)
+
+_broadcaster = StatsBroadcaster(build_stream_state, read_stream_logs, interval=STREAM_INTERVAL)
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    fields = parse_fields(request.args.get('fields'))
+    summary = request.args.get('summary', '').lower() in ('1', 'true', 'yes')
+    with_workers = "producers" in fields or "consumers" in fields
+    if with_workers:
+        refresh_log_index()
+
+    def build():
+        stats = read_stats_file()
+        if with_workers:
+            producers, consumers = _log_index.counts() if summary else _log_index.snapshot()
+            stats["producers"] = worker_list(producers, summary)
+            stats["consumers"] = worker_list(consumers, summary)
+        return {section: stats.get(section) for section in fields}
+
+    version = (stats_version(), _log_index.version() if with_workers else None)
+    return cached_response(("stats", fields, summary), version, build)
+
+@app.route('/api/stats/history', methods=['GET'])
+def get_stats_history():
+    start = request.args.get('from', type=float)
+    end = request.args.get('to', type=float)
+    resolution = request.args.get('resolution', type=int)
+    try:
+        history = _history_reader.query(start, end, resolution)
+    except Exception:
+        history = None
+    if history is None:
+        return jsonify({"resolution_seconds": None, "samples": []})
+    return jsonify(history)
+
+@app.route('/api/stats/latency', methods=['GET'])
+def get_stats_latency():
+    try:
+        latency = _latency_reader.breakdown()
+    except Exception:
+        latency = None
+    if latency is None:
+        return jsonify({"overall": {}, "consumers": [], "producers": []})
+    return jsonify(latency)
+
+@app.route('/api/deadletter', methods=['GET'])
+def get_dead_letter():
+    producer_id = request.args.get('producer', type=int)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_LOG_LINES)
+    try:
+        lanes = _dead_letter_reader.lane_stats()
+        items = _dead_letter_reader.inspect(producer_id, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if lanes is None:
+        return jsonify({"producers": [], "items": []})
+    return jsonify({"producers": lanes, "items": items})
+
+@app.route('/api/deadletter/drain', methods=['POST'])
+def drain_dead_letter():
+    producer_id = request.args.get('producer', type=int)
+    limit = request.args.get('limit', type=int)
+    try:
+        items = _dead_letter_reader.drain(producer_id, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if items is None:
+        return jsonify({"drained": 0, "items": []})
+    return jsonify({"drained": len(items), "items": items})
+
+@app.route('/api/profile', methods=['GET'])
+def get_profile():
+    profile = _profile_reader.breakdown()
+    if profile is None:
+        return jsonify({"mode": "off", "generation": 0, "workers": []})
+    return jsonify(profile)
+
+@app.route('/api/profile', methods=['POST'])
+def set_profile():
+    body = request.get_json(silent=True) or {}
+    mode = request.args.get('mode') or body.get('mode', 'off')
+    try:
+        control = _profile_reader.set_mode(mode)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if control is None:
+        return jsonify({"error": "System nie jest uruchomiony"}), 409
+    return jsonify(control)
 
 @app.route('/api/stats/live', methods=['GET'])
 def get_live_stats():
-    stats = read_stats_file()
-    return jsonify({
-        "produced": stats.get("statistics", {}).get("total_produced", 0),
-        "consumed": stats.get("statistics", {}).get("total_consumed", 0),
-        "efficiency": stats.get("statistics", {}).get("efficiency_percent", 0),
-        "throughput": stats.get("statistics", {}).get("average_throughput_per_sec", 0),
-        "timestamp": datetime.now().isoformat()
-    })
+    def build():
+        stats = read_stats_file()
+        return {
+            "produced": stats.get("statistics", {}).get("total_produced", 0),
+            "consumed": stats.get("statistics", {}).get("total_consumed", 0),
+            "efficiency": stats.get("statistics", {}).get("efficiency_percent", 0),
+            "throughput": stats.get("statistics", {}).get("average_throughput_per_sec", 0),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    return cached_response(("live",), stats_version(), build)
 
 @app.route('/api/logs', methods=['GET'])
 def get_logs():
-    lines = read_log_file(100)
-    return jsonify({"logs": lines})
+    lines = min(max(request.args.get('lines', 100, type=int), 1), MAX_LOG_LINES)
+    after = request.args.get('after', type=int)
+    log_lines, offset, reset = read_log_file(lines, after)
+    return jsonify({"logs": log_lines, "offset": offset, "reset": reset})
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    subscription = _broadcaster.subscribe()
+
+    def events():
+        try:
+            while True:
+                try:
+                    message = subscription.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            _broadcaster.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
 @app.route('/api/health', methods=['GET'])
 def health():
@@ -0,0 +1,55 @@
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict
+
+
+class ConsumerAutoscaler:
+
+    def __init__(self,
+                 min_consumers: int,
+                 max_consumers: int,
+                 cooldown: float = 3.0,
+                 up_queue_size: int = 25,
+                 up_lag_trend: float = 1.0,
+                 down_utilization: float = 0.3,
+                 history_size: int = 100):
+        self.min_consumers = min_consumers
+        self.max_consumers = max_consumers
+        self.cooldown = cooldown
+        self.up_queue_size = up_queue_size
+        self.up_lag_trend = up_lag_trend
+        self.down_utilization = down_utilization
+        self.last_scale_time = 0.0
+        self.events: deque = deque(maxlen=history_size)
+
+    def decide(self, active_consumers: int, signals: Dict[str, float], now: float) -> tuple[int, str]:
+        if now - self.last_scale_time < self.cooldown:
+            return 0, ""
+
+        queue_size = signals["queue_size"]
+        lag_trend = signals["lag_trend_per_sec"]
+        utilization = signals["utilization"]
+
+        if active_consumers < self.min_consumers:
+            return 1, "poniżej minimum"
+        if active_consumers < self.max_consumers:
+            if queue_size >= self.up_queue_size:
+                return 1, f"kolejka {queue_size}"
+            if lag_trend >= self.up_lag_trend:
+                return 1, f"opóźnienie rośnie {lag_trend}/s"
+        if (active_consumers > self.min_consumers and queue_size == 0
+                and lag_trend <= 0 and utilization < self.down_utilization):
+            return -1, f"wykorzystanie {utilization * 100:.0f}%"
+        return 0, ""
+
+    def record(self, direction: int, consumer_id: int, active_consumers: int, reason: str, now: float) -> Dict[str, Any]:
+        self.last_scale_time = now
+        event = {
+            "timestamp": datetime.fromtimestamp(now).isoformat(),
+            "action": "scale_up" if direction > 0 else "scale_down",
+            "consumer_id": consumer_id,
+            "active_consumers": active_consumers,
+            "reason": reason
+        }
+        self.events.append(event)
+        return event
@@ -0,0 +1,155 @@
+import asyncio
+import concurrent.futures
+import os
+import queue
+import threading
+from multiprocessing import Event, Process, Queue
+from typing import Any, Optional
+
+from consumer import AsyncConsumer, Consumer
+from producer import AsyncProducer, Producer
+
+BACKENDS = ("process", "thread", "asyncio")
+
+
+class WorkerThread(threading.Thread):
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.native_id
+
+    def terminate(self) -> None:
+        pass
+
+
+class TaskHandle:
+
+    def __init__(self, future: concurrent.futures.Future, name: str):
+        self.future = future
+        self.name = name
+        self.pid = os.getpid()
+
+    def is_alive(self) -> bool:
+        return not self.future.done()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        concurrent.futures.wait([self.future], timeout=timeout)
+
+    def terminate(self) -> None:
+        self.future.cancel()
+
+
+class AsyncQueueBridge:
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def _run(self, coroutine: Any) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    async def _put_nowait(self, entry: Any) -> None:
+        self.queue.put_nowait(entry)
+
+    async def _get_nowait(self) -> Any:
+        return self.queue.get_nowait()
+
+    def put(self, entry: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        try:
+            if block:
+                self._run(asyncio.wait_for(self.queue.put(entry), timeout))
+            else:
+                self._run(self._put_nowait(entry))
+        except (asyncio.TimeoutError, asyncio.QueueFull):
+            raise queue.Full
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        try:
+            if block:
+                return self._run(asyncio.wait_for(self.queue.get(), timeout))
+            return self._run(self._get_nowait())
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            raise queue.Empty
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    def empty(self) -> bool:
+        return self.queue.empty()
+
+
+class ProcessBackend:
+    name = "process"
+    shares_memory = False
+    producer_class = Producer
+    consumer_class = Consumer
+
+    def create_queue(self, maxsize: int) -> Any:
+        return Queue(maxsize=maxsize)
+
+    def create_event(self) -> Any:
+        return Event()
+
+    def worker_queue(self, transport: Any) -> Any:
+        return transport
+
+    def start(self, worker: Any, name: str) -> Process:
+        process = Process(target=worker.run, name=name)
+        process.start()
+        return process
+
+    def close(self) -> None:
+        pass
+
+
+class ThreadBackend(ProcessBackend):
+    name = "thread"
+    shares_memory = True
+
+    def create_queue(self, maxsize: int) -> Any:
+        return queue.Queue(maxsize=maxsize)
+
+    def create_event(self) -> Any:
+        return threading.Event()
+
+    def start(self, worker: Any, name: str) -> WorkerThread:
+        thread = WorkerThread(target=worker.run, name=name, daemon=True)
+        thread.start()
+        return thread
+
+
+class AsyncioBackend(ThreadBackend):
+    name = "asyncio"
+    producer_class = AsyncProducer
+    consumer_class = AsyncConsumer
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="asyncio", daemon=True)
+        self._thread.start()
+
+    def create_queue(self, maxsize: int) -> AsyncQueueBridge:
+        return AsyncQueueBridge(self.loop, maxsize)
+
+    def worker_queue(self, transport: Any) -> Any:
+        if isinstance(transport, AsyncQueueBridge):
+            return transport.queue
+        raise ValueError("Backend asyncio obsługuje tylko wspólną kolejkę (DISPATCH_MODE='shared', bez kolejek priorytetowych i transportu ring)")
+
+    def start(self, worker: Any, name: str) -> TaskHandle:
+        return TaskHandle(asyncio.run_coroutine_threadsafe(worker.run(), self.loop), name)
+
+    def close(self) -> None:
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+
+def create_backend(name: str) -> ProcessBackend:
+    if name == "process":
+        return ProcessBackend()
+    if name == "thread":
+        return ThreadBackend()
+    if name == "asyncio":
+        return AsyncioBackend()
+    raise ValueError(f"Nieznany backend wykonania: {name} (dostępne: {', '.join(BACKENDS)})")
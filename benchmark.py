@@ -0,0 +1,217 @@
+import argparse
+import ast
+import itertools
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+DEFAULT_THRESHOLD = 0.1
+CASE_TIMEOUT = 600
+
+
+def parse_int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def parse_override(value: str) -> tuple[str, Any]:
+    name, _, raw = value.partition("=")
+    if not name or not raw:
+        raise argparse.ArgumentTypeError(f"Niepoprawne nadpisanie: {value} (oczekiwano KLUCZ=WARTOŚĆ)")
+    try:
+        return name.strip(), ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        return name.strip(), raw
+
+
+def case_key(case: Dict[str, Any]) -> str:
+    return f"p{case['producers']}-c{case['consumers']}-q{case['queue_size']}-n{case['items']}"
+
+
+def build_cases(args: argparse.Namespace) -> list[Dict[str, Any]]:
+    cases = []
+    for producers, consumers, queue_size, items in itertools.product(
+            args.producers, args.consumers, args.queue_sizes, args.items):
+        cases.append({
+            "producers": producers,
+            "consumers": consumers,
+            "queue_size": queue_size,
+            "items": items,
+            "producer_sleep": args.producer_sleep,
+            "consumer_sleep": args.consumer_sleep,
+            "overrides": dict(args.overrides)
+        })
+    return cases
+
+
+def apply_case(case: Dict[str, Any]) -> None:
+    import config
+
+    config.PRODUCERS_COUNT = case["producers"]
+    config.CONSUMERS_COUNT = case["consumers"]
+    config.QUEUE_SIZE = case["queue_size"]
+    config.ITEMS_PER_PRODUCER = case["items"]
+    config.LOG_TO_FILE = False
+    config.LOG_TO_CONSOLE = False
+    config.EXPORT_STATS = False
+    if case["producer_sleep"] is not None:
+        config.PRODUCER_SLEEP_MIN = config.PRODUCER_SLEEP_MAX = case["producer_sleep"]
+    if case["consumer_sleep"] is not None:
+        slots = max(case["consumers"], config.AUTOSCALE_MAX_CONSUMERS)
+        config.CONSUMER_SPEEDS = {cid: (case["consumer_sleep"], case["consumer_sleep"]) for cid in range(1, slots + 1)}
+    for name, value in case["overrides"].items():
+        if not hasattr(config, name):
+            raise ValueError(f"Nieznany parametr konfiguracji: {name}")
+        setattr(config, name, value)
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    apply_case(case)
+    from main import ProducerConsumerSystem
+
+    system = ProducerConsumerSystem()
+    started = time.perf_counter()
+    try:
+        system.start()
+    finally:
+        elapsed = time.perf_counter() - started
+        system.close()
+        if system.manager:
+            system.manager.shutdown()
+
+    counts = system.completion.counts()
+    latency = system.latency.histogram("end_to_end").summary()
+    queue_wait = system.latency.histogram("queue_wait").summary()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    processed = counts["accepted"] + counts["rejected"]
+    return {
+        "produced": counts["produced"],
+        "processed": processed,
+        "in_flight": counts["in_flight"],
+        "wall_seconds": round(elapsed, 4),
+        "items_per_sec": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_p50_ms": latency["p50_ms"],
+        "latency_p95_ms": latency["p95_ms"],
+        "latency_p99_ms": latency["p99_ms"],
+        "queue_wait_p99_ms": queue_wait["p99_ms"],
+        "cpu_seconds": round(own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime, 4),
+        "peak_rss_kb": max(own.ru_maxrss, children.ru_maxrss)
+    }
+
+
+def spawn_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir:
+        result_file = os.path.join(workdir, "result.json")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_dir, os.environ.get("PYTHONPATH")])))
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case), "--case-output", result_file],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=CASE_TIMEOUT
+        )
+        if completed.returncode != 0 or not os.path.exists(result_file):
+            raise RuntimeError(f"Przypadek {case_key(case)} zakończył się błędem:\n{completed.stderr.strip()}")
+        with open(result_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def run_suite(cases: list[Dict[str, Any]], repeat: int) -> list[Dict[str, Any]]:
+    results = []
+    for case in cases:
+        runs = [spawn_case(case) for _ in range(repeat)]
+        median = sorted(runs, key=lambda run: run["items_per_sec"])[len(runs) // 2]
+        result = {"key": case_key(case), "case": case, **median}
+        if repeat > 1:
+            result["items_per_sec_runs"] = [run["items_per_sec"] for run in runs]
+            result["items_per_sec_stdev"] = round(statistics.pstdev(result["items_per_sec_runs"]), 2)
+        results.append(result)
+        print(
+            f"{result['key']:<24} {result['items_per_sec']:>10.1f} el/s  "
+            f"p50 {result['latency_p50_ms']:>8.2f} ms  p95 {result['latency_p95_ms']:>8.2f} ms  "
+            f"p99 {result['latency_p99_ms']:>8.2f} ms  CPU {result['cpu_seconds']:>6.2f} s  "
+            f"RSS {result['peak_rss_kb'] / 1024:>6.1f} MB",
+            flush=True
+        )
+    return results
+
+
+def compare(results: list[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> list[str]:
+    baseline_results = {result["key"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        reference = baseline_results.get(result["key"])
+        if reference is None:
+            continue
+        if result["items_per_sec"] < reference["items_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{result['key']}: przepustowość {result['items_per_sec']} el/s < {reference['items_per_sec']} el/s"
+            )
+        for metric in ("latency_p50_ms", "latency_p95_ms", "latency_p99_ms"):
+            if reference[metric] > 0 and result[metric] > reference[metric] * (1 + threshold):
+                regressions.append(f"{result['key']}: {metric} {result[metric]} > {reference[metric]}")
+    return regressions
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark przepustowości i opóźnień systemu producent-konsument")
+    parser.add_argument("--producers", type=parse_int_list, default=[3])
+    parser.add_argument("--consumers", type=parse_int_list, default=[5])
+    parser.add_argument("--queue-sizes", type=parse_int_list, default=[50])
+    parser.add_argument("--items", type=parse_int_list, default=[200])
+    parser.add_argument("--producer-sleep", type=float, default=None)
+    parser.add_argument("--consumer-sleep", type=float, default=None)
+    parser.add_argument("--set", dest="overrides", type=parse_override, action="append", default=[])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", default=None)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--run-case", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--case-output", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+
+    if args.run_case:
+        result = run_case(json.loads(args.run_case))
+        with open(args.case_output, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    results = run_suite(build_cases(args), max(args.repeat, 1))
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "results": results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wyniki zapisano do {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Wykryto regresje (próg {args.threshold * 100:.0f}%):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"Brak regresji względem {args.compare} (próg {args.threshold * 100:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
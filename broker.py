@@ -0,0 +1,698 @@
+import argparse
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from logger import get_logger
+
+FRAME_HELLO = 1
+FRAME_CREDIT = 2
+FRAME_PUT = 3
+FRAME_DELIVER = 4
+FRAME_STOP = 5
+FRAME_REPORT = 6
+FRAME_BYE = 7
+FRAME_BYE_ACK = 8
+FRAME_RETURN = 9
+
+BROKER_POLL_INTERVAL = 0.05
+BYE_TIMEOUT = 10.0
+
+_FRAME = struct.Struct("<IB")
+_ENTRY = struct.Struct("<Bq?dq")
+_CREDIT = struct.Struct("<I")
+_MESSAGE = struct.Struct("<I?")
+
+
+def pack_entries(entries: list[tuple]) -> bytes:
+    return b"".join(_ENTRY.pack(*entry) for entry in entries)
+
+
+def unpack_entries(payload: bytes) -> list[tuple]:
+    return [_ENTRY.unpack_from(payload, offset) for offset in range(0, len(payload), _ENTRY.size)]
+
+
+def message_size(message: Any) -> int:
+    return len(message) if isinstance(message, list) else 1
+
+
+def pack_messages(messages: list) -> bytes:
+    parts = []
+    for message in messages:
+        entries = message if isinstance(message, list) else [message]
+        parts.append(_MESSAGE.pack(len(entries), isinstance(message, list)))
+        parts.append(pack_entries(entries))
+    return b"".join(parts)
+
+
+def unpack_messages(payload: bytes) -> list:
+    messages = []
+    offset = 0
+    while offset < len(payload):
+        count, is_batch = _MESSAGE.unpack_from(payload, offset)
+        offset += _MESSAGE.size
+        entries = unpack_entries(payload[offset:offset + count * _ENTRY.size])
+        offset += count * _ENTRY.size
+        messages.append(entries if is_batch else entries[0])
+    return messages
+
+
+def split_message(message: Any, budget: int) -> tuple[Any, Any]:
+    if isinstance(message, list) and len(message) > budget:
+        return message[:budget], message[budget:]
+    return message, None
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class FrameSocket:
+
+    def __init__(self, sock: socket.socket):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self._reader = sock.makefile('rb')
+        self._send_lock = threading.Lock()
+
+    def send(self, kind: int, payload: bytes = b"") -> None:
+        with self._send_lock:
+            self.sock.sendall(_FRAME.pack(len(payload), kind) + payload)
+
+    def receive(self) -> Optional[tuple[int, bytes]]:
+        try:
+            header = self._reader.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                return None
+            length, kind = _FRAME.unpack(header)
+            payload = self._reader.read(length) if length else b""
+        except (OSError, ValueError):
+            return None
+        if len(payload) < length:
+            return None
+        return kind, payload
+
+    def close(self) -> None:
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._reader.close()
+        self.sock.close()
+
+
+class ConsumerSession:
+
+    def __init__(self):
+        self.credits = 0
+        self.granted = False
+        self.closing = False
+        self.returned = False
+        self.carry: Any = None
+        self.outstanding: deque = deque()
+        self.cond = threading.Condition()
+
+    def acknowledge(self, count: int) -> None:
+        while self.outstanding and message_size(self.outstanding[0]) <= count:
+            count -= message_size(self.outstanding.popleft())
+
+    def unacknowledged(self) -> list:
+        messages = [] if self.returned else list(self.outstanding)
+        if self.carry is not None:
+            messages.append(self.carry)
+        self.outstanding.clear()
+        self.carry = None
+        return messages
+
+
+class BrokerServer:
+
+    def __init__(self,
+                 host: str,
+                 port: int,
+                 producer_queue: Callable[[int], Any],
+                 consumer_queue: Callable[[int], Any],
+                 requeue: Callable[[tuple], None],
+                 producer_counters: Any,
+                 consumer_counters: Any,
+                 produced_items: Any,
+                 consumed_items: Any,
+                 latency: Any = None,
+                 completion: Any = None,
+                 credit_window: int = 32,
+                 wire_batch: int = 64):
+        self.producer_queue = producer_queue
+        self.consumer_queue = consumer_queue
+        self.requeue = requeue
+        self.producer_counters = producer_counters
+        self.consumer_counters = consumer_counters
+        self.produced_items = produced_items
+        self.consumed_items = consumed_items
+        self.latency = latency
+        self.completion = completion
+        self.credit_window = credit_window
+        self.wire_batch = wire_batch
+        self.logger = get_logger()
+        self._server = socket.create_server((host, port))
+        self.host = host
+        self.port = self._server.getsockname()[1]
+        self._connections: set[FrameSocket] = set()
+        self._connections_lock = threading.Lock()
+        self._consumers_stopping = threading.Event()
+        self._finished_producers: set[int] = set()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._accept_loop, name="broker", daemon=True)
+        self._thread.start()
+
+    def _accept_loop(self) -> None:
+        while not self._closed.is_set():
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock: socket.socket) -> None:
+        conn = FrameSocket(sock)
+        with self._connections_lock:
+            self._connections.add(conn)
+        try:
+            frame = conn.receive()
+            if frame is None or frame[0] != FRAME_HELLO:
+                return
+            hello = json.loads(frame[1])
+            role, worker_id = hello["role"], int(hello["id"])
+            self.logger.info("BROKER", f"Połączono {role} {worker_id}")
+            if role == "producer":
+                self._serve_producer(conn, worker_id)
+            elif role == "consumer":
+                self._serve_consumer(conn, worker_id)
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning("BROKER", f"Błąd połączenia: {e}")
+        finally:
+            with self._connections_lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    def _apply_report(self, role: str, worker_id: int, payload: bytes) -> None:
+        report = json.loads(payload)
+        counters = self.producer_counters if role == "producer" else self.consumer_counters
+        items = self.produced_items if role == "producer" else self.consumed_items
+        worker_items = items[worker_id]
+        for item in report.get("items", []):
+            worker_items.append(item)
+        if self.latency:
+            for metric, consumer_id, producer_id, seconds in report.get("latency", []):
+                self.latency.record(metric, consumer_id, producer_id, seconds)
+        slot = counters.slot(worker_id)
+        for field, amount in report.get("counters", {}).items():
+            slot.add(field, amount)
+        if role == "consumer" and self.completion:
+            self.completion.check()
+
+    def _serve_producer(self, conn: FrameSocket, producer_id: int) -> None:
+        target = self.producer_queue(producer_id)
+        self.producer_counters.slot(producer_id)
+        conn.send(FRAME_CREDIT, _CREDIT.pack(self.credit_window))
+        while True:
+            frame = conn.receive()
+            if frame is None:
+                return
+            kind, payload = frame
+            if kind == FRAME_PUT:
+                messages = unpack_messages(payload)
+                for message in messages:
+                    target.put(message)
+                conn.send(FRAME_CREDIT, _CREDIT.pack(sum(message_size(message) for message in messages)))
+            elif kind == FRAME_REPORT:
+                self._apply_report("producer", producer_id, payload)
+            elif kind == FRAME_BYE:
+                with self._connections_lock:
+                    self._finished_producers.add(producer_id)
+                conn.send(FRAME_BYE_ACK)
+
+    def _serve_consumer(self, conn: FrameSocket, consumer_id: int) -> None:
+        source = self.consumer_queue(consumer_id)
+        self.consumer_counters.slot(consumer_id)
+        session = ConsumerSession()
+        writer = threading.Thread(target=self._deliver, args=(conn, source, session), daemon=True)
+        writer.start()
+        try:
+            while True:
+                frame = conn.receive()
+                if frame is None:
+                    return
+                kind, payload = frame
+                if kind == FRAME_CREDIT:
+                    credits = _CREDIT.unpack(payload)[0]
+                    with session.cond:
+                        if session.granted:
+                            session.acknowledge(credits)
+                        session.granted = True
+                        session.credits += credits
+                        session.cond.notify_all()
+                elif kind == FRAME_REPORT:
+                    self._apply_report("consumer", consumer_id, payload)
+                elif kind == FRAME_BYE:
+                    with session.cond:
+                        session.closing = True
+                        session.cond.notify_all()
+                    writer.join()
+                    conn.send(FRAME_BYE_ACK)
+                elif kind == FRAME_RETURN:
+                    with session.cond:
+                        session.returned = True
+                    for message in unpack_messages(payload):
+                        self.requeue(message)
+        finally:
+            with session.cond:
+                session.closing = True
+                session.cond.notify_all()
+            writer.join()
+            leftovers = session.unacknowledged()
+            for message in leftovers:
+                self.requeue(message)
+            if leftovers:
+                self.logger.warning(
+                    "BROKER",
+                    f"Zwrócono do kolejki {sum(message_size(m) for m in leftovers)} el. niepotwierdzonych przez KONSUMENTA {consumer_id}"
+                )
+
+    def _deliver(self, conn: FrameSocket, source: Any, session: ConsumerSession) -> None:
+        while True:
+            with session.cond:
+                while session.credits <= 0 and not session.closing:
+                    session.cond.wait(BROKER_POLL_INTERVAL)
+                if session.closing:
+                    return
+                budget = min(session.credits, self.wire_batch)
+                message, session.carry = session.carry, None
+
+            if message is None:
+                try:
+                    message = source.get(timeout=BROKER_POLL_INTERVAL)
+                except queue.Empty:
+                    if self._consumers_stopping.is_set():
+                        conn.send(FRAME_STOP)
+                        return
+                    continue
+
+            messages = []
+            used = 0
+            carry = None
+            stop = False
+            while True:
+                if message is None:
+                    stop = True
+                    break
+                part, carry = split_message(message, budget - used)
+                messages.append(part)
+                used += message_size(part)
+                if carry is not None or used >= budget:
+                    break
+                try:
+                    message = source.get(False)
+                except queue.Empty:
+                    break
+
+            with session.cond:
+                session.carry = carry
+                if messages:
+                    session.credits -= used
+                    session.outstanding.extend(messages)
+            if messages:
+                conn.send(FRAME_DELIVER, pack_messages(messages))
+            if stop:
+                conn.send(FRAME_STOP)
+                return
+
+    def finished_producers(self) -> set[int]:
+        with self._connections_lock:
+            return set(self._finished_producers)
+
+    def stop_consumers(self) -> None:
+        self._consumers_stopping.set()
+
+    def close(self) -> None:
+        self._closed.set()
+        self._server.close()
+        with self._connections_lock:
+            connections = list(self._connections)
+        for conn in connections:
+            conn.close()
+
+
+class WorkerLink:
+
+    def __init__(self, host: str, port: int, role: str, worker_id: int, report_interval: float = 0.05):
+        self.conn = FrameSocket(socket.create_connection((host, port)))
+        self.conn.send(FRAME_HELLO, json.dumps({"role": role, "id": worker_id}).encode())
+        self._report_lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._items: list[int] = []
+        self._latency: list[tuple] = []
+        self._closing = threading.Event()
+        self._reporter = threading.Thread(target=self._report_loop, args=(report_interval,), daemon=True)
+        self._reporter.start()
+
+    def add_counter(self, field: str, amount: int) -> None:
+        with self._report_lock:
+            self._counters[field] = self._counters.get(field, 0) + amount
+
+    def add_item(self, item: int) -> None:
+        with self._report_lock:
+            self._items.append(item)
+
+    def add_latency(self, metric: str, consumer_id: int, producer_id: int, seconds: float) -> None:
+        with self._report_lock:
+            self._latency.append((metric, consumer_id, producer_id, seconds))
+
+    def flush_report(self) -> None:
+        with self._report_lock:
+            if not (self._counters or self._items or self._latency):
+                return
+            report = {"counters": self._counters, "items": self._items, "latency": self._latency}
+            self._counters, self._items, self._latency = {}, [], []
+            self.conn.send(FRAME_REPORT, json.dumps(report).encode())
+
+    def _report_loop(self, interval: float) -> None:
+        while not self._closing.wait(interval):
+            try:
+                self.flush_report()
+            except OSError:
+                return
+
+    def close(self) -> None:
+        self._closing.set()
+        self._reporter.join()
+        self.conn.close()
+
+
+class RemoteCounterSlot:
+
+    def __init__(self, link: WorkerLink):
+        self.link = link
+
+    def add(self, field: str, amount: int = 1) -> None:
+        self.link.add_counter(field, amount)
+
+
+class RemoteItems:
+
+    def __init__(self, link: WorkerLink):
+        self.link = link
+
+    def __getitem__(self, worker_id: int) -> "RemoteItems":
+        return self
+
+    def append(self, item: int) -> None:
+        self.link.add_item(item)
+
+
+class RemoteLatency:
+
+    def __init__(self, link: WorkerLink):
+        self.link = link
+
+    def record(self, metric: str, consumer_id: int, producer_id: int, seconds: float) -> None:
+        self.link.add_latency(metric, consumer_id, producer_id, seconds)
+
+
+class RemoteProducerQueue:
+
+    def __init__(self, link: WorkerLink, window: int, wire_batch: int):
+        self.link = link
+        self.window = window
+        self.wire_batch = wire_batch
+        self._pending: deque = deque()
+        self._pending_entries = 0
+        self._credits = 0
+        self._closing = False
+        self._disconnected = False
+        self._cond = threading.Condition()
+        self._acked = threading.Event()
+        self._receiver = threading.Thread(target=self._receive_loop, daemon=True)
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        self._receiver.start()
+        self._sender.start()
+
+    def put(self, entry: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._pending_entries >= self.window:
+                if self._disconnected:
+                    raise ConnectionError("Utracono połączenie z brokerem")
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Full
+                self._cond.wait(remaining)
+            self._pending.append(entry)
+            self._pending_entries += message_size(entry)
+            self._cond.notify_all()
+
+    def qsize(self) -> int:
+        return self._pending_entries
+
+    def _sendable(self) -> bool:
+        if not self._pending or self._credits <= 0:
+            return False
+        return message_size(self._pending[0]) <= self._credits or self._credits >= self.window
+
+    def _receive_loop(self) -> None:
+        while True:
+            frame = self.link.conn.receive()
+            if frame is None:
+                with self._cond:
+                    self._disconnected = True
+                    self._cond.notify_all()
+                self._acked.set()
+                return
+            kind, payload = frame
+            if kind == FRAME_CREDIT:
+                with self._cond:
+                    self._credits += _CREDIT.unpack(payload)[0]
+                    self._cond.notify_all()
+            elif kind == FRAME_BYE_ACK:
+                self._acked.set()
+
+    def _send_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._sendable() and not self._disconnected:
+                    if self._closing and not self._pending:
+                        return
+                    self._cond.wait()
+                if self._disconnected:
+                    return
+                budget = max(min(self._credits, self.wire_batch), message_size(self._pending[0]))
+                batch = [self._pending.popleft()]
+                used = message_size(batch[0])
+                while self._pending and used + message_size(self._pending[0]) <= budget:
+                    used += message_size(self._pending[0])
+                    batch.append(self._pending.popleft())
+                self._pending_entries -= used
+                self._credits -= used
+                self._cond.notify_all()
+            self.link.conn.send(FRAME_PUT, pack_messages(batch))
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._sender.join()
+        self.link.flush_report()
+        self.link.conn.send(FRAME_BYE)
+        self._acked.wait(BYE_TIMEOUT)
+        self.link.close()
+
+
+class RemoteConsumerQueue:
+
+    def __init__(self, link: WorkerLink, window: int):
+        self.link = link
+        self.window = window
+        self._buffer: deque = deque()
+        self._owed = 0
+        self._stopped = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._acked = threading.Event()
+        self._receiver = threading.Thread(target=self._receive_loop, daemon=True)
+        self._receiver.start()
+        self.link.conn.send(FRAME_CREDIT, _CREDIT.pack(window))
+
+    def _receive_loop(self) -> None:
+        while True:
+            frame = self.link.conn.receive()
+            if frame is None:
+                with self._cond:
+                    self._stopped = True
+                    if not self._closing:
+                        self._buffer.clear()
+                    self._cond.notify_all()
+                self._acked.set()
+                return
+            kind, payload = frame
+            if kind == FRAME_DELIVER:
+                with self._cond:
+                    self._buffer.extend(unpack_messages(payload))
+                    self._cond.notify_all()
+            elif kind == FRAME_STOP:
+                with self._cond:
+                    self._stopped = True
+                    self._cond.notify_all()
+            elif kind == FRAME_BYE_ACK:
+                self._acked.set()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while not self._buffer and not self._stopped:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Empty
+                self._cond.wait(remaining)
+            if not self._buffer:
+                return None
+            entry = self._buffer.popleft()
+            self._owed += message_size(entry)
+            credits = 0
+            if self._owed >= max(self.window // 2, 1):
+                credits, self._owed = self._owed, 0
+        if credits:
+            self.link.conn.send(FRAME_CREDIT, _CREDIT.pack(credits))
+        return entry
+
+    def qsize(self) -> int:
+        return sum(message_size(message) for message in self._buffer)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+        self.link.flush_report()
+        try:
+            self.link.conn.send(FRAME_BYE)
+            self._acked.wait(BYE_TIMEOUT)
+            with self._cond:
+                leftovers = list(self._buffer)
+                self._buffer.clear()
+            self.link.conn.send(FRAME_RETURN, pack_messages(leftovers))
+            self.link.flush_report()
+        except OSError:
+            pass
+        self.link.close()
+
+
+class RemoteWorker:
+
+    def __init__(self,
+                 worker: Any,
+                 role: str,
+                 host: str,
+                 port: int,
+                 credit_window: int = 32,
+                 wire_batch: int = 64,
+                 report_interval: float = 0.05):
+        self.worker = worker
+        self.role = role
+        self.host = host
+        self.port = port
+        self.credit_window = credit_window
+        self.wire_batch = wire_batch
+        self.report_interval = report_interval
+
+    def run(self) -> None:
+        worker = self.worker
+        worker_id = worker.producer_id if self.role == "producer" else worker.consumer_id
+        link = WorkerLink(self.host, self.port, self.role, worker_id, self.report_interval)
+        if self.role == "producer":
+            transport = RemoteProducerQueue(link, self.credit_window, self.wire_batch)
+            worker.produced_items = RemoteItems(link)
+        else:
+            transport = RemoteConsumerQueue(link, self.credit_window)
+            worker.consumed_items = RemoteItems(link)
+            worker.latency = RemoteLatency(link)
+            worker.completion = None
+        worker.queue = transport
+        worker.counters = RemoteCounterSlot(link)
+        try:
+            worker.run()
+        finally:
+            transport.close()
+
+
+def _remote_consumer(consumer_id: int):
+    import config
+    from consumer import Consumer
+
+    sleep_min, sleep_max = config.CONSUMER_SPEEDS.get(consumer_id, (0.5, 1.0))
+    return Consumer(
+        consumer_id=consumer_id,
+        queue=None,
+        counters=None,
+        consumed_items=None,
+        sleep_min=sleep_min,
+        sleep_max=sleep_max,
+        priority_levels=config.PRIORITY_LEVELS
+    )
+
+
+def _remote_producer(producer_id: int):
+    import config
+    from producer import Producer
+
+    return Producer(
+        producer_id=producer_id,
+        queue=None,
+        items_count=config.ITEMS_PER_PRODUCER,
+        counters=None,
+        produced_items=None,
+        sleep_min=config.PRODUCER_SLEEP_MIN,
+        sleep_max=config.PRODUCER_SLEEP_MAX,
+        defect_rate=config.DEFECT_RATES.get(producer_id, 0.0),
+        batch_size=config.BATCH_MAX_SIZE if config.BATCH_ENABLED else 1,
+        batch_linger=config.BATCH_MAX_LINGER,
+        priority_weights=config.PRIORITY_DISTRIBUTIONS.get(producer_id),
+        put_timeout=config.PUT_TIMEOUT
+    )
+
+
+def main() -> None:
+    import config
+    from logger import init_logger
+
+    parser = argparse.ArgumentParser(description="Zdalny producent lub konsument podłączany do brokera")
+    parser.add_argument("--connect", default=f"{config.BROKER_HOST}:{config.BROKER_PORT}")
+    worker = parser.add_mutually_exclusive_group(required=True)
+    worker.add_argument("--consumer-id", type=int)
+    worker.add_argument("--producer-id", type=int)
+    args = parser.parse_args()
+
+    init_logger(to_file=False, to_console=config.LOG_TO_CONSOLE, level=config.LOG_LEVEL)
+    host, port = parse_address(args.connect)
+    if args.producer_id is not None:
+        role, remote = "producer", _remote_producer(args.producer_id)
+    else:
+        role, remote = "consumer", _remote_consumer(args.consumer_id)
+    RemoteWorker(
+        remote,
+        role,
+        host,
+        port,
+        credit_window=config.BROKER_CREDIT_WINDOW,
+        wire_batch=config.BROKER_WIRE_BATCH,
+        report_interval=config.BROKER_REPORT_INTERVAL
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
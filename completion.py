@@ -0,0 +1,51 @@
+from ctypes import c_int64
+from multiprocessing import Event
+from multiprocessing.sharedctypes import RawValue
+from typing import Dict
+
+from counters import ShardedCounters
+
+
+class CompletionTracker:
+
+    def __init__(self, producer_counters: ShardedCounters, consumer_counters: ShardedCounters, replayed: int = 0):
+        self.producer_counters = producer_counters
+        self.consumer_counters = consumer_counters
+        self.replayed = replayed
+        self._expected = RawValue(c_int64, -1)
+        self._done = Event()
+
+    def counts(self) -> Dict[str, int]:
+        produced = self.producer_counters.total("produced")
+        dead_lettered = self.producer_counters.total("dead_lettered")
+        accepted = self.consumer_counters.total("accepted")
+        rejected = self.consumer_counters.total("rejected")
+        return {
+            "produced": produced,
+            "replayed": self.replayed,
+            "dead_lettered": dead_lettered,
+            "shed": self.producer_counters.total("shed"),
+            "accepted": accepted,
+            "rejected": rejected,
+            "in_flight": max(produced + self.replayed - dead_lettered - accepted - rejected, 0)
+        }
+
+    def finished(self) -> int:
+        return self.consumer_counters.total("accepted") + self.consumer_counters.total("rejected")
+
+    def check(self) -> None:
+        expected = self._expected.value
+        if expected < 0 or self._done.is_set():
+            return
+        if self.finished() >= expected:
+            self._done.set()
+
+    def seal(self, expected: int) -> None:
+        self._expected.value = expected + self.replayed - self.producer_counters.total("dead_lettered")
+        self.check()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
@@ -1,16 +1,44 @@
 QUEUE_SIZE: int = 50
+QUEUE_TRANSPORT: str = "queue"
+EXECUTION_BACKEND: str = "process"
 PRODUCERS_COUNT: int = 3
 CONSUMERS_COUNT: int = 5
 ITEMS_PER_PRODUCER: int = 20
 
 PRODUCER_SLEEP_MIN: float = 0.05
 PRODUCER_SLEEP_MAX: float = 0.15
+PACING_POLICY: str = "none"
+PACING_RATE: float = 50.0
+PACING_BURST: int = 10
+AIMD_TARGET_QUEUE_SIZE: int = 25
+AIMD_MIN_RATE: float = 1.0
+AIMD_MAX_RATE: float = 1000.0
+AIMD_INCREASE: float = 10.0
+AIMD_DECREASE: float = 0.5
+PUT_TIMEOUT: float = 1.0
+OVERLOAD_POLICY: str = "block"
+SPILL_DIR: str = "spill"
 
 DEFECT_RATES: dict = {
     1: 0.05,
     2: 0.15,
     3: 0.08,
 }
+GENERATION_MODE: str = "random"
+GENERATION_BACKEND: str = "auto"
+GENERATION_SEED: int = 12345
+GENERATION_CHUNK_SIZE: int = 1024
+VALUE_DISTRIBUTION: str = "uniform"
+VALUE_DISTRIBUTION_PARAMS: dict = {"low": 1, "high": 100}
+DEFECT_DISTRIBUTION: str = "bernoulli"
+DEFECT_BURST_LENGTH: float = 5.0
+TRACE_FILE: str = "trace.jsonl"
+TRACE_SPEED: float = 1.0
+TRACE_RECORD_FILE: str = ""
+
+DEAD_LETTER_ENABLED: bool = True
+DEAD_LETTER_CAPACITY: int = 1000
+DEAD_LETTER_FILE: str = "deadletter.bin"
 
 CONSUMER_SPEEDS: dict = {
     1: (0.08, 0.12),
@@ -19,12 +47,74 @@ CONSUMER_SPEEDS: dict = {
     4: (0.85, 0.95),
     5: (0.6, 0.8),
 }
+PRIORITY_LANES_ENABLED: bool = False
+PRIORITY_LEVELS: int = 3
+PRIORITY_DISTRIBUTIONS: dict = {}
+PRIORITY_POLICY: str = "strict"
+PRIORITY_WEIGHTS: tuple = (6, 3, 1)
+PRIORITY_STARVATION_LIMIT: int = 20
+
+DISPATCH_MODE: str = "shared"
+SHARD_QUEUE_SIZE: int = 10
+WORK_STEALING: bool = True
+SERVICE_TIME_ALPHA: float = 0.2
+
 SHUTDOWN_TIMEOUT: int = 30
 
+BROKER_ENABLED: bool = False
+BROKER_HOST: str = "127.0.0.1"
+BROKER_PORT: int = 5555
+BROKER_CREDIT_WINDOW: int = 32
+BROKER_WIRE_BATCH: int = 64
+BROKER_REPORT_INTERVAL: float = 0.05
+BROKER_REMOTE_CONSUMERS: int = 0
+BROKER_REMOTE_PRODUCERS: int = 0
+
+DURABLE_QUEUE: bool = False
+WAL_DIR: str = "wal"
+WAL_SYNC_MODE: str = "batch"
+WAL_GROUP_MAX: int = 256
+WAL_GROUP_WAIT: float = 0.002
+WAL_SYNC_INTERVAL: float = 0.05
+WAL_SEGMENT_BYTES: int = 4 * 1024 * 1024
+WAL_MAX_SEGMENTS: int = 4
+
+AUTOSCALE_ENABLED: bool = False
+AUTOSCALE_MIN_CONSUMERS: int = 2
+AUTOSCALE_MAX_CONSUMERS: int = 10
+AUTOSCALE_COOLDOWN: float = 3.0
+AUTOSCALE_UP_QUEUE_SIZE: int = 25
+AUTOSCALE_UP_LAG_TREND: float = 1.0
+AUTOSCALE_DOWN_UTILIZATION: float = 0.3
+CONSUMER_STOP_POLL_INTERVAL: float = 0.5
+
 LOG_FILE: str = "system.log"
 LOG_TO_FILE: bool = True
 LOG_TO_CONSOLE: bool = True
+LOG_LEVEL: str = "DBG"
+LOG_ASYNC: bool = False
+LOG_QUEUE_SIZE: int = 10000
+LOG_BATCH_SIZE: int = 256
 
 MONITOR_INTERVAL: float = 1.0
 STATS_FILE: str = "stats.json"
+STATS_SEGMENT_FILE: str = "stats.seg"
 EXPORT_STATS: bool = True
+HISTORY_FILE: str = "history.bin"
+HISTORY_CAPACITIES: dict = {
+    1: 3600,
+    10: 8640,
+    60: 10080,
+}
+RATE_WINDOW: float = 10.0
+LATENCY_FILE: str = "latency.bin"
+PROFILING_ENABLED: bool = True
+PROFILE_FILE: str = "profile.bin"
+PROFILE_DIR: str = "profiles"
+
+BATCH_ENABLED: bool = False
+BATCH_MAX_SIZE: int = 16
+BATCH_MAX_LINGER: float = 0.05
+
+ITEM_STORAGE: str = "manager"
+SHARED_BUFFER_CAPACITY: int = 0
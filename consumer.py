@@ -1,66 +1,212 @@
+import asyncio
 import time
-from multiprocessing import Queue, Value, Lock
+from multiprocessing import Queue
+from multiprocessing.synchronize import Event
+from queue import Empty
+from typing import Any
+from counters import CounterSlot
+from completion import CompletionTracker
+from latency import LatencyHistograms, item_producer
 from logger import get_logger
+from profiling import PhaseTimers, record
 
 
 class Consumer:
     def __init__(self,
                  consumer_id: int,
                  queue: Queue,
-                 consumed_counter: Value,
+                 counters: CounterSlot,
                  consumed_items: dict,
                  sleep_min: float = 0.7,
                  sleep_max: float = 1.2,
-                 lock: Lock = None):
+                 stop_event: Event = None,
+                 stop_poll_interval: float = 0.5,
+                 completion: CompletionTracker = None,
+                 latency: LatencyHistograms = None,
+                 timers: PhaseTimers = None,
+                 priority_levels: int = 3):
         self.consumer_id = consumer_id
         self.queue = queue
-        self.consumed_counter = consumed_counter
+        self.counters = counters
         self.consumed_items = consumed_items
         self.sleep_min = sleep_min
         self.sleep_max = sleep_max
-        self.lock = lock
+        self.stop_event = stop_event
+        self.stop_poll_interval = stop_poll_interval
+        self.completion = completion
+        self.latency = latency
+        self.timers = timers
+        self.priority_levels = priority_levels
         self.logger = get_logger()
+        self.log_prefix = f"KONSUMENT {consumer_id}"
+        self.items_processed = 0
+        self.items_rejected = 0
+
+    def _observe_latency(self, item_tuple: tuple, dequeued_at: float, started_at: float) -> None:
+        if not self.latency:
+            return
+        enqueued_at, item_id = item_tuple[3:5]
+        finished_at = time.monotonic()
+        producer_id = item_producer(item_id)
+        self.latency.record("queue_wait", self.consumer_id, producer_id, dequeued_at - enqueued_at)
+        self.latency.record("service", self.consumer_id, producer_id, finished_at - started_at)
+        self.latency.record("end_to_end", self.consumer_id, producer_id, finished_at - enqueued_at)
+
+    def _process(self, item_tuple: tuple) -> float:
+        priority, item, is_defective = item_tuple[:3]
+        
+        if is_defective:
+            self.items_rejected += 1
+            self.counters.add("rejected")
+            self.logger.info(
+                self.log_prefix,
+                "ODRZUCONO WADLIWY: %d (odrzuconych: %d)",
+                item, self.items_rejected
+            )
+            return 0.0
+        
+        self.counters.add("accepted")
+        started = time.perf_counter()
+        self.consumed_items[self.consumer_id].append(item)
+        record("append", started)
+        
+        self.items_processed += 1
+        
+        self.logger.info(
+            self.log_prefix,
+            "Przetwarzam: %d (priorytet: %d, przetworzonych: %d)",
+            item, priority, self.items_processed
+        )
+        
+        return self.sleep_min + (self.sleep_max - self.sleep_min) * (priority / max(self.priority_levels - 1, 1))
+
+    def _handle_entry(self, item_tuple: tuple, dequeued_at: float) -> None:
+        started_at = time.monotonic()
+        delay = self._process(item_tuple)
+        if delay > 0:
+            started = time.perf_counter()
+            time.sleep(delay)
+            record("sleep", started)
+        self._observe_latency(item_tuple, dequeued_at, started_at)
+
+    def _next_entry(self):
+        if self.stop_event is None:
+            return self.queue.get()
+        while not self.stop_event.is_set():
+            try:
+                return self.queue.get(timeout=self.stop_poll_interval)
+            except Empty:
+                continue
+        return None
+
+    def _acknowledge(self, item_tuple: Any) -> None:
+        ack = getattr(self.queue, "ack", None)
+        if ack is None:
+            return
+        entries = item_tuple if isinstance(item_tuple, list) else [item_tuple]
+        ack([entry[4] for entry in entries])
+
+    def _account(self, started: float) -> None:
+        self.counters.add("busy_us", int((time.perf_counter() - started) * 1_000_000))
+        if self.completion:
+            self.completion.check()
 
     def consume(self) -> None:
         self.logger.info(f"KONSUMENT {self.consumer_id}", "Rozpoczęto konsumpcję")
         
-        items_processed = 0
-        items_rejected = 0
         try:
             while True:
-                item_tuple = self.queue.get()
+                waited = time.perf_counter()
+                item_tuple = self._next_entry()
+                record("get", waited)
+                if self.timers:
+                    self.timers.poll()
                 
                 if item_tuple is None:
                     self.logger.info(f"KONSUMENT {self.consumer_id}", "Otrzymano sygnał STOP")
                     break
                 
-                priority, item, is_defective = item_tuple
-                
-                if is_defective:
-                    items_rejected += 1
-                    self.logger.info(
-                        f"KONSUMENT {self.consumer_id}",
-                        f"ODRZUCONO WADLIWY: {item} (odrzuconych: {items_rejected})"
-                    )
-                    continue
-                
-                with self.lock:
-                    self.consumed_counter.value += 1
-                    self.consumed_items[self.consumer_id].append(item)
-                
-                items_processed += 1
+                dequeued_at = time.monotonic()
+                started = time.perf_counter()
+                if isinstance(item_tuple, list):
+                    for entry in item_tuple:
+                        self._handle_entry(entry, dequeued_at)
+                else:
+                    self._handle_entry(item_tuple, dequeued_at)
+                self._acknowledge(item_tuple)
+                self._account(started)
+        
+        except Exception as e:
+            self.logger.error(f"KONSUMENT {self.consumer_id}", f"Błąd: {e}")
+        
+        self.logger.info(f"KONSUMENT {self.consumer_id}", f"Zakończył pracę (przetworzył: {self.items_processed})")
+
+    def run(self) -> None:
+        self.logger.bind_counters(self.counters)
+        if self.timers:
+            self.timers.bind()
+        try:
+            self.consume()
+        finally:
+            if self.timers:
+                self.timers.finish()
+
+
+class AsyncConsumer(Consumer):
+
+    async def _handle_entry(self, item_tuple: tuple, dequeued_at: float) -> None:
+        started_at = time.monotonic()
+        delay = self._process(item_tuple)
+        if delay > 0:
+            started = time.perf_counter()
+            await asyncio.sleep(delay)
+            record("sleep", started)
+        self._observe_latency(item_tuple, dequeued_at, started_at)
+
+    async def _next_entry(self):
+        if self.stop_event is None:
+            return await self.queue.get()
+        while not self.stop_event.is_set():
+            try:
+                return await asyncio.wait_for(self.queue.get(), self.stop_poll_interval)
+            except asyncio.TimeoutError:
+                continue
+        return None
+
+    async def consume(self) -> None:
+        self.logger.info(f"KONSUMENT {self.consumer_id}", "Rozpoczęto konsumpcję")
+        
+        try:
+            while True:
+                waited = time.perf_counter()
+                item_tuple = await self._next_entry()
+                record("get", waited)
+                if self.timers:
+                    self.timers.poll()
                 
-                self.logger.info(
-                    f"KONSUMENT {self.consumer_id}",
-                    f"Przetwarzam: {item} (priorytet: {priority}, przetworzonych: {items_processed})"
-                )
+                if item_tuple is None:
+                    self.logger.info(f"KONSUMENT {self.consumer_id}", "Otrzymano sygnał STOP")
+                    break
                 
-                time.sleep(self.sleep_min + (self.sleep_max - self.sleep_min) * (priority / 2))
+                dequeued_at = time.monotonic()
+                started = time.perf_counter()
+                if isinstance(item_tuple, list):
+                    for entry in item_tuple:
+                        await self._handle_entry(entry, dequeued_at)
+                else:
+                    await self._handle_entry(item_tuple, dequeued_at)
+                self._account(started)
         
         except Exception as e:
             self.logger.error(f"KONSUMENT {self.consumer_id}", f"Błąd: {e}")
         
-        self.logger.info(f"KONSUMENT {self.consumer_id}", f"Zakończył pracę (przetworzył: {items_processed})")
+        self.logger.info(f"KONSUMENT {self.consumer_id}", f"Zakończył pracę (przetworzył: {self.items_processed})")
 
-    def run(self) -> None:
-        self.consume()
+    async def run(self) -> None:
+        if self.timers:
+            self.timers.bind()
+        try:
+            await self.consume()
+        finally:
+            if self.timers:
+                self.timers.finish()
@@ -0,0 +1,70 @@
+import ctypes
+from ctypes import c_int64
+from multiprocessing.sharedctypes import RawArray
+
+CACHE_LINE_SIZE = 64
+FIELDS = ("produced", "defective", "dead_lettered", "drift_us", "blocked_us", "shed", "spilled", "accepted", "rejected", "busy_us", "log_dropped")
+FIELD_INDEX = {name: index for index, name in enumerate(FIELDS)}
+
+_CELL_SIZE = ctypes.sizeof(c_int64)
+_CELLS_PER_LINE = CACHE_LINE_SIZE // _CELL_SIZE
+_SLOT_WIDTH = -(-len(FIELDS) // _CELLS_PER_LINE) * _CELLS_PER_LINE
+
+
+class CounterSlot:
+
+    def __init__(self, array, base: int):
+        self._array = array
+        self._base = base
+
+    def add(self, field: str, amount: int = 1) -> None:
+        index = self._base + FIELD_INDEX[field]
+        self._array[index] += amount
+
+    def get(self, field: str) -> int:
+        return self._array[self._base + FIELD_INDEX[field]]
+
+
+class CounterView:
+
+    def __init__(self, counters: "ShardedCounters", field: str):
+        self._counters = counters
+        self._field = field
+
+    @property
+    def value(self) -> int:
+        return self._counters.total(self._field)
+
+
+class ShardedCounters:
+
+    def __init__(self, shards_count: int):
+        self.shards_count = shards_count
+        self._array = RawArray(c_int64, (shards_count + 1) * _SLOT_WIDTH)
+        misalignment = ctypes.addressof(self._array) % CACHE_LINE_SIZE
+        self._offset = ((CACHE_LINE_SIZE - misalignment) % CACHE_LINE_SIZE) // _CELL_SIZE
+
+    def _base(self, shard_id: int) -> int:
+        return self._offset + (shard_id - 1) * _SLOT_WIDTH
+
+    def slot(self, shard_id: int) -> CounterSlot:
+        if not 1 <= shard_id <= self.shards_count:
+            raise ValueError(f"Nieprawidłowy numer slotu: {shard_id}")
+        return CounterSlot(self._array, self._base(shard_id))
+
+    def view(self, field: str) -> CounterView:
+        return CounterView(self, field)
+
+    def per_shard(self, field: str) -> dict[int, int]:
+        index = FIELD_INDEX[field]
+        return {
+            shard_id: self._array[self._base(shard_id) + index]
+            for shard_id in range(1, self.shards_count + 1)
+        }
+
+    def total(self, field: str) -> int:
+        index = FIELD_INDEX[field]
+        return sum(
+            self._array[self._offset + shard * _SLOT_WIDTH + index]
+            for shard in range(self.shards_count)
+        )
@@ -0,0 +1,171 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+DEAD_LETTER_MAGIC = b"PCDL"
+
+_HEADER = struct.Struct("<4sII")
+_LANE = struct.Struct("<qqq")
+_INDEX = struct.Struct("<q")
+_HEAD_OFFSET = 0
+_TAIL_OFFSET = 8
+_DROPPED_OFFSET = 16
+_RECORD = struct.Struct("<B7xqdq")
+
+
+def _size(producers: int, capacity: int) -> int:
+    return _HEADER.size + producers * (_LANE.size + capacity * _RECORD.size)
+
+
+class DeadLetterTable:
+
+    def __init__(self, buffer: Any, producers: int, capacity: int):
+        self.producers = producers
+        self.capacity = capacity
+        self._buffer = buffer
+
+    def _lane(self, producer_id: int) -> int:
+        if not 1 <= producer_id <= self.producers:
+            raise ValueError(f"Nieprawidłowy numer producenta: {producer_id}")
+        return _HEADER.size + (producer_id - 1) * (_LANE.size + self.capacity * _RECORD.size)
+
+    def _record_offset(self, lane: int, position: int) -> int:
+        return lane + _LANE.size + (position % self.capacity) * _RECORD.size
+
+    def _read(self, producer_id: int, lane: int, head: int, tail: int) -> list[Dict[str, Any]]:
+        entries = []
+        for position in range(head, tail):
+            priority, item, diverted_at, item_id = _RECORD.unpack_from(self._buffer, self._record_offset(lane, position))
+            entries.append({
+                "producer_id": producer_id,
+                "item": item,
+                "priority": priority,
+                "item_id": item_id,
+                "diverted_at": datetime.fromtimestamp(diverted_at).isoformat()
+            })
+        return entries
+
+    def _producer_ids(self, producer_id: Optional[int]) -> range:
+        if producer_id:
+            self._lane(producer_id)
+            return range(producer_id, producer_id + 1)
+        return range(1, self.producers + 1)
+
+    def lane_stats(self) -> list[Dict[str, int]]:
+        stats = []
+        for producer_id in range(1, self.producers + 1):
+            head, tail, dropped = _LANE.unpack_from(self._buffer, self._lane(producer_id))
+            stats.append({
+                "producer_id": producer_id,
+                "stored": tail - head,
+                "diverted": tail + dropped,
+                "dropped": dropped
+            })
+        return stats
+
+    def inspect(self, producer_id: Optional[int] = None, limit: int = 50) -> list[Dict[str, Any]]:
+        entries = []
+        for pid in self._producer_ids(producer_id):
+            lane = self._lane(pid)
+            head, tail, _ = _LANE.unpack_from(self._buffer, lane)
+            entries.extend(self._read(pid, lane, max(head, tail - limit), tail))
+        return entries
+
+    def drain(self, producer_id: Optional[int] = None, limit: Optional[int] = None) -> list[Dict[str, Any]]:
+        entries = []
+        for pid in self._producer_ids(producer_id):
+            lane = self._lane(pid)
+            head, tail, _ = _LANE.unpack_from(self._buffer, lane)
+            if limit is not None:
+                tail = max(min(tail, head + limit - len(entries)), head)
+            entries.extend(self._read(pid, lane, head, tail))
+            _INDEX.pack_into(self._buffer, lane + _HEAD_OFFSET, tail)
+            if limit is not None and len(entries) >= limit:
+                break
+        return entries
+
+
+class DeadLetterLane(DeadLetterTable):
+
+    def __init__(self, producers: int, capacity: int, path: Optional[str] = None):
+        if capacity <= 0:
+            raise ValueError(f"Pojemność kolejki odrzutów musi być dodatnia: {capacity}")
+        self.path = path
+        size = _size(producers, capacity)
+        header = _HEADER.pack(DEAD_LETTER_MAGIC, producers, capacity)
+        if path:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(header)
+                f.truncate(size)
+            with open(temp_path, 'r+b') as f:
+                buffer = mmap.mmap(f.fileno(), size)
+            os.replace(temp_path, path)
+        else:
+            buffer = mmap.mmap(-1, size)
+            buffer[:_HEADER.size] = header
+        super().__init__(buffer, producers, capacity)
+
+    def put(self, producer_id: int, entry: tuple) -> bool:
+        lane = self._lane(producer_id)
+        head, tail, dropped = _LANE.unpack_from(self._buffer, lane)
+        if tail - head >= self.capacity:
+            _INDEX.pack_into(self._buffer, lane + _DROPPED_OFFSET, dropped + 1)
+            return False
+        priority, item, _, _, item_id = entry
+        _RECORD.pack_into(self._buffer, self._record_offset(lane, tail), priority, item, time.time(), item_id)
+        _INDEX.pack_into(self._buffer, lane + _TAIL_OFFSET, tail + 1)
+        return True
+
+
+class DeadLetterReader:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._inode: Optional[int] = None
+        self._table: Optional[DeadLetterTable] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if stat.st_ino == self._inode:
+            return True
+        self._table = None
+        self._inode = None
+        if stat.st_size < _HEADER.size:
+            return False
+
+        with open(self.path, 'r+b') as f:
+            buffer = mmap.mmap(f.fileno(), 0)
+        magic, producers, capacity = _HEADER.unpack_from(buffer, 0)
+        if magic != DEAD_LETTER_MAGIC or capacity == 0 or len(buffer) < _size(producers, capacity):
+            buffer.close()
+            return False
+        self._table = DeadLetterTable(buffer, producers, capacity)
+        self._inode = stat.st_ino
+        return True
+
+    def lane_stats(self) -> Optional[list[Dict[str, int]]]:
+        with self._lock:
+            if not self._open():
+                return None
+            return self._table.lane_stats()
+
+    def inspect(self, producer_id: Optional[int] = None, limit: int = 50) -> Optional[list[Dict[str, Any]]]:
+        with self._lock:
+            if not self._open():
+                return None
+            return self._table.inspect(producer_id, limit)
+
+    def drain(self, producer_id: Optional[int] = None, limit: Optional[int] = None) -> Optional[list[Dict[str, Any]]]:
+        with self._lock:
+            if not self._open():
+                return None
+            return self._table.drain(producer_id, limit)
@@ -0,0 +1,212 @@
+import queue
+import time
+from ctypes import c_byte, c_double, c_int64
+from multiprocessing import Queue
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Dict, Optional
+
+MIN_SERVICE_TIME = 0.001
+STEAL_POLL_INTERVAL = 0.05
+STOP_MARKER_TIMEOUT = 5.0
+
+
+class ShardedDispatcher:
+
+    def __init__(self,
+                 shards: int,
+                 shard_size: int,
+                 producers: int,
+                 work_stealing: bool = True,
+                 service_time_alpha: float = 0.2):
+        self.shards = shards
+        self.producers = producers
+        self.work_stealing = work_stealing
+        self.service_time_alpha = service_time_alpha
+        self._queues = [Queue(maxsize=shard_size) for _ in range(shards)]
+        self._service_times = RawArray(c_double, shards)
+        self._active = RawArray(c_byte, shards)
+        self._routed = RawArray(c_int64, (producers + 1) * shards)
+        self._stolen = RawArray(c_int64, shards)
+        self._unrouted: list = []
+
+    def set_active(self, consumer_id: int, active: bool) -> None:
+        self._active[consumer_id - 1] = 1 if active else 0
+
+    def for_producer(self, producer_id: int) -> "ShardRouter":
+        return ShardRouter(self, producer_id)
+
+    def for_consumer(self, consumer_id: int) -> "ShardConsumer":
+        return ShardConsumer(self, consumer_id)
+
+    def stop_consumer(self, consumer_id: int) -> None:
+        self._queues[consumer_id - 1].put(None)
+
+    def put(self, entry: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        ShardRouter(self, 0).put(entry, block, timeout)
+
+    def _drain_shard(self, shard: int) -> None:
+        while True:
+            try:
+                entry = self._queues[shard].get_nowait()
+            except queue.Empty:
+                return
+            if entry is not None:
+                self._unrouted.append(entry)
+
+    def reroute(self, consumer_ids: list[int]) -> int:
+        if not any(self._active):
+            return 0
+        for consumer_id in consumer_ids:
+            if not self._active[consumer_id - 1]:
+                self._drain_shard(consumer_id - 1)
+        moved = 0
+        while moved < len(self._unrouted):
+            try:
+                self.put(self._unrouted[moved], block=False)
+            except queue.Full:
+                break
+            moved += 1
+        del self._unrouted[:moved]
+        return moved
+
+    def qsize(self) -> int:
+        return sum(shard.qsize() for shard in self._queues) + len(self._unrouted)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def shard_stats(self) -> list[Dict[str, Any]]:
+        stats = []
+        for shard in range(self.shards):
+            routed = sum(self._routed[row * self.shards + shard] for row in range(self.producers + 1))
+            stats.append({
+                "consumer_id": shard + 1,
+                "active": bool(self._active[shard]),
+                "depth": self._queues[shard].qsize(),
+                "service_time_ms": round(self._service_times[shard] * 1000, 2),
+                "routed": routed,
+                "stolen": self._stolen[shard]
+            })
+        return stats
+
+
+class ShardRouter:
+
+    def __init__(self, dispatcher: ShardedDispatcher, producer_id: int):
+        self.dispatcher = dispatcher
+        self._row = producer_id * dispatcher.shards
+
+    def _ranked_shards(self) -> list[int]:
+        dispatcher = self.dispatcher
+        candidates = [shard for shard in range(dispatcher.shards) if dispatcher._active[shard]]
+        if not candidates:
+            candidates = list(range(dispatcher.shards))
+        return sorted(candidates, key=lambda shard: (dispatcher._queues[shard].qsize() + 1)
+                      * max(dispatcher._service_times[shard], MIN_SERVICE_TIME))
+
+    def put(self, entry: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        ranked = self._ranked_shards()
+        for shard in ranked:
+            try:
+                self.dispatcher._queues[shard].put_nowait(entry)
+            except queue.Full:
+                continue
+            self.dispatcher._routed[self._row + shard] += 1
+            return
+        if not block:
+            raise queue.Full
+        self.dispatcher._queues[ranked[0]].put(entry, timeout=timeout)
+        self.dispatcher._routed[self._row + ranked[0]] += 1
+
+
+class ShardConsumer:
+
+    def __init__(self, dispatcher: ShardedDispatcher, consumer_id: int):
+        self.dispatcher = dispatcher
+        self.shard = consumer_id - 1
+        self._own = dispatcher._queues[self.shard]
+        self._served_at: Optional[float] = None
+        self._served_count = 0
+        self._stop_markers: list[int] = []
+
+    def _observe_service_time(self) -> None:
+        if self._served_at is None:
+            return
+        elapsed = (time.monotonic() - self._served_at) / max(self._served_count, 1)
+        alpha = self.dispatcher.service_time_alpha
+        current = self.dispatcher._service_times[self.shard]
+        self.dispatcher._service_times[self.shard] = elapsed if current == 0 else current + alpha * (elapsed - current)
+        self._served_at = None
+
+    def _served(self, entry: Any) -> Any:
+        if entry is None and self._stop_markers:
+            self._return_stop_markers(STOP_MARKER_TIMEOUT)
+        if entry is not None:
+            self._served_at = time.monotonic()
+            self._served_count = len(entry) if isinstance(entry, list) else 1
+        return entry
+
+    def _return_stop_markers(self, timeout: Optional[float] = None) -> None:
+        kept = []
+        for shard in self._stop_markers:
+            try:
+                self.dispatcher._queues[shard].put(None, timeout is not None, timeout)
+            except queue.Full:
+                kept.append(shard)
+        self._stop_markers = kept
+
+    def _steal(self) -> tuple[bool, Any]:
+        dispatcher = self.dispatcher
+        peers = [shard for shard in range(dispatcher.shards) if shard != self.shard]
+        peers.sort(key=lambda shard: dispatcher._queues[shard].qsize(), reverse=True)
+        for shard in peers:
+            peer = dispatcher._queues[shard]
+            if peer.qsize() == 0:
+                break
+            try:
+                entry = peer.get_nowait()
+            except queue.Empty:
+                continue
+            if entry is None:
+                self._stop_markers.append(shard)
+                self._return_stop_markers()
+                continue
+            dispatcher._stolen[self.shard] += 1
+            return True, entry
+        return False, None
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        self._observe_service_time()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            if self._stop_markers:
+                self._return_stop_markers()
+            try:
+                return self._served(self._own.get_nowait())
+            except queue.Empty:
+                pass
+
+            if self.dispatcher.work_stealing:
+                stolen, entry = self._steal()
+                if stolen:
+                    return self._served(entry)
+
+            if not block:
+                raise queue.Empty
+            wait = STEAL_POLL_INTERVAL if self.dispatcher.work_stealing else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise queue.Empty
+                wait = min(wait, remaining) if wait is not None else remaining
+            try:
+                return self._served(self._own.get(timeout=wait))
+            except queue.Empty:
+                if deadline is None and wait is None:
+                    raise
+
+    def get_nowait(self) -> Any:
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return self.dispatcher.qsize()
@@ -0,0 +1,139 @@
+import random
+from array import array
+from itertools import repeat
+from typing import Any, Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+GENERATION_BACKENDS = ("auto", "numpy", "python")
+VALUE_DISTRIBUTIONS = ("uniform", "normal", "exponential")
+DEFECT_DISTRIBUTIONS = ("bernoulli", "burst")
+DEFAULT_VALUE_PARAMS = {"low": 1, "high": 100, "mean": 50.0, "std": 15.0, "scale": 20.0}
+
+
+def producer_seed(seed: int, producer_id: int) -> int:
+    return seed * 65537 + producer_id
+
+
+class ItemGenerator:
+
+    def __init__(self,
+                 seed: int,
+                 defect_rate: float = 0.0,
+                 chunk_size: int = 1024,
+                 value_distribution: str = "uniform",
+                 value_params: Optional[Dict[str, Any]] = None,
+                 defect_distribution: str = "bernoulli",
+                 burst_length: float = 5.0,
+                 priority_weights: Optional[tuple] = None,
+                 sleep_min: float = 0.0,
+                 sleep_max: float = 0.0,
+                 backend: str = "auto"):
+        if value_distribution not in VALUE_DISTRIBUTIONS:
+            raise ValueError(f"Nieznany rozkład wartości: {value_distribution} (dostępne: {', '.join(VALUE_DISTRIBUTIONS)})")
+        if defect_distribution not in DEFECT_DISTRIBUTIONS:
+            raise ValueError(f"Nieznany rozkład wad: {defect_distribution} (dostępne: {', '.join(DEFECT_DISTRIBUTIONS)})")
+        if backend not in GENERATION_BACKENDS:
+            raise ValueError(f"Nieznany backend generatora: {backend} (dostępne: {', '.join(GENERATION_BACKENDS)})")
+        if backend == "numpy" and np is None:
+            raise ValueError("Backend generatora 'numpy' wymaga zainstalowanego pakietu numpy")
+        self.chunk_size = max(chunk_size, 1)
+        self.defect_rate = defect_rate
+        self.value_distribution = value_distribution
+        self.value_params = {**DEFAULT_VALUE_PARAMS, **(value_params or {})}
+        self.defect_distribution = defect_distribution
+        self.burst_length = max(burst_length, 1.0)
+        self.priority_weights = priority_weights
+        self.sleep_min = sleep_min
+        self.sleep_max = sleep_max
+        self.backend = "numpy" if backend == "auto" and np is not None else backend
+        if self.backend == "auto":
+            self.backend = "python"
+        if self.backend == "numpy":
+            self._rng = np.random.default_rng(seed)
+        else:
+            self._rng = random.Random(seed)
+        self._in_burst = False
+        self._chunk: Any = iter(())
+
+    def _burst_defects(self, draws: list[float]) -> list[bool]:
+        rate = min(max(self.defect_rate, 0.0), 1.0)
+        if rate >= 1.0:
+            return [True] * len(draws)
+        leave = 1.0 / self.burst_length
+        enter = rate * leave / (1.0 - rate)
+        defects = []
+        in_burst = self._in_burst
+        for draw in draws:
+            in_burst = draw >= leave if in_burst else draw < enter
+            defects.append(in_burst)
+        self._in_burst = in_burst
+        return defects
+
+    def _fill_numpy(self) -> tuple:
+        size = self.chunk_size
+        params = self.value_params
+        low, high = params["low"], params["high"]
+        if self.value_distribution == "uniform":
+            values = self._rng.integers(low, high + 1, size)
+        elif self.value_distribution == "normal":
+            values = np.rint(self._rng.normal(params["mean"], params["std"], size))
+        else:
+            values = low + np.floor(self._rng.exponential(params["scale"], size))
+        items = np.clip(values, low, high).astype(np.int64).tolist()
+
+        draws = self._rng.random(size)
+        if self.defect_distribution == "bernoulli":
+            defects = (draws < self.defect_rate).tolist()
+        else:
+            defects = self._burst_defects(draws.tolist())
+
+        priorities = repeat(0)
+        if self.priority_weights:
+            weights = np.asarray(self.priority_weights, dtype=float)
+            priorities = self._rng.choice(len(weights), size, p=weights / weights.sum()).tolist()
+        delays = self._rng.uniform(self.sleep_min, self.sleep_max, size).tolist()
+        return items, defects, priorities, delays
+
+    def _fill_python(self) -> tuple:
+        size = self.chunk_size
+        rng = self._rng
+        draw = rng.random
+        params = self.value_params
+        low, high = params["low"], params["high"]
+        if self.value_distribution == "uniform":
+            items = array('q', rng.choices(range(low, high + 1), k=size))
+        elif self.value_distribution == "normal":
+            gauss, mean, std = rng.gauss, params["mean"], params["std"]
+            items = array('q', [min(max(round(gauss(mean, std)), low), high) for _ in range(size)])
+        else:
+            expovariate, rate = rng.expovariate, 1.0 / params["scale"]
+            items = array('q', [min(low + int(expovariate(rate)), high) for _ in range(size)])
+
+        draws = [draw() for _ in range(size)]
+        if self.defect_distribution == "bernoulli":
+            rate = self.defect_rate
+            defects = [value < rate for value in draws]
+        else:
+            defects = self._burst_defects(draws)
+
+        priorities = repeat(0)
+        if self.priority_weights:
+            priorities = array('b', rng.choices(range(len(self.priority_weights)), weights=self.priority_weights, k=size))
+        sleep_min, span = self.sleep_min, self.sleep_max - self.sleep_min
+        delays = array('d', [sleep_min + span * draw() for _ in range(size)])
+        return items, defects, priorities, delays
+
+    def _fill(self) -> None:
+        columns = self._fill_numpy() if self.backend == "numpy" else self._fill_python()
+        self._chunk = zip(*columns)
+
+    def next(self) -> tuple[int, bool, int, float]:
+        entry = next(self._chunk, None)
+        if entry is None:
+            self._fill()
+            entry = next(self._chunk)
+        return entry
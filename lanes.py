@@ -0,0 +1,117 @@
+import queue
+import time
+from ctypes import c_double, c_int64
+from multiprocessing import BoundedSemaphore, Lock, Queue, Semaphore
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Dict, Optional
+
+from profiling import record
+
+
+class PriorityLanes:
+
+    def __init__(self,
+                 levels: int,
+                 maxsize: int,
+                 policy: str = "strict",
+                 weights: Optional[tuple] = None,
+                 starvation_limit: int = 20):
+        if policy not in ("strict", "weighted"):
+            raise ValueError(f"Nieznana polityka priorytetów: {policy}")
+        self.levels = levels
+        self.policy = policy
+        self.weights = tuple(weights) if weights else tuple(levels - i for i in range(levels))
+        self.starvation_limit = starvation_limit
+        self._lanes = [Queue() for _ in range(levels + 1)]
+        self._slots = BoundedSemaphore(maxsize)
+        self._items = Semaphore(0)
+        self._lock = Lock()
+        self._depths = RawArray(c_int64, levels + 1)
+        self._credits = RawArray(c_int64, levels)
+        self._skipped = RawArray(c_int64, levels)
+        self._wait_lock = Lock()
+        self._wait_totals = RawArray(c_double, levels)
+        self._wait_counts = RawArray(c_int64, levels)
+
+    def _lane_for(self, entry: Any) -> int:
+        if entry is None:
+            return self.levels
+        priority = entry[0][0] if isinstance(entry, list) else entry[0]
+        return min(max(int(priority), 0), self.levels - 1)
+
+    def put(self, entry: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        if not self._slots.acquire(block, timeout):
+            raise queue.Full
+        lane = self._lane_for(entry)
+        self._lanes[lane].put((time.monotonic(), entry))
+        with self._lock:
+            self._depths[lane] += 1
+        self._items.release()
+
+    def _pick_weighted(self, candidates: list[int]) -> int:
+        total = 0
+        for lane in candidates:
+            self._credits[lane] += self.weights[lane]
+            total += self.weights[lane]
+        chosen = max(candidates, key=lambda lane: self._credits[lane])
+        self._credits[chosen] -= total
+        return chosen
+
+    def _claim_lane(self) -> int:
+        waiting = [lane for lane in range(self.levels) if self._depths[lane] > 0]
+        starving = [lane for lane in waiting if self._skipped[lane] >= self.starvation_limit]
+
+        if starving:
+            chosen = starving[-1]
+        elif waiting and self.policy == "weighted":
+            chosen = self._pick_weighted(waiting)
+        elif waiting:
+            chosen = waiting[0]
+        else:
+            chosen = self.levels
+
+        for lane in waiting:
+            self._skipped[lane] = 0 if lane == chosen else self._skipped[lane] + 1
+        self._depths[chosen] -= 1
+        return chosen
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        if not self._items.acquire(block, timeout):
+            raise queue.Empty
+        waited = time.perf_counter()
+        with self._lock:
+            record("lock", waited)
+            lane = self._claim_lane()
+        enqueued_at, entry = self._lanes[lane].get()
+        self._slots.release()
+        if lane < self.levels:
+            self._record_wait(lane, time.monotonic() - enqueued_at)
+        return entry
+
+    def get_nowait(self) -> Any:
+        return self.get(block=False)
+
+    def _record_wait(self, lane: int, wait: float) -> None:
+        waited = time.perf_counter()
+        with self._wait_lock:
+            record("lock", waited)
+            self._wait_totals[lane] += wait
+            self._wait_counts[lane] += 1
+
+    def qsize(self) -> int:
+        return sum(self._depths[:self.levels])
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def lane_stats(self) -> list[Dict[str, Any]]:
+        stats = []
+        for lane in range(self.levels):
+            count = self._wait_counts[lane]
+            stats.append({
+                "priority": lane,
+                "depth": self._depths[lane],
+                "dequeued": count,
+                "avg_wait_ms": round(self._wait_totals[lane] / count * 1000, 2) if count else 0.0
+            })
+        return stats
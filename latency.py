@@ -0,0 +1,198 @@
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+MAX_EXPONENT = 36
+BUCKETS = SUB_BUCKETS + MAX_EXPONENT * HALF_SUB_BUCKETS
+PERCENTILES = (50, 95, 99)
+LATENCY_METRICS = ("end_to_end", "queue_wait", "service")
+LATENCY_MAGIC = b"PCLH"
+ITEM_ID_BITS = 32
+
+_HEADER = struct.Struct("<4sIIII4x")
+
+
+def make_item_id(producer_id: int, sequence: int) -> int:
+    return (producer_id << ITEM_ID_BITS) | sequence
+
+
+def item_producer(item_id: int) -> int:
+    return item_id >> ITEM_ID_BITS
+
+
+def item_sequence(item_id: int) -> int:
+    return item_id & ((1 << ITEM_ID_BITS) - 1)
+
+
+def bucket_index(value_us: int) -> int:
+    if value_us < SUB_BUCKETS:
+        return max(value_us, 0)
+    exponent = value_us.bit_length() - SUB_BUCKET_BITS
+    index = SUB_BUCKETS + (exponent - 1) * HALF_SUB_BUCKETS + (value_us >> exponent) - HALF_SUB_BUCKETS
+    return min(index, BUCKETS - 1)
+
+
+def bucket_value(index: int) -> int:
+    if index < SUB_BUCKETS:
+        return index
+    exponent = (index - SUB_BUCKETS) // HALF_SUB_BUCKETS + 1
+    sub_bucket = (index - SUB_BUCKETS) % HALF_SUB_BUCKETS + HALF_SUB_BUCKETS
+    lower = sub_bucket << exponent
+    return lower + (1 << exponent) // 2
+
+
+class Histogram:
+
+    def __init__(self, counts: Optional[list[int]] = None):
+        self.counts = counts if counts is not None else [0] * BUCKETS
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, percent: float) -> float:
+        total = self.total
+        if total == 0:
+            return 0.0
+        threshold = total * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= threshold:
+                return bucket_value(index) / 1000
+        return bucket_value(BUCKETS - 1) / 1000
+
+    def summary(self) -> Dict[str, float]:
+        summary = {"count": self.total}
+        for percent in PERCENTILES:
+            summary[f"p{percent}_ms"] = round(self.percentile(percent), 3)
+        return summary
+
+
+def _table_size(metrics: int, consumers: int, producers: int, buckets: int) -> int:
+    return _HEADER.size + metrics * consumers * producers * buckets * 8
+
+
+class HistogramTable:
+
+    def __init__(self, buffer: Any, consumers: int, producers: int):
+        self.consumers = consumers
+        self.producers = producers
+        self._cells = memoryview(buffer)[_HEADER.size:].cast('q')
+
+    def _base(self, metric: str, consumer_id: int, producer_id: int) -> int:
+        row = (LATENCY_METRICS.index(metric) * self.consumers + consumer_id - 1) * self.producers + producer_id - 1
+        return row * BUCKETS
+
+    def _rows(self, metric: str) -> list[list[list[int]]]:
+        rows = []
+        for cid in range(1, self.consumers + 1):
+            base = self._base(metric, cid, 1)
+            rows.append([self._cells[base + p * BUCKETS:base + (p + 1) * BUCKETS].tolist() for p in range(self.producers)])
+        return rows
+
+    @staticmethod
+    def _merge(rows: list[list[int]]) -> Histogram:
+        if not rows:
+            return Histogram()
+        return Histogram([sum(column) for column in zip(*rows)])
+
+    def _select(self, rows: list, consumer_id: Optional[int], producer_id: Optional[int]) -> list:
+        consumers = [rows[consumer_id - 1]] if consumer_id else rows
+        if producer_id:
+            return [consumer[producer_id - 1] for consumer in consumers]
+        return [row for consumer in consumers for row in consumer]
+
+    def histogram(self, metric: str, consumer_id: Optional[int] = None, producer_id: Optional[int] = None) -> Histogram:
+        return self._merge(self._select(self._rows(metric), consumer_id, producer_id))
+
+    def summary(self, consumer_id: Optional[int] = None, producer_id: Optional[int] = None) -> Dict[str, Any]:
+        return {metric: self.histogram(metric, consumer_id, producer_id).summary() for metric in LATENCY_METRICS}
+
+    def breakdown(self) -> Dict[str, Any]:
+        rows = {metric: self._rows(metric) for metric in LATENCY_METRICS}
+
+        def summarize(consumer_id: Optional[int] = None, producer_id: Optional[int] = None) -> Dict[str, Any]:
+            return {metric: self._merge(self._select(rows[metric], consumer_id, producer_id)).summary()
+                    for metric in LATENCY_METRICS}
+
+        consumers = []
+        for cid in range(1, self.consumers + 1):
+            summary = summarize(consumer_id=cid)
+            if summary["end_to_end"]["count"]:
+                consumers.append({"id": cid, **summary})
+        producers = []
+        for pid in range(1, self.producers + 1):
+            summary = summarize(producer_id=pid)
+            if summary["end_to_end"]["count"]:
+                producers.append({"id": pid, **summary})
+        return {"overall": summarize(), "consumers": consumers, "producers": producers}
+
+
+class LatencyHistograms(HistogramTable):
+
+    def __init__(self, consumers: int, producers: int, path: Optional[str] = None):
+        self.path = path
+        size = _table_size(len(LATENCY_METRICS), consumers, producers, BUCKETS)
+        header = _HEADER.pack(LATENCY_MAGIC, len(LATENCY_METRICS), consumers, producers, BUCKETS)
+        if path:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(header)
+                f.truncate(size)
+            with open(temp_path, 'r+b') as f:
+                self._buffer = mmap.mmap(f.fileno(), size)
+            os.replace(temp_path, path)
+        else:
+            self._buffer = mmap.mmap(-1, size)
+            self._buffer[:_HEADER.size] = header
+        super().__init__(self._buffer, consumers, producers)
+
+    def record(self, metric: str, consumer_id: int, producer_id: int, seconds: float) -> None:
+        bucket = bucket_index(int(seconds * 1_000_000))
+        self._cells[self._base(metric, consumer_id, producer_id) + bucket] += 1
+
+
+class LatencyReader:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._inode: Optional[int] = None
+        self._table: Optional[HistogramTable] = None
+
+    def _open(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if stat.st_ino == self._inode:
+            return True
+        self._table = None
+        self._inode = None
+        if stat.st_size < _HEADER.size:
+            return False
+
+        with open(self.path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, metrics, consumers, producers, buckets = _HEADER.unpack_from(buffer, 0)
+        expected = _table_size(metrics, consumers, producers, buckets)
+        if (magic != LATENCY_MAGIC or metrics != len(LATENCY_METRICS)
+                or buckets != BUCKETS or len(buffer) < expected):
+            buffer.close()
+            return False
+        self._table = HistogramTable(buffer, consumers, producers)
+        self._inode = stat.st_ino
+        return True
+
+    def breakdown(self) -> Optional[Dict[str, Any]]:
+        if not self._open():
+            return None
+        return self._table.breakdown()
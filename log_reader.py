@@ -0,0 +1,134 @@
+import os
+import re
+import threading
+from typing import Optional
+
+PRODUCED_PATTERN = re.compile(rb'PRODUCENT (\d+).*Wyprodukowano: (\d+)')
+CONSUMED_PATTERN = re.compile(rb'KONSUMENT (\d+).*Przetwarzam: (\d+)')
+FINGERPRINT_SIZE = 64
+
+
+class LogIndex:
+
+    def __init__(self, log_file: str):
+        self.log_file = log_file
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.generation += 1
+        self.offset = 0
+        self._fingerprint = b""
+        self.producers: dict[int, list[int]] = {}
+        self.consumers: dict[int, list[int]] = {}
+
+    def _is_rewritten(self, f, size: int) -> bool:
+        if size < self.offset:
+            return True
+        if self._fingerprint:
+            f.seek(0)
+            return f.read(len(self._fingerprint)) != self._fingerprint
+        return False
+
+    def _index_lines(self, chunk: bytes) -> None:
+        for line in chunk.split(b'\n'):
+            if b'Wyprodukowano' in line:
+                match = PRODUCED_PATTERN.search(line)
+                if match:
+                    self.producers.setdefault(int(match.group(1)), []).append(int(match.group(2)))
+            elif b'Przetwarzam' in line:
+                match = CONSUMED_PATTERN.search(line)
+                if match:
+                    self.consumers.setdefault(int(match.group(1)), []).append(int(match.group(2)))
+
+    def refresh(self) -> None:
+        with self._lock:
+            try:
+                size = os.path.getsize(self.log_file)
+            except OSError:
+                if self.offset:
+                    self._reset()
+                return
+
+            with open(self.log_file, 'rb') as f:
+                if self._is_rewritten(f, size):
+                    self._reset()
+                if size == self.offset:
+                    return
+
+                f.seek(self.offset)
+                chunk = f.read(size - self.offset)
+                end = chunk.rfind(b'\n')
+                if end < 0:
+                    return
+
+                self._index_lines(chunk[:end])
+                self.offset += end + 1
+
+                if len(self._fingerprint) < FINGERPRINT_SIZE:
+                    f.seek(0)
+                    self._fingerprint = f.read(min(FINGERPRINT_SIZE, self.offset))
+
+    def version(self) -> tuple[int, int]:
+        with self._lock:
+            return self.generation, self.offset
+
+    def counts(self) -> tuple[dict[int, int], dict[int, int]]:
+        with self._lock:
+            producers = {pid: len(items) for pid, items in self.producers.items()}
+            consumers = {cid: len(items) for cid, items in self.consumers.items()}
+        return producers, consumers
+
+    def snapshot(self) -> tuple[dict[int, list[int]], dict[int, list[int]]]:
+        with self._lock:
+            producers = {pid: list(items) for pid, items in self.producers.items()}
+            consumers = {cid: list(items) for cid, items in self.consumers.items()}
+        return producers, consumers
+
+
+TAIL_BLOCK_SIZE = 8192
+MAX_FOLLOW_BYTES = 1024 * 1024
+
+
+def _decode_lines(data: bytes) -> list[str]:
+    return [line.decode('utf-8', errors='replace').rstrip() for line in data.split(b'\n')]
+
+
+def tail_lines(log_file: str, lines: int) -> tuple[list[str], int]:
+    with open(log_file, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        position = size
+        data = b""
+        while position > 0 and data.count(b'\n') <= lines:
+            step = min(TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    end = data.rfind(b'\n')
+    if end < 0:
+        return [], size - len(data)
+    offset = size - len(data) + end + 1
+    complete = data[:end].split(b'\n')
+    if position > 0:
+        complete = complete[1:]
+    return _decode_lines(b'\n'.join(complete[-lines:])) if lines > 0 else [], offset
+
+
+def read_lines_after(log_file: str, offset: int, lines: int) -> Optional[tuple[list[str], int]]:
+    size = os.path.getsize(log_file)
+    if offset > size or size - offset > MAX_FOLLOW_BYTES:
+        return None
+    if offset == size:
+        return [], offset
+
+    with open(log_file, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+
+    end = data.rfind(b'\n')
+    if end < 0:
+        return [], offset
+    return _decode_lines(data[:end])[-lines:], offset + end + 1
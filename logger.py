@@ -1,44 +1,141 @@
+import os
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from multiprocessing import Queue
+from typing import Any, Optional
 from pathlib import Path
 
+from profiling import record
+
+LEVELS: dict = {
+    "DBG": 10,
+    "INFO": 20,
+    "WARN": 30,
+    "ERR": 40,
+}
+
 
 class Logger:
-    def __init__(self, log_file: Optional[str] = None, to_file: bool = True, to_console: bool = True):
+    def __init__(self,
+                 log_file: Optional[str] = None,
+                 to_file: bool = True,
+                 to_console: bool = True,
+                 level: str = "DBG",
+                 async_mode: bool = False,
+                 queue_size: int = 10000,
+                 batch_size: int = 256):
         self.log_file = log_file
         self.to_file = to_file
         self.to_console = to_console
-        
+        self.min_level = LEVELS[level]
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._bound = threading.local()
+        self._records: Optional[Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._owner_pid = os.getpid()
+
         if self.log_file and self.to_file:
             Path(self.log_file).parent.mkdir(parents=True, exist_ok=True)
             with open(self.log_file, 'w') as f:
                 f.write("")
 
-    def _format_message(self, prefix: str, message: str) -> str:
-        now = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        if async_mode and (self.to_console or (self.to_file and self.log_file)):
+            self._records = Queue(maxsize=queue_size)
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+
+    def bind_counters(self, counters: Any) -> None:
+        self._bound.counters = counters
+
+    def _format_message(self, prefix: str, message: str, created: Optional[float] = None, args: tuple = ()) -> str:
+        moment = datetime.fromtimestamp(created) if created is not None else datetime.now()
+        now = moment.strftime("%H:%M:%S.%f")[:-3]
+        if args:
+            message = message % args
         return f"[{now}] [{prefix:20}] {message}"
 
-    def log(self, prefix: str, message: str) -> None:
-        formatted = self._format_message(prefix, message)
-        
+    def _write_loop(self) -> None:
+        log_handle = None
+        if self.to_file and self.log_file:
+            log_handle = open(self.log_file, 'a', encoding='utf-8')
+
+        try:
+            running = True
+            while running:
+                records = [self._records.get()]
+                while len(records) < self.batch_size:
+                    try:
+                        records.append(self._records.get_nowait())
+                    except queue.Empty:
+                        break
+
+                if None in records:
+                    running = False
+                    records = [record for record in records if record is not None]
+                if not records:
+                    continue
+
+                text = '\n'.join(self._format_message(prefix, message, created, args)
+                                 for created, prefix, message, args in records)
+                if self.to_console:
+                    print(text, flush=True)
+                if log_handle:
+                    log_handle.write(text + '\n')
+                    log_handle.flush()
+        finally:
+            if log_handle:
+                log_handle.close()
+
+    def log(self, prefix: str, message: str, *args, level: str = "INFO") -> None:
+        if LEVELS[level] < self.min_level:
+            return
+
+        started = time.perf_counter()
+        self._emit(prefix, message, args)
+        record("log", started)
+
+    def _emit(self, prefix: str, message: str, args: tuple) -> None:
+        if self._records is not None:
+            try:
+                self._records.put_nowait((time.time(), prefix, message, args))
+            except queue.Full:
+                counters = getattr(self._bound, "counters", None)
+                if counters is not None:
+                    counters.add("log_dropped")
+                else:
+                    self.dropped += 1
+            return
+
+        formatted = self._format_message(prefix, message, args=args)
+
         if self.to_console:
             print(formatted, flush=True)
-        
+
         if self.to_file and self.log_file:
             with open(self.log_file, 'a', encoding='utf-8') as f:
                 f.write(formatted + '\n')
 
-    def info(self, prefix: str, message: str) -> None:
-        self.log(f"[INFO] {prefix}", message)
+    def info(self, prefix: str, message: str, *args) -> None:
+        self.log(f"[INFO] {prefix}", message, *args, level="INFO")
+
+    def warning(self, prefix: str, message: str, *args) -> None:
+        self.log(f"[WARN] {prefix}", message, *args, level="WARN")
 
-    def warning(self, prefix: str, message: str) -> None:
-        self.log(f"[WARN] {prefix}", message)
+    def error(self, prefix: str, message: str, *args) -> None:
+        self.log(f"[ERR] {prefix}", message, *args, level="ERR")
 
-    def error(self, prefix: str, message: str) -> None:
-        self.log(f"[ERR] {prefix}", message)
+    def debug(self, prefix: str, message: str, *args) -> None:
+        self.log(f"[DBG] {prefix}", message, *args, level="DBG")
 
-    def debug(self, prefix: str, message: str) -> None:
-        self.log(f"[DBG] {prefix}", message)
+    def close(self) -> None:
+        if self._writer is None or os.getpid() != self._owner_pid:
+            return
+        self._records.put(None)
+        self._writer.join()
+        self._writer = None
 
 
 _logger: Optional[Logger] = None
@@ -51,7 +148,13 @@ def get_logger() -> Logger:
     return _logger
 
 
-def init_logger(log_file: Optional[str] = None, to_file: bool = True, to_console: bool = True) -> Logger:
+def init_logger(log_file: Optional[str] = None,
+                to_file: bool = True,
+                to_console: bool = True,
+                level: str = "DBG",
+                async_mode: bool = False,
+                queue_size: int = 10000,
+                batch_size: int = 256) -> Logger:
     global _logger
-    _logger = Logger(log_file, to_file, to_console)
+    _logger = Logger(log_file, to_file, to_console, level, async_mode, queue_size, batch_size)
     return _logger
@@ -1,13 +1,28 @@
+import os
 import signal
 import sys
 import time
-from multiprocessing import Process, Queue, Value, Lock, Manager
+from multiprocessing import Event, Process, Manager
 
 import config
 from logger import init_logger, get_logger
-from producer import Producer
-from consumer import Consumer
 from monitor import SystemMonitor
+from counters import ShardedCounters
+from completion import CompletionTracker
+from lanes import PriorityLanes
+from dispatch import ShardedDispatcher
+from ring import SharedRing
+from wal import DurableQueue
+from backends import create_backend
+from broker import BrokerServer, RemoteWorker
+from autoscaler import ConsumerAutoscaler
+from latency import LatencyHistograms
+from deadletter import DeadLetterLane
+from generation import ItemGenerator, producer_seed
+from replay import TraceRecorder, TraceReplay, scan_trace
+from pacing import AimdController, SpillFile, TokenBucket, OVERLOAD_POLICIES, PACING_POLICIES
+from profiling import ProfileControl, record
+from shared_buffers import create_item_buffers
 
 
 class ProducerConsumerSystem:
@@ -16,23 +31,262 @@ class ProducerConsumerSystem:
         init_logger(
             log_file=config.LOG_FILE,
             to_file=config.LOG_TO_FILE,
-            to_console=config.LOG_TO_CONSOLE
+            to_console=config.LOG_TO_CONSOLE,
+            level=config.LOG_LEVEL,
+            async_mode=config.LOG_ASYNC,
+            queue_size=config.LOG_QUEUE_SIZE,
+            batch_size=config.LOG_BATCH_SIZE
         )
         self.logger = get_logger()
-        self.queue = Queue(maxsize=config.QUEUE_SIZE)
-        self.produced_counter = Value('i', 0)
-        self.consumed_counter = Value('i', 0)
-        self.lock = Lock()
+        self.backend = create_backend(config.EXECUTION_BACKEND)
+        if config.BROKER_ENABLED and self.backend.name == "asyncio":
+            raise ValueError("Tryb brokera wymaga backendu process lub thread")
+        if config.PACING_POLICY not in PACING_POLICIES:
+            raise ValueError(f"Nieznana polityka tempa: {config.PACING_POLICY} (dostępne: {', '.join(PACING_POLICIES)})")
+        if config.OVERLOAD_POLICY not in OVERLOAD_POLICIES:
+            raise ValueError(f"Nieznana polityka przeciążenia: {config.OVERLOAD_POLICY} (dostępne: {', '.join(OVERLOAD_POLICIES)})")
+        self.consumer_slots = config.CONSUMERS_COUNT
+        if config.AUTOSCALE_ENABLED:
+            self.consumer_slots = max(config.CONSUMERS_COUNT, config.AUTOSCALE_MAX_CONSUMERS)
+        self.local_consumer_slots = self.consumer_slots
+        self.producer_slots = config.PRODUCERS_COUNT
+        if config.BROKER_ENABLED:
+            self.consumer_slots += config.BROKER_REMOTE_CONSUMERS
+            self.producer_slots += config.BROKER_REMOTE_PRODUCERS
+        self.queue = self._create_queue()
+        self.producer_counters = ShardedCounters(self.producer_slots)
+        self.consumer_counters = ShardedCounters(self.consumer_slots)
+        self.produced_counter = self.producer_counters.view("produced")
+        self.consumed_counter = self.consumer_counters.view("accepted")
+        self.completion = CompletionTracker(
+            self.producer_counters,
+            self.consumer_counters,
+            replayed=self.queue.replayed if isinstance(self.queue, DurableQueue) else 0
+        )
+        self.latency = LatencyHistograms(self.consumer_slots, self.producer_slots, config.LATENCY_FILE)
+        self.profiling = None
+        self.monitor_timers = None
+        if config.PROFILING_ENABLED:
+            self.profiling = ProfileControl(config.PRODUCERS_COUNT, self.consumer_slots, config.PROFILE_FILE, config.PROFILE_DIR)
+            self.monitor_timers = self.profiling.timers("monitor")
+        self.dead_letter = None
+        if config.DEAD_LETTER_ENABLED:
+            self.dead_letter = DeadLetterLane(config.PRODUCERS_COUNT, config.DEAD_LETTER_CAPACITY, config.DEAD_LETTER_FILE)
         
-        self.manager = Manager()
-        self.produced_items = self.manager.dict({i + 1: self.manager.list() for i in range(config.PRODUCERS_COUNT)})
-        self.consumed_items = self.manager.dict({i + 1: self.manager.list() for i in range(config.CONSUMERS_COUNT)})
+        self.items_counts = {i + 1: config.ITEMS_PER_PRODUCER for i in range(config.PRODUCERS_COUNT)}
+        self.trace_origin = 0.0
+        self.trace_span = 0.0
+        if config.GENERATION_MODE == "trace":
+            self.trace_origin, self.trace_span, self.items_counts = scan_trace(config.TRACE_FILE, config.PRODUCERS_COUNT)
+        self.recorder = None
+        if config.TRACE_RECORD_FILE:
+            if config.GENERATION_MODE == "trace" and os.path.abspath(config.TRACE_RECORD_FILE) == os.path.abspath(config.TRACE_FILE):
+                raise ValueError("TRACE_RECORD_FILE nie może wskazywać na odtwarzany ślad")
+            self.recorder = TraceRecorder(config.TRACE_RECORD_FILE)
+
+        self.manager = None
+        self.item_buffers = not self.backend.shares_memory and config.ITEM_STORAGE == "shared"
+        if self.backend.shares_memory:
+            self.produced_items = {i + 1: [] for i in range(self.producer_slots)}
+            self.consumed_items = {i + 1: [] for i in range(self.consumer_slots)}
+        elif self.item_buffers:
+            remote_items = (self.producer_slots - config.PRODUCERS_COUNT) * config.ITEMS_PER_PRODUCER
+            total_items = sum(self.items_counts.values()) + remote_items
+            if isinstance(self.queue, DurableQueue):
+                total_items += self.queue.replayed
+            producer_capacity = max(self.items_counts.values(), default=0)
+            if remote_items:
+                producer_capacity = max(producer_capacity, config.ITEMS_PER_PRODUCER)
+            self.produced_items = create_item_buffers(
+                self.producer_slots,
+                config.SHARED_BUFFER_CAPACITY or producer_capacity
+            )
+            self.consumed_items = create_item_buffers(
+                self.consumer_slots,
+                config.SHARED_BUFFER_CAPACITY or total_items
+            )
+        else:
+            self.manager = Manager()
+            self.produced_items = self.manager.dict({i + 1: self.manager.list() for i in range(self.producer_slots)})
+            self.consumed_items = self.manager.dict({i + 1: self.manager.list() for i in range(self.consumer_slots)})
         
         self.producers: list[Process] = []
         self.consumers: list[Process] = []
+        self.active_consumers: dict[int, tuple[Process, Event]] = {}
+        self.retiring_consumers: dict[int, Process] = {}
+        self.autoscaler: ConsumerAutoscaler = None
+        if config.AUTOSCALE_ENABLED:
+            self.autoscaler = ConsumerAutoscaler(
+                min_consumers=config.AUTOSCALE_MIN_CONSUMERS,
+                max_consumers=self.local_consumer_slots,
+                cooldown=config.AUTOSCALE_COOLDOWN,
+                up_queue_size=config.AUTOSCALE_UP_QUEUE_SIZE,
+                up_lag_trend=config.AUTOSCALE_UP_LAG_TREND,
+                down_utilization=config.AUTOSCALE_DOWN_UTILIZATION
+            )
         self.monitor: SystemMonitor = None
+        self.broker: BrokerServer = None
         self.last_monitor_time = time.time()
 
+    def _create_queue(self):
+        transport = self._create_transport()
+        if not config.DURABLE_QUEUE:
+            return transport
+        if isinstance(transport, ShardedDispatcher) or config.BROKER_ENABLED or self.backend.name == "asyncio":
+            raise ValueError("Trwała kolejka wymaga wspólnej kolejki (bez DISPATCH_MODE='sharded'), bez brokera i backendu asyncio")
+        return DurableQueue(
+            transport,
+            journal=self.backend.create_queue(config.QUEUE_SIZE),
+            acks=self.backend.create_queue(0),
+            directory=config.WAL_DIR,
+            sync_mode=config.WAL_SYNC_MODE,
+            group_max=config.WAL_GROUP_MAX,
+            group_wait=config.WAL_GROUP_WAIT,
+            sync_interval=config.WAL_SYNC_INTERVAL,
+            segment_bytes=config.WAL_SEGMENT_BYTES,
+            max_segments=config.WAL_MAX_SEGMENTS
+        )
+
+    def _create_transport(self):
+        if config.DISPATCH_MODE == "sharded":
+            return ShardedDispatcher(
+                shards=self.consumer_slots,
+                shard_size=config.SHARD_QUEUE_SIZE,
+                producers=config.PRODUCERS_COUNT,
+                work_stealing=config.WORK_STEALING,
+                service_time_alpha=config.SERVICE_TIME_ALPHA
+            )
+        if config.PRIORITY_LANES_ENABLED:
+            return PriorityLanes(
+                levels=config.PRIORITY_LEVELS,
+                maxsize=config.QUEUE_SIZE,
+                policy=config.PRIORITY_POLICY,
+                weights=config.PRIORITY_WEIGHTS,
+                starvation_limit=config.PRIORITY_STARVATION_LIMIT
+            )
+        if config.QUEUE_TRANSPORT == "ring":
+            return SharedRing(config.QUEUE_SIZE)
+        return self.backend.create_queue(config.QUEUE_SIZE)
+
+    def _create_generator(self, producer_id: int, defect_rate: float):
+        if config.GENERATION_MODE in ("random", "trace"):
+            return None
+        if config.GENERATION_MODE != "chunked":
+            raise ValueError(f"Nieznany tryb generowania: {config.GENERATION_MODE} (dostępne: random, chunked, trace)")
+        return ItemGenerator(
+            seed=producer_seed(config.GENERATION_SEED, producer_id),
+            defect_rate=defect_rate,
+            chunk_size=config.GENERATION_CHUNK_SIZE,
+            value_distribution=config.VALUE_DISTRIBUTION,
+            value_params=config.VALUE_DISTRIBUTION_PARAMS,
+            defect_distribution=config.DEFECT_DISTRIBUTION,
+            burst_length=config.DEFECT_BURST_LENGTH,
+            priority_weights=config.PRIORITY_DISTRIBUTIONS.get(producer_id),
+            sleep_min=config.PRODUCER_SLEEP_MIN,
+            sleep_max=config.PRODUCER_SLEEP_MAX,
+            backend=config.GENERATION_BACKEND
+        )
+
+    def _producer_timeout(self) -> float:
+        if config.GENERATION_MODE == "trace" and config.TRACE_SPEED > 0:
+            return self.trace_span / config.TRACE_SPEED + config.SHUTDOWN_TIMEOUT
+        return config.SHUTDOWN_TIMEOUT
+
+    def _create_trace(self, producer_id: int, started_at: float):
+        if config.GENERATION_MODE != "trace":
+            return None
+        return TraceReplay(
+            config.TRACE_FILE,
+            producer_id,
+            config.PRODUCERS_COUNT,
+            origin=self.trace_origin,
+            started_at=started_at,
+            speed=config.TRACE_SPEED
+        )
+
+    def _create_pacer(self):
+        if config.PACING_POLICY == "token_bucket":
+            return TokenBucket(config.PACING_RATE, config.PACING_BURST)
+        if config.PACING_POLICY == "aimd":
+            return AimdController(
+                config.STATS_SEGMENT_FILE,
+                rate=config.PACING_RATE,
+                burst=config.PACING_BURST,
+                target_queue_size=config.AIMD_TARGET_QUEUE_SIZE,
+                min_rate=config.AIMD_MIN_RATE,
+                max_rate=config.AIMD_MAX_RATE,
+                increase=config.AIMD_INCREASE,
+                decrease=config.AIMD_DECREASE
+            )
+        return None
+
+    def _create_spill(self, producer_id: int):
+        if config.OVERLOAD_POLICY != "spill":
+            return None
+        return SpillFile(os.path.join(config.SPILL_DIR, f"spill-{producer_id}.bin"))
+
+    def _create_timers(self, role: str, worker_id: int):
+        return self.profiling.timers(role, worker_id) if self.profiling else None
+
+    def _producer_queue(self, producer_id: int):
+        if isinstance(self.queue, ShardedDispatcher):
+            return self.backend.worker_queue(self.queue.for_producer(producer_id))
+        return self.backend.worker_queue(self.queue)
+
+    def _consumer_queue(self, consumer_id: int):
+        if isinstance(self.queue, ShardedDispatcher):
+            self.queue.set_active(consumer_id, True)
+            return self.backend.worker_queue(self.queue.for_consumer(consumer_id))
+        return self.backend.worker_queue(self.queue)
+
+    def _worker_target(self, worker, role: str):
+        if self.broker is None:
+            return worker
+        return RemoteWorker(
+            worker,
+            role,
+            self.broker.host,
+            self.broker.port,
+            credit_window=config.BROKER_CREDIT_WINDOW,
+            wire_batch=config.BROKER_WIRE_BATCH,
+            report_interval=config.BROKER_REPORT_INTERVAL
+        )
+
+    def _start_broker(self) -> None:
+        self.broker = BrokerServer(
+            config.BROKER_HOST,
+            config.BROKER_PORT,
+            producer_queue=self._producer_queue,
+            consumer_queue=self._consumer_queue,
+            requeue=self.queue.put,
+            producer_counters=self.producer_counters,
+            consumer_counters=self.consumer_counters,
+            produced_items=self.produced_items,
+            consumed_items=self.consumed_items,
+            latency=self.latency,
+            completion=self.completion,
+            credit_window=config.BROKER_CREDIT_WINDOW,
+            wire_batch=config.BROKER_WIRE_BATCH
+        )
+        self.broker.start()
+        self.logger.info("SYSTEM", f"Broker nasłuchuje na {self.broker.host}:{self.broker.port}")
+
+    def _remote_producers_running(self) -> bool:
+        if self.broker is None or self.producer_slots == config.PRODUCERS_COUNT:
+            return False
+        finished = self.broker.finished_producers()
+        return any(pid not in finished for pid in range(config.PRODUCERS_COUNT + 1, self.producer_slots + 1))
+
+    def _stop_consumers(self) -> None:
+        if self.broker:
+            self.broker.stop_consumers()
+            return
+        for consumer_id in self.active_consumers:
+            if isinstance(self.queue, ShardedDispatcher):
+                self.queue.stop_consumer(consumer_id)
+            else:
+                self.queue.put(None)
+
     def setup_signal_handlers(self) -> None:
         def signal_handler(sig, frame):
             self.logger.warning("SYSTEM", "Otrzymano sygnał przerwania")
@@ -42,12 +296,131 @@ class ProducerConsumerSystem:
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
 
+    def _tick_monitor(self) -> None:
+        if self.monitor_timers:
+            self.monitor_timers.poll()
+        if time.time() - self.last_monitor_time >= config.MONITOR_INTERVAL:
+            self.monitor.collect_stats()
+            self.last_monitor_time = time.time()
+            if self.autoscaler:
+                self._autoscale()
+                self._reroute_retired()
+
+    def _wait_for_completion(self) -> None:
+        self.completion.seal(self.produced_counter.value)
+        counts = self.completion.counts()
+        self.logger.info("SYSTEM", f"Oczekiwanie na opróżnienie kolejki (w toku: {counts['in_flight']})")
+
+        while True:
+            next_tick = self.last_monitor_time + config.MONITOR_INTERVAL - time.time()
+            waited = time.perf_counter()
+            done = self.completion.wait(timeout=max(next_tick, 0.0))
+            record("sleep", waited)
+            if done:
+                break
+            self._tick_monitor()
+            if not any(c.is_alive() for c, _ in self.active_consumers.values()):
+                self.logger.warning("SYSTEM", "Brak aktywnych konsumentów - przerwano oczekiwanie")
+                break
+
+        counts = self.completion.counts()
+        self.logger.info(
+            "SYSTEM",
+            f"Zakończono przetwarzanie (zaakceptowane: {counts['accepted']}, odrzucone: {counts['rejected']}, w toku: {counts['in_flight']})"
+        )
+
+    def _spawn_consumer(self, consumer_id: int) -> None:
+        sleep_min, sleep_max = config.CONSUMER_SPEEDS.get(consumer_id, (0.5, 1.0))
+        stop_event = self.backend.create_event() if self.autoscaler else None
+        
+        consumer = self.backend.consumer_class(
+            consumer_id=consumer_id,
+            queue=self._consumer_queue(consumer_id),
+            counters=self.consumer_counters.slot(consumer_id),
+            consumed_items=self.consumed_items,
+            sleep_min=sleep_min,
+            sleep_max=sleep_max,
+            stop_event=stop_event,
+            stop_poll_interval=config.CONSUMER_STOP_POLL_INTERVAL,
+            completion=self.completion,
+            latency=self.latency,
+            timers=self._create_timers("consumer", consumer_id),
+            priority_levels=config.PRIORITY_LEVELS
+        )
+        c = self.backend.start(self._worker_target(consumer, "consumer"), f"KONSUMENT-{consumer_id}")
+        self.consumers.append(c)
+        self.retiring_consumers.pop(consumer_id, None)
+        self.active_consumers[consumer_id] = (c, stop_event)
+        self.monitor.active_consumers = len(self.active_consumers)
+
+    def _autoscale(self) -> None:
+        now = time.time()
+        active = len(self.active_consumers)
+        direction, reason = self.autoscaler.decide(active, self.monitor.get_scaling_signals(active), now)
+        if direction > 0:
+            free_ids = [cid for cid in range(1, self.local_consumer_slots + 1)
+                        if cid not in self.active_consumers
+                        and not (cid in self.retiring_consumers and self.retiring_consumers[cid].is_alive())]
+            if not free_ids:
+                return
+            consumer_id = free_ids[0]
+            self._spawn_consumer(consumer_id)
+            event = self.autoscaler.record(direction, consumer_id, len(self.active_consumers), reason, now)
+            self.logger.info("AUTOSKALER", f"Dodano KONSUMENTA {consumer_id} ({reason}), aktywnych: {event['active_consumers']}")
+        elif direction < 0:
+            consumer_id = max(self.active_consumers)
+            process, stop_event = self.active_consumers.pop(consumer_id)
+            stop_event.set()
+            self.retiring_consumers[consumer_id] = process
+            if isinstance(self.queue, ShardedDispatcher):
+                self.queue.set_active(consumer_id, False)
+            self.monitor.active_consumers = len(self.active_consumers)
+            event = self.autoscaler.record(direction, consumer_id, len(self.active_consumers), reason, now)
+            self.logger.info("AUTOSKALER", f"Wygaszono KONSUMENTA {consumer_id} ({reason}), aktywnych: {event['active_consumers']}")
+        else:
+            return
+        self.monitor.record_scale_event(event)
+
+    def _reroute_retired(self) -> None:
+        if not isinstance(self.queue, ShardedDispatcher):
+            return
+        retired = [consumer_id for consumer_id, process in self.retiring_consumers.items() if not process.is_alive()]
+        moved = self.queue.reroute(retired)
+        if moved:
+            self.logger.info("AUTOSKALER", f"Przekierowano {moved} elementów z kolejek wygaszonych konsumentów {retired}")
+
     def start(self) -> None:
         self.logger.info("SYSTEM", "=" * 60)
         self.logger.info("SYSTEM", "Uruchamianie systemu producent-konsument")
-        self.logger.info("SYSTEM", f"Producenci: {config.PRODUCERS_COUNT}, Konsumenci: {config.CONSUMERS_COUNT}")
-        self.logger.info("SYSTEM", f"Elementy per producent: {config.ITEMS_PER_PRODUCER}")
-        self.logger.info("SYSTEM", f"Rozmiar kolejki: {config.QUEUE_SIZE}")
+        self.logger.info("SYSTEM", f"Producenci: {config.PRODUCERS_COUNT}, Konsumenci: {config.CONSUMERS_COUNT} (backend: {self.backend.name})")
+        if config.GENERATION_MODE == "trace":
+            speed = f"x{config.TRACE_SPEED}" if config.TRACE_SPEED > 0 else "maksymalna"
+            self.logger.info("SYSTEM", f"Odtwarzanie śladu {config.TRACE_FILE}: {sum(self.items_counts.values())} rekordów (prędkość: {speed})")
+        else:
+            self.logger.info("SYSTEM", f"Elementy per producent: {config.ITEMS_PER_PRODUCER}")
+        if self.recorder:
+            self.logger.info("SYSTEM", f"Zapis przybyć do {config.TRACE_RECORD_FILE}")
+        self.logger.info("SYSTEM", f"Rozmiar kolejki: {config.QUEUE_SIZE} (transport: {config.QUEUE_TRANSPORT})")
+        if config.DISPATCH_MODE == "sharded":
+            self.logger.info("SYSTEM", f"Kolejki per konsument: {config.SHARD_QUEUE_SIZE} miejsc, kradzież pracy: {config.WORK_STEALING}")
+        elif config.PRIORITY_LANES_ENABLED:
+            self.logger.info("SYSTEM", f"Kolejki priorytetowe: {config.PRIORITY_LEVELS} poziomy, polityka {config.PRIORITY_POLICY}")
+        if config.AUTOSCALE_ENABLED:
+            self.logger.info("SYSTEM", f"Autoskalowanie konsumentów: {config.AUTOSCALE_MIN_CONSUMERS}-{self.local_consumer_slots}")
+        if isinstance(self.queue, DurableQueue):
+            self.logger.info("SYSTEM", f"Trwała kolejka: {config.WAL_DIR} (fsync: {config.WAL_SYNC_MODE}, odtworzono: {self.queue.replayed})")
+        if config.GENERATION_MODE == "chunked":
+            self.logger.info("SYSTEM", f"Generowanie porcjami po {config.GENERATION_CHUNK_SIZE} (ziarno: {config.GENERATION_SEED}, rozkład: {config.VALUE_DISTRIBUTION}/{config.DEFECT_DISTRIBUTION})")
+        if config.PACING_POLICY != "none":
+            self.logger.info("SYSTEM", f"Tempo producentów: {config.PACING_POLICY} ({config.PACING_RATE} el/s, paczka {config.PACING_BURST})")
+        if config.OVERLOAD_POLICY != "block":
+            self.logger.info("SYSTEM", f"Przeciążenie kolejki: {config.OVERLOAD_POLICY} po {config.PUT_TIMEOUT}s oczekiwania")
+        if self.dead_letter:
+            self.logger.info("SYSTEM", f"Wadliwe elementy kierowane do kolejki odrzutów ({config.DEAD_LETTER_CAPACITY} miejsc per producent)")
+        if self.profiling:
+            self.logger.info("SYSTEM", f"Liczniki faz w {config.PROFILE_FILE}, profile na żądanie w {config.PROFILE_DIR}/ (POST /api/profile)")
+        if config.BATCH_ENABLED:
+            self.logger.info("SYSTEM", f"Tryb wsadowy: maks. {config.BATCH_MAX_SIZE} elementów, {config.BATCH_MAX_LINGER}s oczekiwania")
         self.logger.info("SYSTEM", "=" * 60)
 
         self.setup_signal_handlers()
@@ -56,66 +429,87 @@ class ProducerConsumerSystem:
             self.produced_counter,
             self.consumed_counter,
             self.queue,
+            producer_counters=self.producer_counters,
+            consumer_counters=self.consumer_counters,
             monitor_interval=config.MONITOR_INTERVAL,
-            stats_file=config.STATS_FILE
+            stats_file=config.STATS_FILE,
+            history_file=config.HISTORY_FILE,
+            history_capacities=config.HISTORY_CAPACITIES,
+            rate_window=config.RATE_WINDOW,
+            stats_segment_file=config.STATS_SEGMENT_FILE,
+            latency=self.latency,
+            dead_letter=self.dead_letter,
+            profiling=self.profiling,
+            produced_buffers=self.produced_items if self.item_buffers else None,
+            consumed_buffers=self.consumed_items if self.item_buffers else None
         )
+        if self.monitor_timers:
+            self.monitor_timers.bind()
         self.logger.info("SYSTEM", "Monitor uruchomiony")
+        if isinstance(self.queue, DurableQueue):
+            self.queue.start()
+        if config.BROKER_ENABLED:
+            self._start_broker()
+        if self.recorder:
+            self.recorder.reset()
+        started_at = time.monotonic()
         for i in range(config.PRODUCERS_COUNT):
             producer_id = i + 1
             defect_rate = config.DEFECT_RATES.get(producer_id, 0.0)
             
-            producer = Producer(
+            producer = self.backend.producer_class(
                 producer_id=producer_id,
-                queue=self.queue,
-                items_count=config.ITEMS_PER_PRODUCER,
-                produced_counter=self.produced_counter,
+                queue=self._producer_queue(producer_id),
+                items_count=self.items_counts[producer_id],
+                counters=self.producer_counters.slot(producer_id),
                 produced_items=self.produced_items,
                 sleep_min=config.PRODUCER_SLEEP_MIN,
                 sleep_max=config.PRODUCER_SLEEP_MAX,
-                lock=self.lock,
-                defect_rate=defect_rate
+                defect_rate=defect_rate,
+                batch_size=config.BATCH_MAX_SIZE if config.BATCH_ENABLED else 1,
+                batch_linger=config.BATCH_MAX_LINGER,
+                priority_weights=config.PRIORITY_DISTRIBUTIONS.get(producer_id),
+                dead_letter=self.dead_letter,
+                generator=self._create_generator(producer_id, defect_rate),
+                trace=self._create_trace(producer_id, started_at),
+                recorder=self.recorder,
+                pacer=self._create_pacer(),
+                put_timeout=config.PUT_TIMEOUT,
+                overload_policy=config.OVERLOAD_POLICY,
+                spill=self._create_spill(producer_id),
+                timers=self._create_timers("producer", producer_id)
             )
-            p = Process(target=producer.run)
+            p = self.backend.start(self._worker_target(producer, "producer"), f"PRODUCENT-{producer_id}")
             self.producers.append(p)
-            p.start()
             self.logger.info("SYSTEM", f"Uruchomiono PRODUCENTA {i + 1} (szansa wady: {defect_rate*100:.0f}%)")
 
-        for i in range(config.CONSUMERS_COUNT):
-            consumer_id = i + 1
-            sleep_min, sleep_max = config.CONSUMER_SPEEDS.get(consumer_id, (0.5, 1.0))
-            
-            consumer = Consumer(
-                consumer_id=consumer_id,
-                queue=self.queue,
-                consumed_counter=self.consumed_counter,
-                consumed_items=self.consumed_items,
-                sleep_min=sleep_min,
-                sleep_max=sleep_max,
-                lock=self.lock
-            )
-            c = Process(target=consumer.run)
-            self.consumers.append(c)
-            c.start()
+        initial_consumers = config.CONSUMERS_COUNT
+        if self.autoscaler:
+            initial_consumers = min(max(initial_consumers, config.AUTOSCALE_MIN_CONSUMERS), self.local_consumer_slots)
+        for i in range(initial_consumers):
+            self._spawn_consumer(i + 1)
             self.logger.info("SYSTEM", f"Uruchomiono KONSUMENTA {i + 1}")
 
+        deadline = time.time() + self._producer_timeout()
+        while (any(p.is_alive() for p in self.producers) or self._remote_producers_running()) and time.time() < deadline:
+            self._tick_monitor()
+            waited = time.perf_counter()
+            time.sleep(0.1)
+            record("sleep", waited)
+
         for p in self.producers:
-            p.join(timeout=config.SHUTDOWN_TIMEOUT)
+            p.join(timeout=0)
             if p.is_alive():
                 self.logger.warning("SYSTEM", f"Producent {p.pid} nie zakończył się w time - terminate")
                 p.terminate()
+        if self._remote_producers_running():
+            self.logger.warning("SYSTEM", "Zdalni producenci nie zakończyli pracy w czasie - pominięto ich elementy w oczekiwaniu")
 
         self.logger.info("SYSTEM", "Wszyscy producenci zakończyli pracę")
 
-        while self.consumed_counter.value < self.produced_counter.value:
-            if time.time() - self.last_monitor_time >= config.MONITOR_INTERVAL:
-                self.monitor.collect_stats()
-                self.last_monitor_time = time.time()
-            time.sleep(0.1)
+        self._wait_for_completion()
 
-        time.sleep(1)
-
-        for _ in range(config.CONSUMERS_COUNT):
-            self.queue.put(None)
+        self._stop_consumers()
 
         for c in self.consumers:
             c.join(timeout=config.SHUTDOWN_TIMEOUT)
@@ -140,6 +534,20 @@ class ProducerConsumerSystem:
                 consumed_items=self.consumed_items
             )
 
+    def close(self) -> None:
+        if self.monitor_timers:
+            self.monitor_timers.finish()
+        transport = self.queue
+        if isinstance(transport, DurableQueue):
+            transport.shutdown()
+            transport = transport.inner
+        if isinstance(transport, SharedRing):
+            transport.close()
+        if self.broker:
+            self.broker.close()
+        self.backend.close()
+        self.logger.close()
+
 
 def main():
     system = ProducerConsumerSystem()
@@ -153,6 +561,8 @@ def main():
         system.logger.error("SYSTEM", f"Błąd krityczny: {e}")
         system.shutdown()
         raise
+    finally:
+        system.close()
 
 
 if __name__ == "__main__":
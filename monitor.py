@@ -1,25 +1,199 @@
 import json
+import os
 import time
-from multiprocessing import Value, Queue
+from collections import deque
+from multiprocessing import Queue
 from typing import Dict, Any
 from datetime import datetime
+from counters import CounterView, ShardedCounters
+from timeseries import TimeSeries
+from stats_segment import StatsSegment
+from latency import LatencyHistograms
+from deadletter import DeadLetterLane
+from profiling import ProfileControl, record
+from shared_buffers import SharedItemBuffer
+from logger import get_logger
+
+BOTTLENECK_BLOCKED_RATIO = 0.1
 
 
 class SystemMonitor:
 
     def __init__(self, 
-                 produced_counter: Value,
-                 consumed_counter: Value,
+                 produced_counter: CounterView,
+                 consumed_counter: CounterView,
                  queue: Queue,
+                 producer_counters: ShardedCounters = None,
+                 consumer_counters: ShardedCounters = None,
                  monitor_interval: float = 1.0,
-                 stats_file: str = "stats.json"):
+                 stats_file: str = "stats.json",
+                 history_file: str = None,
+                 history_capacities: Dict[int, int] = None,
+                 rate_window: float = 10.0,
+                 stats_segment_file: str = None,
+                 latency: LatencyHistograms = None,
+                 dead_letter: DeadLetterLane = None,
+                 profiling: ProfileControl = None,
+                 produced_buffers: Dict[int, SharedItemBuffer] = None,
+                 consumed_buffers: Dict[int, SharedItemBuffer] = None):
         self.produced_counter = produced_counter
         self.consumed_counter = consumed_counter
         self.queue = queue
+        self.producer_counters = producer_counters
+        self.consumer_counters = consumer_counters
         self.monitor_interval = monitor_interval
         self.stats_file = stats_file
         self.start_time = time.time()
-        self.history: list[Dict[str, Any]] = []
+        self.rate_window = rate_window
+        self.history = TimeSeries(history_capacities or {1: 3600, 10: 8640, 60: 10080}, history_file)
+        self.segment = StatsSegment(
+            stats_segment_file, len(self._priority_stats()), len(self._shard_stats())
+        ) if stats_segment_file else None
+        self.latency = latency
+        self.dead_letter = dead_letter
+        self.profiling = profiling
+        self.produced_buffers = produced_buffers
+        self.consumed_buffers = consumed_buffers
+        self.active_consumers = 0
+        self.scale_events: deque = deque(maxlen=100)
+        self._busy_sample = (self.start_time, 0.0)
+
+    def _quality_stats(self) -> Dict[str, int]:
+        stats = {"defective": 0, "dead_lettered": 0, "shed": 0, "accepted": 0, "rejected": 0, "in_flight": 0}
+        if self.producer_counters:
+            stats["defective"] = self.producer_counters.total("defective")
+            stats["dead_lettered"] = self.producer_counters.total("dead_lettered")
+            stats["shed"] = self.producer_counters.total("shed")
+        if self.consumer_counters:
+            stats["accepted"] = self.consumer_counters.total("accepted")
+            stats["rejected"] = self.consumer_counters.total("rejected")
+        replayed = self._durability_stats().get("replayed", 0)
+        stats["in_flight"] = max(
+            self.produced_counter.value + replayed - stats["dead_lettered"] - stats["accepted"] - stats["rejected"], 0
+        )
+        return stats
+
+    def _priority_stats(self) -> list[Dict[str, Any]]:
+        lane_stats = getattr(self.queue, "lane_stats", None)
+        return lane_stats() if lane_stats else []
+
+    def _autoscaling_stats(self) -> Dict[str, Any]:
+        return {
+            "active_consumers": self.active_consumers,
+            "scale_ups": sum(1 for event in self.scale_events if event["action"] == "scale_up"),
+            "scale_downs": sum(1 for event in self.scale_events if event["action"] == "scale_down"),
+            "events": list(self.scale_events)[-10:]
+        }
+
+    def record_scale_event(self, event: Dict[str, Any]) -> None:
+        self.scale_events.append(event)
+
+    def get_scaling_signals(self, active_consumers: int) -> Dict[str, float]:
+        now = time.time()
+        busy = self.consumer_counters.total("busy_us") / 1_000_000 if self.consumer_counters else 0.0
+        last_time, last_busy = self._busy_sample
+        self._busy_sample = (now, busy)
+        elapsed = now - last_time
+        utilization = (busy - last_busy) / (elapsed * active_consumers) if elapsed > 0 and active_consumers else 0.0
+        return {
+            "queue_size": self.queue.qsize(),
+            "lag_trend_per_sec": self.history.rates(self.rate_window)["lag_trend_per_sec"],
+            "utilization": round(min(utilization, 1.0), 3)
+        }
+
+    def _latency_stats(self) -> Dict[str, Any]:
+        return self.latency.breakdown() if self.latency else {}
+
+    def _defect_stats(self) -> list[Dict[str, Any]]:
+        if not self.producer_counters:
+            return []
+        produced = self.producer_counters.per_shard("produced")
+        defective = self.producer_counters.per_shard("defective")
+        dead_lettered = self.producer_counters.per_shard("dead_lettered")
+        lanes = {lane["producer_id"]: lane for lane in self.dead_letter.lane_stats()} if self.dead_letter else {}
+        stats = []
+        for producer_id, count in produced.items():
+            lane = lanes.get(producer_id, {})
+            stats.append({
+                "producer_id": producer_id,
+                "produced": count,
+                "defective": defective[producer_id],
+                "defect_rate_percent": round(defective[producer_id] / count * 100, 2) if count else 0.0,
+                "dead_lettered": dead_lettered[producer_id],
+                "stored": lane.get("stored", 0),
+                "dropped": lane.get("dropped", 0)
+            })
+        return stats
+
+    def _pacing_stats(self) -> Dict[str, Any]:
+        if not self.producer_counters:
+            return {}
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        blocked = self.producer_counters.per_shard("blocked_us")
+        shed = self.producer_counters.per_shard("shed")
+        spilled = self.producer_counters.per_shard("spilled")
+        producers = [
+            {
+                "producer_id": producer_id,
+                "blocked_ms": round(blocked[producer_id] / 1000, 1),
+                "blocked_ratio": round(min(blocked[producer_id] / 1_000_000 / elapsed, 1.0), 3),
+                "shed": shed[producer_id],
+                "spilled": spilled[producer_id]
+            }
+            for producer_id in blocked
+        ]
+        blocked_ratio = round(sum(p["blocked_ratio"] for p in producers) / len(producers), 3) if producers else 0.0
+        return {
+            "blocked_ratio": blocked_ratio,
+            "bottleneck": "consumers" if blocked_ratio >= BOTTLENECK_BLOCKED_RATIO else "producers",
+            "spilled": sum(spilled.values()),
+            "producers": producers
+        }
+
+    def _replay_stats(self) -> Dict[str, Any]:
+        if not self.producer_counters:
+            return {}
+        drift = self.producer_counters.per_shard("drift_us")
+        if not any(drift.values()):
+            return {}
+        produced = self.producer_counters.per_shard("produced")
+        total = sum(produced.values())
+        return {
+            "avg_drift_ms": round(sum(drift.values()) / total / 1000, 3) if total else 0.0,
+            "producers": [
+                {
+                    "producer_id": producer_id,
+                    "replayed": produced[producer_id],
+                    "avg_drift_ms": round(drift[producer_id] / produced[producer_id] / 1000, 3) if produced[producer_id] else 0.0
+                }
+                for producer_id in produced
+            ]
+        }
+
+    def _profiling_stats(self) -> Dict[str, Any]:
+        return self.profiling.breakdown() if self.profiling else {}
+
+    def _buffer_stats(self) -> Dict[str, int]:
+        return {
+            "produced_dropped": sum(buffer.dropped for buffer in (self.produced_buffers or {}).values()),
+            "consumed_dropped": sum(buffer.dropped for buffer in (self.consumed_buffers or {}).values()),
+            "log_dropped": self._log_dropped()
+        }
+
+    def _log_dropped(self) -> int:
+        dropped = get_logger().dropped
+        for counters in (self.producer_counters, self.consumer_counters):
+            if counters:
+                dropped += counters.total("log_dropped")
+        return dropped
+
+    def _durability_stats(self) -> Dict[str, Any]:
+        wal_stats = getattr(self.queue, "wal_stats", None)
+        return wal_stats() if wal_stats else {}
+
+    def _shard_stats(self) -> list[Dict[str, Any]]:
+        shard_stats = getattr(self.queue, "shard_stats", None)
+        return shard_stats() if shard_stats else []
 
     def get_stats(self) -> Dict[str, Any]:
         elapsed = time.time() - self.start_time
@@ -34,9 +208,27 @@ class SystemMonitor:
             "consumed": consumed,
             "queue_size": queue_size,
             "throughput_per_sec": round(produced / elapsed if elapsed > 0 else 0, 2),
-            "lag": produced - consumed
+            "lag": produced - consumed,
+            "current": self.history.rates(self.rate_window),
+            "priorities": self._priority_stats(),
+            "shards": self._shard_stats(),
+            "autoscaling": self._autoscaling_stats(),
+            "latency": self._latency_stats(),
+            "durability": self._durability_stats(),
+            "defects": self._defect_stats(),
+            "replay": self._replay_stats(),
+            "pacing": self._pacing_stats(),
+            "profiling": self._profiling_stats(),
+            "buffers": self._buffer_stats(),
+            **self._quality_stats()
         }
 
+    def _write_stats_file(self, content: str) -> None:
+        temp_path = f"{self.stats_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, self.stats_file)
+
     def _update_stats_file(self) -> None:
         try:
             elapsed = time.time() - self.start_time
@@ -53,31 +245,115 @@ class SystemMonitor:
                     "total_produced": produced,
                     "total_consumed": consumed,
                     "average_throughput_per_sec": round(produced / elapsed if elapsed > 0 else 0, 2),
-                    "efficiency_percent": round((consumed / produced * 100) if produced > 0 else 0, 2)
+                    "efficiency_percent": round((consumed / produced * 100) if produced > 0 else 0, 2),
+                    "current": self.history.rates(self.rate_window),
+                    "priorities": self._priority_stats(),
+                    "shards": self._shard_stats(),
+                    "autoscaling": self._autoscaling_stats(),
+                    "latency": self._latency_stats(),
+                    "durability": self._durability_stats(),
+                    "defects": self._defect_stats(),
+                    "replay": self._replay_stats(),
+                    "pacing": self._pacing_stats(),
+                    "profiling": self._profiling_stats(),
+                    "buffers": self._buffer_stats(),
+                    **self._quality_stats()
                 },
                 "producers": [],
                 "consumers": []
             }
             
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(stats_data, f, indent=2, ensure_ascii=False)
+            self._write_stats_file(json.dumps(stats_data, indent=2, ensure_ascii=False))
         except Exception:
             pass
 
+    def _publish_segment(self, now: float, produced: int, consumed: int, queue_size: int) -> None:
+        elapsed = now - self.start_time
+        rates = self.history.rates(self.rate_window)
+        priorities = self._priority_stats()
+        autoscaling = self._autoscaling_stats()
+        shards = self._shard_stats()
+        shard_values = {}
+        for shard in shards:
+            shard_values[f"shard_{shard['consumer_id']}_depth"] = shard["depth"]
+            shard_values[f"shard_{shard['consumer_id']}_routed"] = shard["routed"]
+            shard_values[f"shard_{shard['consumer_id']}_stolen"] = shard["stolen"]
+            shard_values[f"shard_{shard['consumer_id']}_service_ms"] = shard["service_time_ms"]
+        latency_values = {}
+        if self.latency:
+            for metric, summary in self.latency.summary().items():
+                for key, value in summary.items():
+                    if key != "count":
+                        latency_values[f"latency_{metric}_{key}"] = value
+        durability = self._durability_stats()
+        pacing = self._pacing_stats()
+        lane_values = {}
+        for lane in priorities:
+            lane_values[f"priority_{lane['priority']}_depth"] = lane["depth"]
+            lane_values[f"priority_{lane['priority']}_wait_ms"] = lane["avg_wait_ms"]
+        self.segment.publish({
+            "start_time": self.start_time,
+            "updated_at": now,
+            "produced": produced,
+            "consumed": consumed,
+            "queue_size": queue_size,
+            "average_throughput": produced / elapsed if elapsed > 0 else 0,
+            "current_throughput": rates["throughput_per_sec"],
+            "consume_rate": rates["consume_rate_per_sec"],
+            "lag_trend": rates["lag_trend_per_sec"],
+            "priority_levels": len(priorities),
+            "active_consumers": self.active_consumers,
+            "scale_ups": autoscaling["scale_ups"],
+            "scale_downs": autoscaling["scale_downs"],
+            **lane_values,
+            "shard_count": len(shards),
+            **shard_values,
+            **latency_values,
+            "wal_pending": durability.get("pending", 0),
+            "wal_segments": durability.get("segments", 0),
+            "wal_replayed": durability.get("replayed", 0),
+            "wal_syncs": durability.get("syncs", 0),
+            "wal_commit_ms": durability.get("avg_commit_ms", 0.0),
+            "wal_sync_batch": durability.get("avg_sync_batch", 0.0),
+            "replay_drift_ms": self._replay_stats().get("avg_drift_ms", 0.0),
+            "producer_blocked_ratio": pacing.get("blocked_ratio", 0.0),
+            "spilled": pacing.get("spilled", 0),
+            **self._buffer_stats(),
+            **self._quality_stats()
+        })
+
     def collect_stats(self) -> None:
-        stats = self.get_stats()
-        self.history.append(stats)
-        self._update_stats_file()
+        started = time.perf_counter()
+        now = time.time()
+        produced = self.produced_counter.value
+        consumed = self.consumed_counter.value
+        queue_size = self.queue.qsize()
+        self.history.record(now, produced, consumed, queue_size)
+        if self.segment:
+            self._publish_segment(now, produced, consumed, queue_size)
+        else:
+            self._update_stats_file()
+        record("collect", started)
+
+    def get_history(self, start: float = None, end: float = None, resolution: int = None) -> Dict[str, Any]:
+        return self.history.query(start, end, resolution)
+
+    @staticmethod
+    def _read_items(items) -> list:
+        snapshot = getattr(items, "snapshot", None)
+        return snapshot() if snapshot else list(items)
 
     def export_stats(self, produced_items: dict = None, consumed_items: dict = None) -> None:
         try:
+            if self.segment:
+                self.collect_stats()
             final_stats = self.get_final_stats()
             producers_list = []
             consumers_list = []
             
             if produced_items:
                 for pid in sorted(produced_items.keys()):
-                    items = list(produced_items[pid])
+                    items = self._read_items(produced_items[pid])
                     producers_list.append({
                         "id": pid,
                         "count": len(items),
@@ -86,7 +362,7 @@ class SystemMonitor:
             
             if consumed_items:
                 for cid in sorted(consumed_items.keys()):
-                    items = list(consumed_items[cid])
+                    items = self._read_items(consumed_items[cid])
                     consumers_list.append({
                         "id": cid,
                         "count": len(items),
@@ -103,42 +379,53 @@ class SystemMonitor:
                     "total_produced": final_stats['total_produced'],
                     "total_consumed": final_stats['total_consumed'],
                     "average_throughput_per_sec": final_stats['average_throughput'],
-                    "efficiency_percent": final_stats['efficiency']
+                    "efficiency_percent": final_stats['efficiency'],
+                    "defective": final_stats['defective'],
+                    "dead_lettered": final_stats['dead_lettered'],
+                    "accepted": final_stats['accepted'],
+                    "rejected": final_stats['rejected'],
+                    "in_flight": final_stats['in_flight'],
+                    "buffers": final_stats['buffers']
                 },
                 "producers": producers_list,
                 "consumers": consumers_list
             }
             
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                lines = ['{']
-                lines.append('  "metadata": {')
-                lines.append(f'    "total_time_seconds": {export_data["metadata"]["total_time_seconds"]},')
-                lines.append(f'    "start_time": "{export_data["metadata"]["start_time"]}",')
-                lines.append(f'    "end_time": "{export_data["metadata"]["end_time"]}"')
-                lines.append('  },')
-                
-                lines.append('  "statistics": {')
-                stats = export_data["statistics"]
-                lines.append(f'    "total_produced": {stats["total_produced"]},')
-                lines.append(f'    "total_consumed": {stats["total_consumed"]},')
-                lines.append(f'    "average_throughput_per_sec": {stats["average_throughput_per_sec"]},')
-                lines.append(f'    "efficiency_percent": {stats["efficiency_percent"]}')
-                lines.append('  },')
-                
-                lines.append('  "producers": [')
-                for i, prod in enumerate(export_data["producers"]):
-                    items_str = ', '.join(str(x) for x in prod["items"])
-                    lines.append(f'    {{"id": {prod["id"]}, "count": {prod["count"]}, "items": [{items_str}]}}' + (',' if i < len(export_data["producers"]) - 1 else ''))
-                lines.append('  ],')
-                
-                lines.append('  "consumers": [')
-                for i, cons in enumerate(export_data["consumers"]):
-                    items_str = ', '.join(str(x) for x in cons["items"])
-                    lines.append(f'    {{"id": {cons["id"]}, "count": {cons["count"]}, "items": [{items_str}]}}' + (',' if i < len(export_data["consumers"]) - 1 else ''))
-                lines.append('  ]')
-                
-                lines.append('}')
-                f.write('\n'.join(lines))
+            lines = ['{']
+            lines.append('  "metadata": {')
+            lines.append(f'    "total_time_seconds": {export_data["metadata"]["total_time_seconds"]},')
+            lines.append(f'    "start_time": "{export_data["metadata"]["start_time"]}",')
+            lines.append(f'    "end_time": "{export_data["metadata"]["end_time"]}"')
+            lines.append('  },')
+            
+            lines.append('  "statistics": {')
+            stats = export_data["statistics"]
+            lines.append(f'    "total_produced": {stats["total_produced"]},')
+            lines.append(f'    "total_consumed": {stats["total_consumed"]},')
+            lines.append(f'    "average_throughput_per_sec": {stats["average_throughput_per_sec"]},')
+            lines.append(f'    "efficiency_percent": {stats["efficiency_percent"]},')
+            lines.append(f'    "defective": {stats["defective"]},')
+            lines.append(f'    "dead_lettered": {stats["dead_lettered"]},')
+            lines.append(f'    "accepted": {stats["accepted"]},')
+            lines.append(f'    "rejected": {stats["rejected"]},')
+            lines.append(f'    "in_flight": {stats["in_flight"]},')
+            lines.append(f'    "buffers": {json.dumps(stats["buffers"])}')
+            lines.append('  },')
+            
+            lines.append('  "producers": [')
+            for i, prod in enumerate(export_data["producers"]):
+                items_str = ', '.join(str(x) for x in prod["items"])
+                lines.append(f'    {{"id": {prod["id"]}, "count": {prod["count"]}, "items": [{items_str}]}}' + (',' if i < len(export_data["producers"]) - 1 else ''))
+            lines.append('  ],')
+            
+            lines.append('  "consumers": [')
+            for i, cons in enumerate(export_data["consumers"]):
+                items_str = ', '.join(str(x) for x in cons["items"])
+                lines.append(f'    {{"id": {cons["id"]}, "count": {cons["count"]}, "items": [{items_str}]}}' + (',' if i < len(export_data["consumers"]) - 1 else ''))
+            lines.append('  ]')
+            
+            lines.append('}')
+            self._write_stats_file('\n'.join(lines))
             print(f"[MONITOR] Statystyki eksportowane do {self.stats_file}")
         except Exception as e:
             print(f"[MONITOR] Błąd eksportu statystyk: {e}")
@@ -154,6 +441,8 @@ class SystemMonitor:
             "total_consumed": consumed,
             "average_throughput": round(produced / elapsed if elapsed > 0 else 0, 2),
             "efficiency": round((consumed / produced * 100) if produced > 0 else 0, 2),
+            **self._quality_stats(),
+            "buffers": self._buffer_stats(),
             "start_time": datetime.fromtimestamp(self.start_time).isoformat(),
             "end_time": datetime.now().isoformat()
         }
@@ -0,0 +1,124 @@
+import os
+import struct
+import time
+from typing import Any, Optional
+
+from stats_segment import StatsSegmentReader
+
+PACING_POLICIES = ("none", "token_bucket", "aimd")
+OVERLOAD_POLICIES = ("block", "shed", "spill")
+AIMD_CHECK_INTERVAL = 0.1
+
+_SPILL_RECORD = struct.Struct("<Bq?dq")
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError(f"Limit tempa musi być dodatni: {rate}")
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated: Optional[float] = None
+
+    def delay(self) -> float:
+        now = time.monotonic()
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+class AimdController(TokenBucket):
+
+    def __init__(self,
+                 stats_segment_file: str,
+                 rate: float,
+                 burst: int = 1,
+                 target_queue_size: int = 25,
+                 min_rate: float = 1.0,
+                 max_rate: float = 1000.0,
+                 increase: float = 10.0,
+                 decrease: float = 0.5):
+        super().__init__(min(max(rate, min_rate), max_rate), burst)
+        self.stats_segment_file = stats_segment_file
+        self.target_queue_size = target_queue_size
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._reader: Optional[StatsSegmentReader] = None
+        self._version: Any = None
+        self._checked_at = 0.0
+
+    def _adjust(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < AIMD_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        if self._reader is None:
+            self._reader = StatsSegmentReader(self.stats_segment_file)
+        version = self._reader.version()
+        if version is None or version == self._version:
+            return
+        segment = self._reader.read()
+        if not segment:
+            return
+        self._version = version
+        if segment["queue_size"] >= self.target_queue_size:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+        else:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def delay(self) -> float:
+        self._adjust()
+        return super().delay()
+
+
+class SpillFile:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._read_offset = 0
+        self._size = 0
+
+    def _open(self) -> int:
+        if self._fd is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            self._pid = os.getpid()
+            self._read_offset = 0
+            self._size = 0
+        return self._fd
+
+    @property
+    def pending(self) -> int:
+        return (self._size - self._read_offset) // _SPILL_RECORD.size
+
+    def append(self, entry: tuple) -> None:
+        fd = self._open()
+        os.pwrite(fd, _SPILL_RECORD.pack(*entry), self._size)
+        self._size += _SPILL_RECORD.size
+
+    def peek(self) -> tuple:
+        data = os.pread(self._open(), _SPILL_RECORD.size, self._read_offset)
+        return _SPILL_RECORD.unpack(data)
+
+    def pop(self) -> None:
+        self._read_offset += _SPILL_RECORD.size
+        if self._read_offset >= self._size:
+            os.ftruncate(self._fd, 0)
+            self._read_offset = 0
+            self._size = 0
+
+    def close(self) -> None:
+        if self._fd is not None and self._pid == os.getpid():
+            os.close(self._fd)
+            os.remove(self.path)
+        self._fd = None
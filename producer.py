@@ -1,6 +1,16 @@
+import asyncio
 import time
 import random
-from multiprocessing import Queue, Value, Lock
+from multiprocessing import Queue
+from queue import Full
+from typing import Any, Optional
+from counters import CounterSlot
+from deadletter import DeadLetterLane
+from generation import ItemGenerator
+from replay import TraceRecorder, TraceReplay
+from pacing import SpillFile, TokenBucket
+from profiling import PhaseTimers, record
+from latency import item_sequence, make_item_id
 from logger import get_logger
 
 
@@ -10,50 +20,365 @@ class Producer:
                  producer_id: int,
                  queue: Queue,
                  items_count: int,
-                 produced_counter: Value,
+                 counters: CounterSlot,
                  produced_items: dict,
                  sleep_min: float = 0.2,
                  sleep_max: float = 0.6,
-                 lock: Lock = None,
-                 defect_rate: float = 0.0):
+                 defect_rate: float = 0.0,
+                 batch_size: int = 1,
+                 batch_linger: float = 0.0,
+                 priority_weights: tuple = None,
+                 dead_letter: DeadLetterLane = None,
+                 generator: ItemGenerator = None,
+                 trace: TraceReplay = None,
+                 recorder: TraceRecorder = None,
+                 pacer: TokenBucket = None,
+                 put_timeout: float = 1.0,
+                 overload_policy: str = "block",
+                 spill: SpillFile = None,
+                 timers: PhaseTimers = None):
         self.producer_id = producer_id
         self.queue = queue
         self.items_count = items_count
-        self.produced_counter = produced_counter
+        self.counters = counters
         self.produced_items = produced_items
         self.sleep_min = sleep_min
         self.sleep_max = sleep_max
-        self.lock = lock
         self.defect_rate = defect_rate
+        self.batch_size = batch_size
+        self.batch_linger = batch_linger
+        self.priority_weights = priority_weights
+        self.dead_letter = dead_letter
+        self.generator = generator
+        self.trace = trace
+        self.recorder = recorder
+        self.pacer = pacer
+        self.put_timeout = put_timeout
+        self.overload_policy = overload_policy
+        self.spill = spill
+        self.timers = timers
+        self._delay = 0.0
+        self._wake_at = 0.0
         self.logger = get_logger()
+        self.log_prefix = f"PRODUCENT {producer_id}"
+        self._batches: dict[int, list[tuple]] = {}
+        self._batch_deadline = 0.0
+
+    def _next_priority(self) -> int:
+        if not self.priority_weights:
+            return 0
+        return random.choices(range(len(self.priority_weights)), weights=self.priority_weights)[0]
+
+    def _add_to_batch(self, entry: tuple) -> Optional[list]:
+        if not self._batches:
+            self._batch_deadline = time.monotonic() + self.batch_linger
+        batch = self._batches.setdefault(entry[0], [])
+        batch.append(entry)
+        if len(batch) >= self.batch_size:
+            del self._batches[entry[0]]
+            return batch
+        return None
+
+    def _take_batches(self) -> list[list]:
+        batches, self._batches = self._batches, {}
+        return [batches[priority] for priority in sorted(batches)]
+
+    def _divert(self, entry: tuple) -> bool:
+        if not entry[2] or self.dead_letter is None:
+            return False
+        if not self.dead_letter.put(self.producer_id, entry):
+            self.logger.warning(self.log_prefix, "Kolejka odrzutów pełna - wadliwy element trafia do kolejki głównej")
+            return False
+        self.counters.add("dead_lettered")
+        return True
+
+    def _blocked(self, started: float) -> None:
+        self.counters.add("blocked_us", int((time.perf_counter() - started) * 1_000_000))
+
+    def _overload(self, payload: Any) -> None:
+        entries = payload if isinstance(payload, list) else [payload]
+        if self.overload_policy == "spill":
+            for entry in entries:
+                self.spill.append(entry)
+            self.counters.add("spilled", len(entries))
+            self._record_all(payload)
+            return
+        self.counters.add("shed", len(entries))
+        if self.trace:
+            for entry in entries:
+                self.trace.discard(item_sequence(entry[4]))
+        self.logger.warning(self.log_prefix, f"Kolejka pełna po {self.put_timeout}s - odrzucono {len(entries)} el.")
+
+    def _drain_spill(self, block: bool) -> None:
+        while self.spill.pending:
+            try:
+                self.queue.put(self.spill.peek(), block, self.put_timeout)
+            except Full:
+                if not block:
+                    return
+                continue
+            self.spill.pop()
+
+    def _put(self, payload: Any) -> bool:
+        started = time.perf_counter()
+        try:
+            if self.spill is not None and self.spill.pending:
+                self._drain_spill(block=False)
+                if self.spill.pending:
+                    self._overload(payload)
+                    return False
+            while True:
+                try:
+                    self.queue.put(payload, timeout=self.put_timeout)
+                    return True
+                except Full:
+                    if self.overload_policy != "block":
+                        self._overload(payload)
+                        return False
+        finally:
+            self._blocked(started)
+            record("put", started)
+
+    def _send(self, payload: Any) -> None:
+        if self._put(payload):
+            self._record_all(payload)
+
+    def _enqueue(self, entry: tuple) -> None:
+        if self.batch_size <= 1:
+            self._send(entry)
+            return
+
+        batch = self._add_to_batch(entry)
+        if batch:
+            self._send(batch)
+
+    def _flush_batch(self) -> None:
+        for batch in self._take_batches():
+            self._send(batch)
+
+    def _flush_spill(self) -> None:
+        if self.spill is None:
+            return
+        started = time.perf_counter()
+        self._drain_spill(block=True)
+        self._blocked(started)
+        record("put", started)
+        self.spill.close()
+
+    def _pause(self, until: float) -> None:
+        started = time.perf_counter()
+        time.sleep(max(0.0, until - time.monotonic()))
+        record("sleep", started)
+
+    def _sleep_until(self, wake_at: float) -> None:
+        while self._batches and self._batch_deadline < wake_at:
+            self._pause(self._batch_deadline)
+            self._flush_batch()
+        self._pause(wake_at)
+
+    def _sleep(self, duration: float) -> None:
+        self._sleep_until(time.monotonic() + duration)
+
+    def _next_entry(self, sequence: int) -> tuple:
+        if self.trace:
+            item, is_defective, priority, self._wake_at = self.trace.next()
+        elif self.generator:
+            item, is_defective, priority, self._delay = self.generator.next()
+        else:
+            item = random.randint(1, 100)
+            is_defective = random.random() < self.defect_rate
+            priority = self._next_priority()
+            self._delay = random.uniform(self.sleep_min, self.sleep_max)
+        return (priority, item, is_defective, time.monotonic(), make_item_id(self.producer_id, sequence))
+
+    def _record(self, entry: tuple) -> None:
+        priority, item, is_defective = entry[:3]
+        sequence = item_sequence(entry[4])
+        self.counters.add("produced")
+        if is_defective:
+            self.counters.add("defective")
+        if self.trace:
+            self.counters.add("drift_us", self.trace.mark_dispatched(sequence))
+        if self.recorder:
+            self.recorder.write(self.producer_id, entry)
+        started = time.perf_counter()
+        self.produced_items[self.producer_id].append(item)
+        record("append", started)
+        
+        self.logger.info(
+            self.log_prefix,
+            "Wyprodukowano: %d%s (priorytet: %d, postęp: %d/%d)",
+            item, " [WADLIWY]" if is_defective else "", priority, sequence + 1, self.items_count
+        )
+
+    def _record_all(self, payload: Any) -> None:
+        for entry in payload if isinstance(payload, list) else [payload]:
+            self._record(entry)
+
+    def _log_drift(self) -> None:
+        if not self.trace:
+            return
+        summary = self.trace.drift_summary()
+        self.logger.info(
+            self.log_prefix,
+            f"Odtworzono {summary['replayed']} rekordów śladu (dryf średni: {summary['avg_drift_ms']} ms, maks.: {summary['max_drift_ms']} ms)"
+        )
 
     def produce(self) -> None:
         self.logger.info(f"PRODUCENT {self.producer_id}", "Rozpoczęto produkcję")
         
         for i in range(self.items_count):
             try:
-                item = random.randint(1, 100)
-                is_defective = random.random() < self.defect_rate
-                priority = 0
-                
-                self.queue.put((priority, item, is_defective))
+                if self.timers:
+                    self.timers.poll()
+                if self.pacer:
+                    self._sleep(self.pacer.delay())
+                entry = self._next_entry(i)
+                if self._divert(entry):
+                    self._record(entry)
+                else:
+                    self._enqueue(entry)
                 
-                with self.lock:
-                    self.produced_counter.value += 1
-                    self.produced_items[self.producer_id].append(item)
-                
-                defect_status = " [WADLIWY]" if is_defective else ""
-                self.logger.info(
-                    f"PRODUCENT {self.producer_id}",
-                    f"Wyprodukowano: {item}{defect_status} (priorytet: {priority}, postęp: {i + 1}/{self.items_count})"
-                )
-                
-                time.sleep(random.uniform(self.sleep_min, self.sleep_max))
+                if self.trace:
+                    self._sleep_until(self._wake_at)
+                elif not self.pacer:
+                    self._sleep(self._delay)
             
             except Exception as e:
                 self.logger.error(f"PRODUCENT {self.producer_id}", f"Błąd: {e}")
 
+        try:
+            self._flush_batch()
+            self._flush_spill()
+        except Exception as e:
+            self.logger.error(f"PRODUCENT {self.producer_id}", f"Błąd: {e}")
+
+        self._log_drift()
         self.logger.info(f"PRODUCENT {self.producer_id}", "Zakończył pracę")
 
     def run(self) -> None:
-        self.produce()
+        self.logger.bind_counters(self.counters)
+        if self.timers:
+            self.timers.bind()
+        try:
+            self.produce()
+        finally:
+            if self.timers:
+                self.timers.finish()
+
+
+class AsyncProducer(Producer):
+
+    async def _drain_spill(self, block: bool) -> None:
+        while self.spill.pending:
+            try:
+                if block:
+                    await asyncio.wait_for(self.queue.put(self.spill.peek()), self.put_timeout)
+                else:
+                    self.queue.put_nowait(self.spill.peek())
+            except (asyncio.TimeoutError, asyncio.QueueFull):
+                if not block:
+                    return
+                continue
+            self.spill.pop()
+
+    async def _put(self, payload: Any) -> bool:
+        started = time.perf_counter()
+        try:
+            if self.spill is not None and self.spill.pending:
+                await self._drain_spill(block=False)
+                if self.spill.pending:
+                    self._overload(payload)
+                    return False
+            while True:
+                try:
+                    await asyncio.wait_for(self.queue.put(payload), self.put_timeout)
+                    return True
+                except asyncio.TimeoutError:
+                    if self.overload_policy != "block":
+                        self._overload(payload)
+                        return False
+        finally:
+            self._blocked(started)
+            record("put", started)
+
+    async def _send(self, payload: Any) -> None:
+        if await self._put(payload):
+            self._record_all(payload)
+
+    async def _enqueue(self, entry: tuple) -> None:
+        if self.batch_size <= 1:
+            await self._send(entry)
+            return
+
+        batch = self._add_to_batch(entry)
+        if batch:
+            await self._send(batch)
+
+    async def _flush_batch(self) -> None:
+        for batch in self._take_batches():
+            await self._send(batch)
+
+    async def _flush_spill(self) -> None:
+        if self.spill is None:
+            return
+        started = time.perf_counter()
+        await self._drain_spill(block=True)
+        self._blocked(started)
+        record("put", started)
+        self.spill.close()
+
+    async def _pause(self, until: float) -> None:
+        started = time.perf_counter()
+        await asyncio.sleep(max(0.0, until - time.monotonic()))
+        record("sleep", started)
+
+    async def _sleep_until(self, wake_at: float) -> None:
+        while self._batches and self._batch_deadline < wake_at:
+            await self._pause(self._batch_deadline)
+            await self._flush_batch()
+        await self._pause(wake_at)
+
+    async def _sleep(self, duration: float) -> None:
+        await self._sleep_until(time.monotonic() + duration)
+
+    async def produce(self) -> None:
+        self.logger.info(f"PRODUCENT {self.producer_id}", "Rozpoczęto produkcję")
+        
+        for i in range(self.items_count):
+            try:
+                if self.timers:
+                    self.timers.poll()
+                if self.pacer:
+                    await self._sleep(self.pacer.delay())
+                entry = self._next_entry(i)
+                if self._divert(entry):
+                    self._record(entry)
+                else:
+                    await self._enqueue(entry)
+                
+                if self.trace:
+                    await self._sleep_until(self._wake_at)
+                elif not self.pacer:
+                    await self._sleep(self._delay)
+            
+            except Exception as e:
+                self.logger.error(f"PRODUCENT {self.producer_id}", f"Błąd: {e}")
+
+        try:
+            await self._flush_batch()
+            await self._flush_spill()
+        except Exception as e:
+            self.logger.error(f"PRODUCENT {self.producer_id}", f"Błąd: {e}")
+
+        self._log_drift()
+        self.logger.info(f"PRODUCENT {self.producer_id}", "Zakończył pracę")
+
+    async def run(self) -> None:
+        if self.timers:
+            self.timers.bind()
+        try:
+            await self.produce()
+        finally:
+            if self.timers:
+                self.timers.finish()
@@ -0,0 +1,255 @@
+import cProfile
+import contextvars
+import mmap
+import os
+import struct
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Optional
+
+PHASES = ("put", "get", "lock", "append", "log", "sleep", "collect")
+PHASE_INDEX = {name: index for index, name in enumerate(PHASES)}
+EXCLUSIVE_PHASES = tuple(phase for phase in PHASES if phase != "lock")
+PROFILE_MODES = ("off", "cpu", "memory")
+PROFILE_MAGIC = b"PCPF"
+TRACEMALLOC_FRAMES = 10
+
+_HEADER = struct.Struct("<4sII4x")
+_MODE_CELL = _HEADER.size // 8
+_GENERATION_CELL = _MODE_CELL + 1
+_ROWS_CELL = _GENERATION_CELL + 1
+_PID, _STARTED, _STOPPED, _PHASES = range(4)
+_ROW_CELLS = _PHASES + 2 * len(PHASES)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("phase_timers", default=None)
+_cpu_profiles: Dict[tuple, cProfile.Profile] = {}
+_memory_users: Dict[int, int] = {}
+
+
+def _size(producers: int, consumers: int) -> int:
+    return (_ROWS_CELL + (producers + consumers + 1) * _ROW_CELLS) * 8
+
+
+def _now_us() -> int:
+    return int(time.time() * 1_000_000)
+
+
+def _mode_index(mode: str) -> int:
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Nieznany tryb profilowania: {mode} (dostępne: {', '.join(PROFILE_MODES)})")
+    return PROFILE_MODES.index(mode)
+
+
+def record(phase: str, started: float) -> None:
+    timers = _current.get()
+    if timers is not None:
+        timers.add(phase, started)
+
+
+class ProfileTable:
+
+    def __init__(self, buffer: Any, producers: int, consumers: int):
+        self.producers = producers
+        self.consumers = consumers
+        self._buffer = buffer
+        self._cells = memoryview(buffer).cast('q')
+
+    def _row(self, role: str, worker_id: int) -> int:
+        if role == "producer" and 1 <= worker_id <= self.producers:
+            index = worker_id - 1
+        elif role == "consumer" and 1 <= worker_id <= self.consumers:
+            index = self.producers + worker_id - 1
+        elif role == "monitor":
+            index = self.producers + self.consumers
+        else:
+            raise ValueError(f"Nieprawidłowy worker profilowania: {role} {worker_id}")
+        return _ROWS_CELL + index * _ROW_CELLS
+
+    def _workers(self) -> list[tuple[str, int]]:
+        workers = [("producer", pid) for pid in range(1, self.producers + 1)]
+        workers.extend(("consumer", cid) for cid in range(1, self.consumers + 1))
+        workers.append(("monitor", 0))
+        return workers
+
+    def control(self) -> Dict[str, Any]:
+        return {
+            "mode": PROFILE_MODES[self._cells[_MODE_CELL]],
+            "generation": self._cells[_GENERATION_CELL]
+        }
+
+    def set_mode(self, mode: str) -> Dict[str, Any]:
+        self._cells[_MODE_CELL] = _mode_index(mode)
+        self._cells[_GENERATION_CELL] += 1
+        return self.control()
+
+    def breakdown(self) -> Dict[str, Any]:
+        now = _now_us()
+        workers = []
+        for role, worker_id in self._workers():
+            base = self._row(role, worker_id)
+            row = self._cells[base:base + _ROW_CELLS].tolist()
+            if not row[_PID]:
+                continue
+            elapsed = max((row[_STOPPED] or now) - row[_STARTED], 1)
+            phases = {}
+            for index, phase in enumerate(PHASES):
+                spent = row[_PHASES + index]
+                phases[phase] = {
+                    "ms": round(spent / 1000, 1),
+                    "count": row[_PHASES + len(PHASES) + index],
+                    "share": round(min(spent / elapsed, 1.0), 3)
+                }
+            other = max(elapsed - sum(row[_PHASES + PHASE_INDEX[phase]] for phase in EXCLUSIVE_PHASES), 0)
+            dominant = max(EXCLUSIVE_PHASES, key=lambda phase: phases[phase]["ms"])
+            workers.append({
+                "role": role,
+                "id": worker_id,
+                "pid": row[_PID],
+                "running": not row[_STOPPED],
+                "elapsed_ms": round(elapsed / 1000, 1),
+                "phases": phases,
+                "other_ms": round(other / 1000, 1),
+                "other_share": round(other / elapsed, 3),
+                "dominant": dominant if phases[dominant]["ms"] > other / 1000 else "other"
+            })
+        return {**self.control(), "workers": workers}
+
+
+class PhaseTimers:
+
+    def __init__(self, table: ProfileTable, role: str, worker_id: int, directory: str):
+        self.role = role
+        self.worker_id = worker_id
+        self.directory = directory
+        self._cells = table._cells
+        self._base = table._row(role, worker_id)
+        self._counts = self._base + _PHASES + len(PHASES)
+        self._generation = 0
+        self._mode = "off"
+        self._cpu_key: Optional[tuple] = None
+
+    def add(self, phase: str, started: float) -> None:
+        index = PHASE_INDEX[phase]
+        self._cells[self._base + _PHASES + index] += int((time.perf_counter() - started) * 1_000_000)
+        self._cells[self._counts + index] += 1
+
+    def bind(self) -> None:
+        cells = self._cells
+        for cell in range(self._base, self._base + _ROW_CELLS):
+            cells[cell] = 0
+        cells[self._base + _STARTED] = _now_us()
+        cells[self._base + _PID] = os.getpid()
+        _current.set(self)
+        self.poll()
+
+    def poll(self) -> None:
+        generation = self._cells[_GENERATION_CELL]
+        if generation == self._generation:
+            return
+        self._stop_profile()
+        self._generation = generation
+        mode = PROFILE_MODES[self._cells[_MODE_CELL]]
+        if mode == "cpu":
+            key = (os.getpid(), threading.get_ident())
+            if key not in _cpu_profiles:
+                _cpu_profiles[key] = cProfile.Profile()
+                _cpu_profiles[key].enable()
+                self._cpu_key = key
+        elif mode == "memory":
+            pid = os.getpid()
+            _memory_users[pid] = _memory_users.get(pid, 0) + 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._mode = mode
+
+    def _dump_path(self, extension: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{self.role}-{self.worker_id}-{os.getpid()}-{self._generation}.{extension}")
+
+    def _stop_profile(self) -> None:
+        if self._mode == "cpu" and self._cpu_key is not None:
+            profile = _cpu_profiles.pop(self._cpu_key)
+            profile.disable()
+            profile.dump_stats(self._dump_path("prof"))
+            self._cpu_key = None
+        elif self._mode == "memory":
+            pid = os.getpid()
+            if tracemalloc.is_tracing():
+                tracemalloc.take_snapshot().dump(self._dump_path("tracemalloc"))
+            _memory_users[pid] = _memory_users.get(pid, 1) - 1
+            if _memory_users[pid] <= 0 and tracemalloc.is_tracing():
+                tracemalloc.stop()
+        self._mode = "off"
+
+    def finish(self) -> None:
+        self._stop_profile()
+        self._cells[self._base + _STOPPED] = _now_us()
+
+
+class ProfileControl(ProfileTable):
+
+    def __init__(self, producers: int, consumers: int, path: Optional[str] = None, directory: str = "profiles"):
+        self.path = path
+        self.directory = directory
+        size = _size(producers, consumers)
+        header = _HEADER.pack(PROFILE_MAGIC, producers, consumers)
+        if path:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(header)
+                f.truncate(size)
+            with open(temp_path, 'r+b') as f:
+                buffer = mmap.mmap(f.fileno(), size)
+            os.replace(temp_path, path)
+        else:
+            buffer = mmap.mmap(-1, size)
+            buffer[:_HEADER.size] = header
+        super().__init__(buffer, producers, consumers)
+
+    def timers(self, role: str, worker_id: int = 0) -> PhaseTimers:
+        return PhaseTimers(self, role, worker_id, self.directory)
+
+
+class ProfileReader:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._inode: Optional[int] = None
+        self._table: Optional[ProfileTable] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if stat.st_ino == self._inode:
+            return True
+        self._table = None
+        self._inode = None
+        if stat.st_size < _HEADER.size:
+            return False
+
+        with open(self.path, 'r+b') as f:
+            buffer = mmap.mmap(f.fileno(), 0)
+        magic, producers, consumers = _HEADER.unpack_from(buffer, 0)
+        if magic != PROFILE_MAGIC or len(buffer) < _size(producers, consumers):
+            buffer.close()
+            return False
+        self._table = ProfileTable(buffer, producers, consumers)
+        self._inode = stat.st_ino
+        return True
+
+    def breakdown(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._open():
+                return None
+            return self._table.breakdown()
+
+    def set_mode(self, mode: str) -> Optional[Dict[str, Any]]:
+        _mode_index(mode)
+        with self._lock:
+            if not self._open():
+                return None
+            return self._table.set_mode(mode)
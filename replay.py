@@ -0,0 +1,132 @@
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional
+
+TRACE_FIELDS = ("timestamp", "item")
+
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                missing = [field for field in TRACE_FIELDS if field not in record]
+            except (ValueError, TypeError):
+                raise ValueError(f"{path}:{line_number}: niepoprawny wiersz JSON")
+            if missing:
+                raise ValueError(f"{path}:{line_number}: brak pól {', '.join(missing)} w rekordzie śladu")
+            yield record
+
+
+def record_producer(record: Dict[str, Any], index: int, producers: int) -> int:
+    producer_id = record.get("producer")
+    if producer_id is None:
+        return index % producers + 1
+    return int(producer_id)
+
+
+def scan_trace(path: str, producers: int) -> tuple[float, float, Dict[int, int]]:
+    origin = None
+    span = 0.0
+    counts = {producer_id: 0 for producer_id in range(1, producers + 1)}
+    for index, record in enumerate(read_trace(path)):
+        timestamp = float(record["timestamp"])
+        if origin is None:
+            origin = timestamp
+        span = max(span, timestamp - origin)
+        producer_id = record_producer(record, index, producers)
+        if producer_id in counts:
+            counts[producer_id] += 1
+    return origin or 0.0, span, counts
+
+
+class TraceReplay:
+
+    def __init__(self, path: str, producer_id: int, producers: int, origin: float, started_at: float, speed: float = 1.0):
+        self.path = path
+        self.producer_id = producer_id
+        self.producers = producers
+        self.origin = origin
+        self.started_at = started_at
+        self.speed = speed
+        self._records: Optional[Iterator[tuple[float, Dict[str, Any]]]] = None
+        self._upcoming: Optional[tuple[float, Dict[str, Any]]] = None
+        self._pending: Dict[int, float] = {}
+        self.max_drift_us = 0
+        self.total_drift_us = 0
+        self.replayed = 0
+        self.dispatched = 0
+
+    def _own_records(self) -> Iterator[tuple[float, Dict[str, Any]]]:
+        for index, record in enumerate(read_trace(self.path)):
+            if record_producer(record, index, self.producers) == self.producer_id:
+                yield float(record["timestamp"]) - self.origin, record
+
+    def _scheduled(self, offset: float) -> float:
+        return self.started_at + offset / self.speed
+
+    def next(self) -> tuple[int, bool, int, float]:
+        if self._records is None:
+            self._records = self._own_records()
+            self._upcoming = next(self._records, None)
+        if self._upcoming is None:
+            raise ValueError(f"Ślad {self.path} nie zawiera więcej rekordów dla producenta {self.producer_id}")
+        offset, record = self._upcoming
+        self._upcoming = next(self._records, None)
+
+        wake_at = time.monotonic()
+        if self.speed > 0:
+            self._pending[self.replayed] = self._scheduled(offset)
+            if self._upcoming is not None:
+                wake_at = self._scheduled(self._upcoming[0])
+        self.replayed += 1
+        return int(record["item"]), bool(record.get("defective", False)), int(record.get("priority", 0)), wake_at
+
+    def mark_dispatched(self, sequence: int) -> int:
+        scheduled = self._pending.pop(sequence, None)
+        self.dispatched += 1
+        if scheduled is None:
+            return 0
+        drift_us = int(abs(time.monotonic() - scheduled) * 1_000_000)
+        self.max_drift_us = max(self.max_drift_us, drift_us)
+        self.total_drift_us += drift_us
+        return drift_us
+
+    def discard(self, sequence: int) -> None:
+        self._pending.pop(sequence, None)
+
+    def drift_summary(self) -> Dict[str, float]:
+        return {
+            "replayed": self.dispatched,
+            "avg_drift_ms": round(self.total_drift_us / self.dispatched / 1000, 3) if self.dispatched else 0.0,
+            "max_drift_ms": round(self.max_drift_us / 1000, 3)
+        }
+
+
+class TraceRecorder:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+
+    def reset(self) -> None:
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+
+    def write(self, producer_id: int, entry: tuple) -> None:
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            self._pid = os.getpid()
+        priority, item, is_defective = entry[:3]
+        line = json.dumps({
+            "timestamp": time.time(),
+            "producer": producer_id,
+            "item": item,
+            "priority": priority,
+            "defective": is_defective
+        })
+        os.write(self._fd, (line + "\n").encode('utf-8'))
@@ -0,0 +1,134 @@
+import os
+import queue
+import struct
+import time
+from multiprocessing import BoundedSemaphore, Lock, Semaphore
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Optional
+
+from profiling import record
+
+RECORD_ITEM = 1
+RECORD_BATCH = 2
+RECORD_STOP = 3
+
+_INDEXES = struct.Struct("<qq")
+_INDEX = struct.Struct("<q")
+_HEAD_OFFSET = 0
+_TAIL_OFFSET = 8
+_RECORD = struct.Struct("<BB?xIqdq")
+
+
+class SharedRing:
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"Pojemność bufora musi być dodatnia: {capacity}")
+        self.capacity = capacity
+        self._shm = SharedMemory(create=True, size=_INDEXES.size + capacity * _RECORD.size)
+        _INDEXES.pack_into(self._shm.buf, 0, 0, 0)
+        self._owner_pid = os.getpid()
+        self._put_lock = Lock()
+        self._get_lock = Lock()
+        self._slots = BoundedSemaphore(capacity)
+        self._items = Semaphore(0)
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+    def _indexes(self) -> tuple[int, int]:
+        return _INDEXES.unpack_from(self._shm.buf, 0)
+
+    def _write(self, position: int, kind: int, count: int, entry: Optional[tuple]) -> None:
+        offset = _INDEXES.size + (position % self.capacity) * _RECORD.size
+        if entry is None:
+            _RECORD.pack_into(self._shm.buf, offset, kind, 0, False, count, 0, 0.0, 0)
+            return
+        priority, item, is_defective, enqueued_at, item_id = entry
+        _RECORD.pack_into(self._shm.buf, offset, kind, priority, is_defective, count, item, enqueued_at, item_id)
+
+    def _read(self, position: int) -> tuple[int, int, tuple]:
+        offset = _INDEXES.size + (position % self.capacity) * _RECORD.size
+        kind, priority, is_defective, count, item, enqueued_at, item_id = _RECORD.unpack_from(self._shm.buf, offset)
+        return kind, count, (priority, item, is_defective, enqueued_at, item_id)
+
+    def put(self, entry: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        entries = entry if isinstance(entry, list) else [entry]
+        if len(entries) > self.capacity:
+            raise ValueError(f"Partia {len(entries)} elementów przekracza pojemność bufora {self.capacity}")
+        deadline = time.monotonic() + timeout if block and timeout is not None else None
+
+        waited = time.perf_counter()
+        if not self._put_lock.acquire(block, self._remaining(deadline)):
+            raise queue.Full
+        record("lock", waited)
+        try:
+            acquired = 0
+            while acquired < len(entries):
+                if not self._slots.acquire(block, self._remaining(deadline)):
+                    for _ in range(acquired):
+                        self._slots.release()
+                    raise queue.Full
+                acquired += 1
+
+            head, tail = self._indexes()
+            if entry is None:
+                self._write(tail, RECORD_STOP, 1, None)
+            elif isinstance(entry, list):
+                self._write(tail, RECORD_BATCH, len(entries), entries[0])
+                for position, batched in enumerate(entries[1:], start=tail + 1):
+                    self._write(position, RECORD_ITEM, 0, batched)
+            else:
+                self._write(tail, RECORD_ITEM, 1, entry)
+            _INDEX.pack_into(self._shm.buf, _TAIL_OFFSET, tail + len(entries))
+        finally:
+            self._put_lock.release()
+
+        self._items.release()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        deadline = time.monotonic() + timeout if block and timeout is not None else None
+
+        waited = time.perf_counter()
+        if not self._get_lock.acquire(block, self._remaining(deadline)):
+            raise queue.Empty
+        record("lock", waited)
+        try:
+            if not self._items.acquire(block, self._remaining(deadline)):
+                raise queue.Empty
+            head, _ = self._indexes()
+            kind, count, entry = self._read(head)
+            if kind != RECORD_BATCH:
+                count = 1
+            batch = [entry] + [self._read(position)[2] for position in range(head + 1, head + count)]
+            _INDEX.pack_into(self._shm.buf, _HEAD_OFFSET, head + count)
+        finally:
+            self._get_lock.release()
+
+        for _ in range(count):
+            self._slots.release()
+        if kind == RECORD_STOP:
+            return None
+        return batch if kind == RECORD_BATCH else entry
+
+    def put_nowait(self, entry: Any) -> None:
+        self.put(entry, block=False)
+
+    def get_nowait(self) -> Any:
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        head, tail = self._indexes()
+        return tail - head
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def full(self) -> bool:
+        return self.qsize() >= self.capacity
+
+    def close(self) -> None:
+        self._shm.close()
+        if os.getpid() == self._owner_pid:
+            self._shm.unlink()
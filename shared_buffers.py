@@ -0,0 +1,36 @@
+from ctypes import c_int
+from multiprocessing.sharedctypes import RawArray, RawValue
+
+
+class SharedItemBuffer:
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items = RawArray(c_int, max(capacity, 1))
+        self._length = RawValue(c_int, 0)
+        self._dropped = RawValue(c_int, 0)
+
+    def append(self, item: int) -> None:
+        length = self._length.value
+        if length >= self.capacity:
+            self._dropped.value += 1
+            return
+        self._items[length] = item
+        self._length.value = length + 1
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped.value
+
+    def snapshot(self) -> list[int]:
+        return self._items[:self._length.value]
+
+    def __len__(self) -> int:
+        return self._length.value
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+
+def create_item_buffers(workers_count: int, capacity: int) -> dict[int, SharedItemBuffer]:
+    return {i + 1: SharedItemBuffer(capacity) for i in range(workers_count)}
@@ -6,47 +6,54 @@ let lastProduced = 0;
 let lastConsumed = 0;
 let noChangeCount = 0;
 let updateIntervals = null;
+let logOffset = null;
+let logLines = [];
+const MAX_LOG_LINES = 100;
+let streamState = null;
 
-async function parseLogsForHistory() {
-    try {
-        const response = await fetch(`${API_BASE}/logs`);
-        const data = await response.json();
+function buildConsumerHistory(logs) {
+    const startTime = new Date();
+    const newConsumerHistory = {};
 
-        const startTime = new Date();
-        const newConsumerHistory = {};
+    logs.forEach((log) => {
+        const consumerMatch = log.match(/KONSUMENT (\d+)/);
+        const countMatch = log.match(/przetworzonych:\s*(\d+)/);
+        const timeMatch = log.match(/(\d{2}):(\d{2}):(\d{2})/);
 
-        data.logs.forEach((log) => {
-            const consumerMatch = log.match(/KONSUMENT (\d+)/);
-            const countMatch = log.match(/przetworzonych:\s*(\d+)/);
-            const timeMatch = log.match(/(\d{2}):(\d{2}):(\d{2})/);
+        if (consumerMatch && countMatch && timeMatch) {
+            const consumerId = parseInt(consumerMatch[1]);
+            const count = parseInt(countMatch[1]);
 
-            if (consumerMatch && countMatch && timeMatch) {
-                const consumerId = parseInt(consumerMatch[1]);
-                const count = parseInt(countMatch[1]);
+            const logTime = new Date();
+            logTime.setHours(parseInt(timeMatch[1]));
+            logTime.setMinutes(parseInt(timeMatch[2]));
+            logTime.setSeconds(parseInt(timeMatch[3]));
 
-                const logTime = new Date();
-                logTime.setHours(parseInt(timeMatch[1]));
-                logTime.setMinutes(parseInt(timeMatch[2]));
-                logTime.setSeconds(parseInt(timeMatch[3]));
+            const elapsedSeconds = Math.round((logTime - startTime) / 1000);
 
-                const elapsedSeconds = Math.round((logTime - startTime) / 1000);
-
-                if (!newConsumerHistory[consumerId]) {
-                    newConsumerHistory[consumerId] = [];
-                }
+            if (!newConsumerHistory[consumerId]) {
+                newConsumerHistory[consumerId] = [];
+            }
 
-                const lastPoint = newConsumerHistory[consumerId].slice(-1)[0];
-                if (!lastPoint || lastPoint.count !== count) {
-                    newConsumerHistory[consumerId].push({
-                        time: Math.max(0, elapsedSeconds),
-                        count: count,
-                    });
-                }
+            const lastPoint = newConsumerHistory[consumerId].slice(-1)[0];
+            if (!lastPoint || lastPoint.count !== count) {
+                newConsumerHistory[consumerId].push({
+                    time: Math.max(0, elapsedSeconds),
+                    count: count,
+                });
             }
-        });
+        }
+    });
+
+    consumerHistory = newConsumerHistory;
+    updateTrendChart();
+}
 
-        consumerHistory = newConsumerHistory;
-        updateTrendChart();
+async function parseLogsForHistory() {
+    try {
+        const response = await fetch(`${API_BASE}/logs`);
+        const data = await response.json();
+        buildConsumerHistory(data.logs);
     } catch (error) {}
 }
 
@@ -74,62 +81,80 @@ async function updateDashboard() {
             lastConsumed = currentConsumed;
         }
 
-        document.getElementById('produced').textContent = currentProduced;
-        document.getElementById('consumed').textContent = currentConsumed;
-        document.getElementById('efficiency').textContent =
-            data.statistics.efficiency_percent.toFixed(1) + '%';
-        document.getElementById('defective').textContent =
-            currentProduced - currentConsumed;
-        document.getElementById('update-time').textContent =
-            new Date().toLocaleTimeString('pl-PL');
-
-        const producersList = document.getElementById('producers-list');
-        producersList.innerHTML = '';
-        data.producers.forEach((producer) => {
-            const div = document.createElement('div');
-            div.className = 'producer-item';
-            div.innerHTML = `
-                <div class="producer-label">Producent ${producer.id} - ${
-                producer.count
-            } elementów</div>
-                <div class="items-list">${producer.items.join(', ')}</div>
-            `;
-            producersList.appendChild(div);
-        });
-
-        const consumersList = document.getElementById('consumers-list');
-        consumersList.innerHTML = '';
-        data.consumers.forEach((consumer) => {
-            const div = document.createElement('div');
-            div.className = 'consumer-item';
-            div.innerHTML = `
-                <div class="consumer-label">Konsument ${consumer.id} - ${
-                consumer.count
-            } elementów</div>
-                <div class="items-list">${consumer.items.join(', ')}</div>
-            `;
-            consumersList.appendChild(div);
-        });
-
+        renderStats(data);
         await parseLogsForHistory();
-        updateConsumerButtons(data);
     } catch (error) {}
 }
 
+function renderStats(data) {
+    const currentProduced = data.statistics.total_produced;
+    const currentConsumed = data.statistics.total_consumed;
+
+    document.getElementById('produced').textContent = currentProduced;
+    document.getElementById('consumed').textContent = currentConsumed;
+    document.getElementById('efficiency').textContent =
+        data.statistics.efficiency_percent.toFixed(1) + '%';
+    document.getElementById('defective').textContent =
+        currentProduced - currentConsumed;
+    document.getElementById('update-time').textContent =
+        new Date().toLocaleTimeString('pl-PL');
+
+    const producersList = document.getElementById('producers-list');
+    producersList.innerHTML = '';
+    data.producers.forEach((producer) => {
+        const div = document.createElement('div');
+        div.className = 'producer-item';
+        div.innerHTML = `
+            <div class="producer-label">Producent ${producer.id} - ${
+            producer.count
+        } elementów</div>
+            <div class="items-list">${producer.items.join(', ')}</div>
+        `;
+        producersList.appendChild(div);
+    });
+
+    const consumersList = document.getElementById('consumers-list');
+    consumersList.innerHTML = '';
+    data.consumers.forEach((consumer) => {
+        const div = document.createElement('div');
+        div.className = 'consumer-item';
+        div.innerHTML = `
+            <div class="consumer-label">Konsument ${consumer.id} - ${
+            consumer.count
+        } elementów</div>
+            <div class="items-list">${consumer.items.join(', ')}</div>
+        `;
+        consumersList.appendChild(div);
+    });
+
+    updateConsumerButtons(data);
+}
+
 async function updateLogs() {
     try {
-        const response = await fetch(`${API_BASE}/logs`);
+        const query = logOffset === null ? '' : `?after=${logOffset}`;
+        const response = await fetch(`${API_BASE}/logs${query}`);
         const data = await response.json();
 
-        const logsContent = document.getElementById('logs-content');
-        logsContent.innerHTML = data.logs
-            .map((log) => `<div class="log-line">${escapeHtml(log)}</div>`)
-            .join('');
+        const firstFetch = logOffset === null;
+        logOffset = data.offset;
+        if (!firstFetch && !data.reset && data.logs.length === 0) return;
 
-        logsContent.scrollTop = logsContent.scrollHeight;
+        logLines = firstFetch || data.reset ? data.logs : logLines.concat(data.logs);
+        logLines = logLines.slice(-MAX_LOG_LINES);
+        renderLogs();
     } catch (error) {}
 }
 
+function renderLogs() {
+    const logsContent = document.getElementById('logs-content');
+    logsContent.innerHTML = logLines
+        .map((log) => `<div class="log-line">${escapeHtml(log)}</div>`)
+        .join('');
+
+    logsContent.scrollTop = logsContent.scrollHeight;
+}
+
 function escapeHtml(text) {
     const map = {
         '&': '&amp;',
@@ -233,10 +258,80 @@ function updateConsumptionChart(data) {
     consumptionChart.update('none');
 }
 
+function workersToList(workers) {
+    return Object.keys(workers)
+        .map(Number)
+        .sort((a, b) => a - b)
+        .map((id) => ({
+            id: id,
+            count: workers[id].length,
+            items: workers[id],
+        }));
+}
+
+function renderStreamState() {
+    try {
+        renderStats({
+            statistics: streamState.statistics,
+            producers: workersToList(streamState.producers),
+            consumers: workersToList(streamState.consumers),
+        });
+    } catch (error) {}
+    renderLogs();
+    buildConsumerHistory(logLines);
+}
+
+function applyStreamDelta(delta) {
+    Object.assign(streamState.statistics, delta.statistics || {});
+    if (delta.metadata) {
+        streamState.metadata = delta.metadata;
+    }
+
+    ['producers', 'consumers'].forEach((key) => {
+        Object.entries(delta[key] || {}).forEach(([id, items]) => {
+            streamState[key][id] = (streamState[key][id] || []).concat(items);
+        });
+    });
+
+    if (delta.logs) {
+        logLines = logLines.concat(delta.logs).slice(-MAX_LOG_LINES);
+    }
+}
+
+function startStream() {
+    const source = new EventSource(`${API_BASE}/stream`);
+
+    source.addEventListener('snapshot', (event) => {
+        streamState = JSON.parse(event.data);
+        logLines = streamState.logs.slice(-MAX_LOG_LINES);
+        renderStreamState();
+    });
+
+    source.addEventListener('delta', (event) => {
+        if (!streamState) return;
+        applyStreamDelta(JSON.parse(event.data));
+        renderStreamState();
+    });
+
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            startPolling();
+        }
+    };
+}
+
+function startPolling() {
+    updateDashboard();
+    updateLogs();
+    updateIntervals = {
+        dashboard: setInterval(updateDashboard, 1000),
+        logs: setInterval(updateLogs, 2000),
+    };
+}
+
 initTrendChart();
-updateDashboard();
-updateLogs();
-updateIntervals = {
-    dashboard: setInterval(updateDashboard, 1000),
-    logs: setInterval(updateLogs, 2000),
-};
+if (window.EventSource) {
+    startStream();
+} else {
+    startPolling();
+}
@@ -0,0 +1,158 @@
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+from latency import LATENCY_METRICS, PERCENTILES
+
+SEGMENT_MAGIC = b"PCST"
+SEGMENT_FIELDS = (
+    ("start_time", "d"),
+    ("updated_at", "d"),
+    ("produced", "q"),
+    ("consumed", "q"),
+    ("queue_size", "q"),
+    ("defective", "q"),
+    ("accepted", "q"),
+    ("rejected", "q"),
+    ("in_flight", "q"),
+    ("dead_lettered", "q"),
+    ("average_throughput", "d"),
+    ("current_throughput", "d"),
+    ("consume_rate", "d"),
+    ("lag_trend", "d"),
+    ("active_consumers", "q"),
+    ("scale_ups", "q"),
+    ("scale_downs", "q"),
+    ("priority_levels", "q"),
+    ("shard_count", "q"),
+    ("wal_pending", "q"),
+    ("wal_segments", "q"),
+    ("wal_replayed", "q"),
+    ("wal_syncs", "q"),
+    ("wal_commit_ms", "d"),
+    ("wal_sync_batch", "d"),
+    ("replay_drift_ms", "d"),
+    ("producer_blocked_ratio", "d"),
+    ("spilled", "q"),
+    ("shed", "q"),
+    ("produced_dropped", "q"),
+    ("consumed_dropped", "q"),
+    ("log_dropped", "q"),
+) + tuple(
+    (f"latency_{metric}_p{percent}_ms", "d")
+    for metric in LATENCY_METRICS
+    for percent in PERCENTILES
+)
+
+
+def segment_fields(priority_levels: int, shards: int) -> tuple:
+    return SEGMENT_FIELDS + tuple(
+        field
+        for level in range(priority_levels)
+        for field in ((f"priority_{level}_depth", "q"), (f"priority_{level}_wait_ms", "d"))
+    ) + tuple(
+        field
+        for shard in range(1, shards + 1)
+        for field in (
+            (f"shard_{shard}_depth", "q"),
+            (f"shard_{shard}_routed", "q"),
+            (f"shard_{shard}_stolen", "q"),
+            (f"shard_{shard}_service_ms", "d"),
+        )
+    )
+
+
+def _layout(priority_levels: int, shards: int) -> tuple[struct.Struct, tuple]:
+    fields = segment_fields(priority_levels, shards)
+    return struct.Struct("<" + "".join(fmt for _, fmt in fields)), tuple(name for name, _ in fields)
+
+
+_HEADER = struct.Struct("<4sIQII")
+_SEQUENCE = struct.Struct("<Q")
+_SEQUENCE_OFFSET = 8
+READ_ATTEMPTS = 100
+
+
+class StatsSegment:
+
+    def __init__(self, path: str, priority_levels: int = 0, shards: int = 0):
+        self.path = path
+        self.priority_levels = priority_levels
+        self.shards = shards
+        self._payload, self._field_names = _layout(priority_levels, shards)
+        size = _HEADER.size + self._payload.size
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(_HEADER.pack(SEGMENT_MAGIC, self._payload.size, 0, priority_levels, shards))
+            f.write(bytes(self._payload.size))
+        with open(temp_path, 'r+b') as f:
+            self._buffer = mmap.mmap(f.fileno(), size)
+        os.replace(temp_path, path)
+        self._sequence = 0
+
+    def publish(self, values: Dict[str, Any]) -> None:
+        self._sequence += 1
+        _SEQUENCE.pack_into(self._buffer, _SEQUENCE_OFFSET, self._sequence)
+        self._payload.pack_into(self._buffer, _HEADER.size, *(values.get(name, 0) for name in self._field_names))
+        self._sequence += 1
+        _SEQUENCE.pack_into(self._buffer, _SEQUENCE_OFFSET, self._sequence)
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+class StatsSegmentReader:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._inode: Optional[int] = None
+        self._buffer: Optional[mmap.mmap] = None
+        self._payload: Optional[struct.Struct] = None
+        self._field_names: tuple = ()
+
+    def _open(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if stat.st_ino == self._inode:
+            return True
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+            self._inode = None
+        if stat.st_size < _HEADER.size:
+            return False
+
+        with open(self.path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, payload_size, _, priority_levels, shards = _HEADER.unpack_from(buffer, 0)
+        payload, field_names = _layout(priority_levels, shards)
+        if magic != SEGMENT_MAGIC or payload_size != payload.size or len(buffer) < _HEADER.size + payload.size:
+            buffer.close()
+            return False
+        self._payload, self._field_names = payload, field_names
+        self._buffer = buffer
+        self._inode = stat.st_ino
+        return True
+
+    def version(self) -> Optional[tuple[int, int]]:
+        if not self._open():
+            return None
+        sequence, = _SEQUENCE.unpack_from(self._buffer, _SEQUENCE_OFFSET)
+        return self._inode, sequence
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        if not self._open():
+            return None
+        for _ in range(READ_ATTEMPTS):
+            before, = _SEQUENCE.unpack_from(self._buffer, _SEQUENCE_OFFSET)
+            if before == 0:
+                return None
+            if before % 2:
+                continue
+            values = self._payload.unpack_from(self._buffer, _HEADER.size)
+            after, = _SEQUENCE.unpack_from(self._buffer, _SEQUENCE_OFFSET)
+            if before == after:
+                return dict(zip(self._field_names, values))
+        return None
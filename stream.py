@@ -0,0 +1,134 @@
+import json
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+STREAM_LOG_LINES = 100
+
+
+class StatsBroadcaster:
+
+    def __init__(self,
+                 state_provider: Callable[[], Dict[str, Any]],
+                 log_provider: Callable[[Optional[int]], tuple],
+                 interval: float = 1.0,
+                 client_buffer: int = 100):
+        self.state_provider = state_provider
+        self.log_provider = log_provider
+        self.interval = interval
+        self.client_buffer = client_buffer
+        self._subscribers: list[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._state: Optional[Dict[str, Any]] = None
+        self._snapshot_message: Optional[str] = None
+        self._log_offset: Optional[int] = None
+
+    @staticmethod
+    def _event(name: str, payload: Dict[str, Any]) -> str:
+        return f"event: {name}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def subscribe(self) -> queue.Queue:
+        subscription = queue.Queue(maxsize=self.client_buffer)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            if self._state is None:
+                self._refresh()
+            if self._snapshot_message is None:
+                self._snapshot_message = self._event("snapshot", self._public_state())
+            subscription.put(self._snapshot_message)
+            self._subscribers.append(subscription)
+        self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription: queue.Queue) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def _read_state(self) -> Dict[str, Any]:
+        state = self.state_provider()
+        log_lines, self._log_offset, reset = self.log_provider(self._log_offset)
+        state["logs"] = log_lines
+        state["logs_reset"] = reset
+        return state
+
+    def _diff(self, old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        delta: Dict[str, Any] = {}
+
+        statistics = {key: value for key, value in new["statistics"].items()
+                      if old["statistics"].get(key) != value}
+        if statistics:
+            delta["statistics"] = statistics
+        if new["metadata"] != old["metadata"]:
+            delta["metadata"] = new["metadata"]
+
+        for key in ("producers", "consumers"):
+            appended = {}
+            for worker_id, items in new[key].items():
+                known = len(old[key].get(worker_id, []))
+                if len(items) < known:
+                    return None
+                if len(items) > known:
+                    appended[worker_id] = items[known:]
+            if len(new[key]) < len(old[key]):
+                return None
+            if appended:
+                delta[key] = appended
+
+        if new["logs_reset"]:
+            return None
+        if new["logs"]:
+            delta["logs"] = new["logs"]
+        return delta
+
+    def _refresh(self) -> Optional[str]:
+        new_state = self._read_state()
+        old_state = self._state
+        delta = self._diff(old_state, new_state) if old_state is not None else None
+
+        if old_state is not None and delta is not None:
+            new_state["logs"] = (old_state["logs"] + new_state["logs"])[-STREAM_LOG_LINES:]
+        else:
+            new_state["logs"] = new_state["logs"][-STREAM_LOG_LINES:]
+        self._state = new_state
+
+        if delta is None or old_state is None:
+            self._snapshot_message = self._event("snapshot", self._public_state())
+            return self._snapshot_message
+        if delta:
+            self._snapshot_message = None
+            return self._event("delta", delta)
+        return None
+
+    def _public_state(self) -> Dict[str, Any]:
+        return {key: value for key, value in self._state.items() if key != "logs_reset"}
+
+    def _publish(self, message: str) -> None:
+        for subscription in list(self._subscribers):
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                self._subscribers.remove(subscription)
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait(None)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._subscribers:
+                    self._wakeup.clear()
+                    continue
+                try:
+                    message = self._refresh()
+                except Exception:
+                    continue
+                if message:
+                    self._publish(message)
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import queue
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from broker import BrokerServer, RemoteConsumerQueue, RemoteProducerQueue, WorkerLink
+from counters import ShardedCounters
+from latency import make_item_id
+from logger import init_logger
+
+_fork = multiprocessing.get_context("fork")
+
+init_logger(to_file=False, to_console=False)
+
+
+def _entry(sequence: int) -> tuple:
+    return (0, sequence, False, 0.0, make_item_id(1, sequence))
+
+
+def _server(transport: queue.Queue) -> BrokerServer:
+    server = BrokerServer(
+        "127.0.0.1",
+        0,
+        producer_queue=lambda producer_id: transport,
+        consumer_queue=lambda consumer_id: transport,
+        requeue=transport.put,
+        producer_counters=ShardedCounters(2),
+        consumer_counters=ShardedCounters(2),
+        produced_items={1: [], 2: []},
+        consumed_items={1: [], 2: []}
+    )
+    server.start()
+    return server
+
+
+def _drain(transport: queue.Queue, count: int) -> list:
+    return [transport.get(timeout=5) for _ in range(count)]
+
+
+def _produce(port: int) -> None:
+    remote = RemoteProducerQueue(WorkerLink("127.0.0.1", port, "producer", 1), window=8, wire_batch=4)
+    remote.put([_entry(1), _entry(2), _entry(3)])
+    remote.put(_entry(4))
+    remote.put([_entry(sequence) for sequence in range(5, 21)])
+    remote.close()
+
+
+def _consume(port: int, window: int, results, crash_after: int = 0) -> None:
+    remote = RemoteConsumerQueue(WorkerLink("127.0.0.1", port, "consumer", 1), window=window)
+    taken = 0
+    while True:
+        message = remote.get(timeout=5)
+        if message is None:
+            break
+        results.put([entry[1] for entry in message] if isinstance(message, list) else message[1])
+        taken += 1
+        if taken == crash_after:
+            results.close()
+            results.join_thread()
+            os._exit(0)
+    remote.close()
+
+
+def test_remote_producer_forwards_batches_intact():
+    transport = queue.Queue()
+    server = _server(transport)
+    try:
+        producer = _fork.Process(target=_produce, args=(server.port,))
+        producer.start()
+        producer.join(10)
+        messages = _drain(transport, 3)
+        assert [entry[1] for entry in messages[0]] == [1, 2, 3]
+        assert messages[1][1] == 4
+        assert [entry[1] for entry in messages[2]] == list(range(5, 21))
+        assert server.finished_producers() == {1}
+    finally:
+        server.close()
+
+
+def test_delivery_splits_batches_to_the_credit_window():
+    transport = queue.Queue()
+    transport.put([_entry(sequence) for sequence in range(10)])
+    server = _server(transport)
+    results = _fork.Queue()
+    try:
+        consumer = _fork.Process(target=_consume, args=(server.port, 4, results))
+        consumer.start()
+        received = []
+        while sum(len(message) for message in received) < 10:
+            received.append(results.get(timeout=5))
+        server.stop_consumers()
+        consumer.join(10)
+        assert all(len(message) <= 4 for message in received)
+        assert [item for message in received for item in message] == list(range(10))
+        assert transport.empty()
+    finally:
+        server.close()
+
+
+def test_unacknowledged_deliveries_are_requeued_when_the_consumer_drops():
+    transport = queue.Queue()
+    for sequence in range(5):
+        transport.put(_entry(sequence))
+    server = _server(transport)
+    results = _fork.Queue()
+    try:
+        consumer = _fork.Process(target=_consume, args=(server.port, 8, results, 1))
+        consumer.start()
+        consumer.join(10)
+        assert results.get(timeout=5) == 0
+        assert sorted(entry[1] for entry in _drain(transport, 5)) == list(range(5))
+    finally:
+        server.close()
@@ -0,0 +1,107 @@
+import os
+import queue
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latency import make_item_id
+from wal import DurableQueue, read_segment
+
+
+def _entry(sequence: int) -> tuple:
+    return (0, sequence, False, 0.0, make_item_id(1, sequence))
+
+
+def _open(directory, inner=None, **kwargs) -> DurableQueue:
+    return DurableQueue(inner or queue.Queue(), queue.Queue(), queue.Queue(), str(directory), **kwargs)
+
+
+def _logged_items(wal: DurableQueue) -> list[int]:
+    return [entry[1] for _, entry in read_segment(wal._path(wal._segment_number))]
+
+
+def _crash(wal: DurableQueue) -> None:
+    os.close(wal._segment_fd)
+
+
+def test_replay_keeps_acks_from_released_segments(tmp_path):
+    wal = _open(tmp_path, segment_bytes=1, max_segments=10)
+    a, b, c = _entry(1), _entry(2), _entry(3)
+    wal._commit([a, b], [])
+    wal._commit([c], [b[4]])
+    wal._commit([], [c[4]])
+    _crash(wal)
+
+    replayed = _open(tmp_path)
+    assert [entry[1] for entry in replayed._backlog] == [a[1]]
+    _crash(replayed)
+
+
+def test_replay_after_compaction(tmp_path):
+    wal = _open(tmp_path, segment_bytes=1, max_segments=2)
+    entries = [_entry(sequence) for sequence in range(1, 7)]
+    for entry in entries:
+        wal._commit([entry], [])
+    wal._commit([], [entry[4] for entry in entries[1:5]])
+    _crash(wal)
+
+    replayed = _open(tmp_path)
+    assert sorted(entry[1] for entry in replayed._backlog) == [1, 6]
+    _crash(replayed)
+
+
+def test_batch_put_returns_after_group_commit(tmp_path):
+    wal = _open(tmp_path, sync_mode="batch")
+    wal.start()
+    try:
+        done = threading.Event()
+        threading.Thread(target=lambda: (wal.put(_entry(1)), done.set()), daemon=True).start()
+        assert done.wait(5)
+        assert wal.synced_records >= 1
+        assert wal.get(timeout=5)[1] == 1
+    finally:
+        wal.shutdown()
+
+
+def test_batch_put_waits_for_its_own_commit_with_out_of_order_ids(tmp_path):
+    wal = _open(tmp_path, sync_mode="batch")
+    wal.start()
+    try:
+        wal.put([_entry(2), _entry(3)])
+        assert _logged_items(wal) == [2, 3]
+        wal.put([_entry(1)])
+        assert _logged_items(wal) == [2, 3, 1]
+        wal.put(_entry(4))
+        assert wal.synced_records == 4
+    finally:
+        wal.shutdown()
+
+
+def test_batch_put_timeout_raises_full_and_drops_the_entry(tmp_path):
+    wal = _open(tmp_path, sync_mode="batch")
+    with pytest.raises(queue.Full):
+        wal.put(_entry(1), timeout=0.1)
+    wal.start()
+    try:
+        wal.put(_entry(2), timeout=5)
+        assert wal.get(timeout=5)[1] == 2
+        with pytest.raises(queue.Empty):
+            wal.get(timeout=0.2)
+        assert _logged_items(wal) == [2]
+    finally:
+        wal.shutdown()
+
+
+def test_writer_failure_releases_waiting_producers(tmp_path):
+    wal = _open(tmp_path, sync_mode="batch")
+    _crash(wal)
+    wal.start()
+    with pytest.raises(RuntimeError):
+        wal.put(_entry(1), timeout=5)
+    with pytest.raises(RuntimeError):
+        wal.put(_entry(2))
+    assert wal.wal_stats()["failed"]
+    assert wal.error.startswith("OSError")
@@ -0,0 +1,214 @@
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+
+SAMPLE_FIELDS = ("timestamp", "produced", "consumed", "queue_size", "queue_max")
+
+_RECORD = struct.Struct(f"<{len(SAMPLE_FIELDS)}d")
+_HEADER = struct.Struct("<qqqq")
+
+
+class RingSeries:
+
+    def __init__(self, buffer, offset: int, resolution: int = 0, capacity: int = 0, initialize: bool = False):
+        self._buffer = buffer
+        self._offset = offset
+        self._data_offset = offset + _HEADER.size
+        if initialize:
+            _HEADER.pack_into(buffer, offset, resolution, capacity, 0, 0)
+        self.resolution, self.capacity, _, _ = _HEADER.unpack_from(buffer, offset)
+
+    @staticmethod
+    def size_for(capacity: int) -> int:
+        return _HEADER.size + capacity * _RECORD.size
+
+    @property
+    def size(self) -> int:
+        return self.size_for(self.capacity)
+
+    def _cursor(self) -> tuple[int, int]:
+        _, _, head, count = _HEADER.unpack_from(self._buffer, self._offset)
+        return head, count
+
+    def append(self, sample: tuple) -> None:
+        head, count = self._cursor()
+        _RECORD.pack_into(self._buffer, self._data_offset + head * _RECORD.size, *sample)
+        _HEADER.pack_into(self._buffer, self._offset, self.resolution, self.capacity,
+                          (head + 1) % self.capacity, min(count + 1, self.capacity))
+
+    def __len__(self) -> int:
+        return self._cursor()[1]
+
+    def _read(self, head: int, count: int, index: int) -> tuple:
+        position = (head - count + index) % self.capacity
+        return _RECORD.unpack_from(self._buffer, self._data_offset + position * _RECORD.size)
+
+    def _lower_bound(self, head: int, count: int, timestamp: float) -> int:
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self._read(head, count, middle)[0] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def oldest(self) -> Optional[tuple]:
+        head, count = self._cursor()
+        return self._read(head, count, 0) if count else None
+
+    def latest(self) -> Optional[tuple]:
+        head, count = self._cursor()
+        return self._read(head, count, count - 1) if count else None
+
+    def at_or_before(self, timestamp: float) -> Optional[tuple]:
+        head, count = self._cursor()
+        index = self._lower_bound(head, count, timestamp)
+        if index < count and self._read(head, count, index)[0] == timestamp:
+            return self._read(head, count, index)
+        return self._read(head, count, index - 1) if index > 0 else None
+
+    def between(self, start: Optional[float] = None, end: Optional[float] = None) -> list[tuple]:
+        head, count = self._cursor()
+        index = self._lower_bound(head, count, start) if start is not None else 0
+        samples = []
+        while index < count:
+            sample = self._read(head, count, index)
+            if end is not None and sample[0] > end:
+                break
+            samples.append(sample)
+            index += 1
+        return samples
+
+
+class TimeSeries:
+
+    def __init__(self, capacities: Dict[int, int], path: Optional[str] = None):
+        self.path = path
+        size = sum(RingSeries.size_for(capacity) for capacity in capacities.values())
+        if path:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.truncate(size)
+            with open(temp_path, 'r+b') as f:
+                self._buffer = mmap.mmap(f.fileno(), size)
+            os.replace(temp_path, path)
+        else:
+            self._buffer = bytearray(size)
+
+        self.series: Dict[int, RingSeries] = {}
+        offset = 0
+        for resolution, capacity in sorted(capacities.items()):
+            series = RingSeries(self._buffer, offset, resolution, capacity, initialize=True)
+            self.series[resolution] = series
+            offset += series.size
+
+        self._raw_resolution = min(self.series)
+        self._buckets: Dict[int, Optional[list]] = {resolution: None for resolution in self.series}
+
+    def _roll_up(self, resolution: int, sample: tuple) -> None:
+        bucket_start = sample[0] - sample[0] % resolution
+        bucket = self._buckets[resolution]
+        if bucket is not None and bucket[0] != bucket_start:
+            start, last, queue_sum, samples_count, queue_max = bucket
+            self.series[resolution].append((start, last[1], last[2], queue_sum / samples_count, queue_max))
+            bucket = None
+        if bucket is None:
+            self._buckets[resolution] = [bucket_start, sample, sample[3], 1, sample[4]]
+        else:
+            bucket[1] = sample
+            bucket[2] += sample[3]
+            bucket[3] += 1
+            bucket[4] = max(bucket[4], sample[4])
+
+    def record(self, timestamp: float, produced: int, consumed: int, queue_size: int) -> None:
+        sample = (timestamp, produced, consumed, queue_size, queue_size)
+        for resolution, series in self.series.items():
+            if resolution == self._raw_resolution:
+                series.append(sample)
+            else:
+                self._roll_up(resolution, sample)
+
+    def rates(self, window: float) -> Dict[str, float]:
+        raw = self.series[self._raw_resolution]
+        latest = raw.latest()
+        if latest is None:
+            return {"throughput_per_sec": 0.0, "consume_rate_per_sec": 0.0, "lag_trend_per_sec": 0.0}
+        earlier = raw.at_or_before(latest[0] - window) or raw.oldest()
+        elapsed = latest[0] - earlier[0]
+        if elapsed <= 0:
+            return {"throughput_per_sec": 0.0, "consume_rate_per_sec": 0.0, "lag_trend_per_sec": 0.0}
+        produced = latest[1] - earlier[1]
+        consumed = latest[2] - earlier[2]
+        return {
+            "throughput_per_sec": round(produced / elapsed, 2),
+            "consume_rate_per_sec": round(consumed / elapsed, 2),
+            "lag_trend_per_sec": round((produced - consumed) / elapsed, 2)
+        }
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: Optional[int] = None) -> Dict[str, Any]:
+        return query_series(self.series, start, end, resolution)
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def query_series(series: Dict[int, RingSeries], start: Optional[float] = None, end: Optional[float] = None,
+                 resolution: Optional[int] = None) -> Dict[str, Any]:
+    if resolution not in series:
+        resolution = max(series)
+        for candidate in sorted(series):
+            oldest = series[candidate].oldest()
+            if oldest is not None and (start is None or oldest[0] <= start):
+                resolution = candidate
+                break
+
+    samples = series[resolution].between(start, end)
+    return {
+        "resolution_seconds": resolution,
+        "samples": [dict(zip(SAMPLE_FIELDS, sample)) for sample in samples]
+    }
+
+
+class TimeSeriesReader:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._inode: Optional[int] = None
+        self._buffer: Optional[mmap.mmap] = None
+        self.series: Dict[int, RingSeries] = {}
+
+    def _open(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if stat.st_ino == self._inode:
+            return True
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        if stat.st_size == 0:
+            return False
+
+        with open(self.path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._inode = stat.st_ino
+        self.series = {}
+        offset = 0
+        while offset < len(self._buffer):
+            series = RingSeries(self._buffer, offset)
+            if series.capacity <= 0:
+                break
+            self.series[series.resolution] = series
+            offset += series.size
+        return bool(self.series)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        if not self._open():
+            return None
+        return query_series(self.series, start, end, resolution)
@@ -0,0 +1,383 @@
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from ctypes import c_bool, c_byte, c_int64
+from multiprocessing import Condition
+from multiprocessing.sharedctypes import RawArray, RawValue
+from typing import Any, Dict, Optional
+
+from latency import ITEM_ID_BITS, item_producer
+
+RECORD_PUT = 1
+RECORD_ACK = 2
+SYNC_MODES = ("batch", "interval", "off")
+REPLAY_FLAG = 1 << (ITEM_ID_BITS - 1)
+WRITER_POLL_INTERVAL = 0.05
+TICKET_SLOTS = 4096
+TICKET_PENDING = 0
+TICKET_CLAIMED = 1
+TICKET_DURABLE = 2
+TICKET_CANCELLED = 3
+
+_RECORD = struct.Struct("<IBBq?dq")
+_BODY_OFFSET = 4
+
+
+def _segment_name(number: int) -> str:
+    return f"segment-{number:08d}.log"
+
+
+def _encode(kind: int, entry: Optional[tuple] = None, item_id: int = 0) -> bytes:
+    if entry is not None:
+        priority, item, is_defective, enqueued_at, item_id = entry
+        body = _RECORD.pack(0, kind, priority, item, is_defective, enqueued_at, item_id)
+    else:
+        body = _RECORD.pack(0, kind, 0, 0, False, 0.0, item_id)
+    return struct.pack("<I", zlib.crc32(body[_BODY_OFFSET:])) + body[_BODY_OFFSET:]
+
+
+def read_segment(path: str) -> list[tuple[int, tuple]]:
+    with open(path, 'rb') as f:
+        data = f.read()
+    records = []
+    for offset in range(0, len(data) - _RECORD.size + 1, _RECORD.size):
+        crc, kind, priority, item, is_defective, enqueued_at, item_id = _RECORD.unpack_from(data, offset)
+        if crc != zlib.crc32(data[offset + _BODY_OFFSET:offset + _RECORD.size]):
+            break
+        records.append((kind, (priority, item, is_defective, enqueued_at, item_id)))
+    return records
+
+
+class DurableQueue:
+
+    def __init__(self,
+                 inner: Any,
+                 journal: Any,
+                 acks: Any,
+                 directory: str,
+                 sync_mode: str = "batch",
+                 group_max: int = 256,
+                 group_wait: float = 0.002,
+                 sync_interval: float = 0.05,
+                 segment_bytes: int = 4 * 1024 * 1024,
+                 max_segments: int = 4):
+        if sync_mode not in SYNC_MODES:
+            raise ValueError(f"Nieznany tryb synchronizacji: {sync_mode} (dostępne: {', '.join(SYNC_MODES)})")
+        self.inner = inner
+        self.directory = directory
+        self.sync_mode = sync_mode
+        self.group_max = group_max
+        self.group_wait = group_wait
+        self.sync_interval = sync_interval
+        self.segment_bytes = segment_bytes
+        self.max_segments = max(max_segments, 1)
+        self._journal = journal
+        self._acks = acks
+        self._committed = Condition()
+        self._next_ticket = RawValue(c_int64, 0)
+        self._ticket_ids = RawArray(c_int64, TICKET_SLOTS)
+        self._ticket_states = RawArray(c_byte, TICKET_SLOTS)
+        self._failed = RawValue(c_bool, False)
+        self._owner_pid = os.getpid()
+        self._pending: Dict[int, int] = {}
+        self._live: Dict[int, int] = {}
+        self._segment_number = 0
+        self._segment_fd: Optional[int] = None
+        self._segment_size = 0
+        self._last_sync = 0.0
+        self._unsynced = 0
+        self._stopping = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._backlog: list[tuple] = []
+        self.replayed = 0
+        self.commits = 0
+        self.syncs = 0
+        self.committed_records = 0
+        self.synced_records = 0
+        self.commit_seconds = 0.0
+        self.last_commit_ms = 0.0
+        self.last_sync_batch = 0
+        self.compactions = 0
+        self.error: Optional[str] = None
+        os.makedirs(directory, exist_ok=True)
+        self._replay()
+
+    def _segments(self) -> list[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name.endswith(".log"):
+                numbers.append(int(name[len("segment-"):-len(".log")]))
+        return sorted(numbers)
+
+    def _path(self, number: int) -> str:
+        return os.path.join(self.directory, _segment_name(number))
+
+    def _replay(self) -> None:
+        old_segments = self._segments()
+        live: Dict[int, tuple] = {}
+        for number in old_segments:
+            for kind, entry in read_segment(self._path(number)):
+                if kind == RECORD_PUT:
+                    live[entry[4]] = entry
+                elif kind == RECORD_ACK:
+                    live.pop(entry[4], None)
+
+        self._open_segment((old_segments[-1] if old_segments else 0) + 1)
+        now = time.monotonic()
+        for sequence, (priority, item, is_defective, _, item_id) in enumerate(live.values()):
+            replay_id = (item_producer(item_id) << ITEM_ID_BITS) | REPLAY_FLAG | sequence
+            self._backlog.append((priority, item, is_defective, now, replay_id))
+        if self._backlog:
+            self._append(b"".join(_encode(RECORD_PUT, entry) for entry in self._backlog))
+            os.fsync(self._segment_fd)
+            for entry in self._backlog:
+                self._track(entry[4])
+        for number in old_segments:
+            os.remove(self._path(number))
+        self.replayed = len(self._backlog)
+
+    def _open_segment(self, number: int) -> None:
+        if self._segment_fd is not None:
+            os.fsync(self._segment_fd)
+            os.close(self._segment_fd)
+        self._segment_number = number
+        self._segment_fd = os.open(self._path(number), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._segment_size = os.fstat(self._segment_fd).st_size
+        self._live.setdefault(number, 0)
+
+    def _append(self, data: bytes) -> None:
+        os.write(self._segment_fd, data)
+        self._segment_size += len(data)
+
+    def _track(self, item_id: int) -> None:
+        self._pending[item_id] = self._segment_number
+        self._live[self._segment_number] += 1
+
+    def _release(self, item_id: int) -> None:
+        number = self._pending.pop(item_id, None)
+        if number is None:
+            return
+        self._live[number] -= 1
+
+    def _drop_released(self) -> None:
+        while len(self._live) > 1:
+            oldest = min(self._live)
+            if self._live[oldest]:
+                return
+            del self._live[oldest]
+            os.remove(self._path(oldest))
+
+    def _compact(self) -> None:
+        oldest = min(self._live)
+        moved = [entry for kind, entry in read_segment(self._path(oldest))
+                 if kind == RECORD_PUT and self._pending.get(entry[4]) == oldest]
+        if moved:
+            self._append(b"".join(_encode(RECORD_PUT, entry) for entry in moved))
+            os.fsync(self._segment_fd)
+            for entry in moved:
+                self._pending[entry[4]] = self._segment_number
+            self._live[self._segment_number] += len(moved)
+        del self._live[oldest]
+        os.remove(self._path(oldest))
+        self.compactions += 1
+        self._drop_released()
+
+    def _ticket_state(self, ticket: int) -> int:
+        slot = ticket % TICKET_SLOTS
+        return self._ticket_states[slot] if self._ticket_ids[slot] == ticket else TICKET_PENDING
+
+    def _set_ticket(self, ticket: int, state: int) -> None:
+        slot = ticket % TICKET_SLOTS
+        self._ticket_ids[slot] = ticket
+        self._ticket_states[slot] = state
+
+    def _issue_ticket(self) -> int:
+        with self._committed:
+            self._next_ticket.value += 1
+            return self._next_ticket.value
+
+    def _claim(self, messages: list) -> tuple[list, list]:
+        if not any(ticket for ticket, _ in messages):
+            return [entry for _, entry in messages], []
+        entries, tickets = [], []
+        with self._committed:
+            for ticket, entry in messages:
+                if ticket:
+                    if self._ticket_state(ticket) == TICKET_CANCELLED:
+                        continue
+                    self._set_ticket(ticket, TICKET_CLAIMED)
+                    tickets.append(ticket)
+                entries.append(entry)
+        return entries, tickets
+
+    def _publish_durable(self, tickets: list) -> None:
+        with self._committed:
+            for ticket in tickets:
+                self._set_ticket(ticket, TICKET_DURABLE)
+            self._committed.notify_all()
+
+    def _wait_durable(self, ticket: int, timeout: Optional[float]) -> None:
+        def settled() -> bool:
+            return self._failed.value or self._ticket_state(ticket) == TICKET_DURABLE
+
+        with self._committed:
+            done = self._committed.wait_for(settled, timeout)
+            if not done and self._ticket_state(ticket) == TICKET_CLAIMED:
+                done = self._committed.wait_for(settled)
+            if self._ticket_state(ticket) == TICKET_DURABLE:
+                return
+            if self._failed.value:
+                raise RuntimeError("Wątek zapisu WAL zakończył się błędem - element nie został utrwalony")
+            self._set_ticket(ticket, TICKET_CANCELLED)
+        raise queue.Full
+
+    def _fail(self, error: Exception) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+        with self._committed:
+            self._failed.value = True
+            self._committed.notify_all()
+
+    def _sync(self) -> None:
+        os.fsync(self._segment_fd)
+        self._last_sync = time.monotonic()
+        self.syncs += 1
+        self.synced_records += self._unsynced
+        self.last_sync_batch = self._unsynced
+        self._unsynced = 0
+
+    def _collect(self) -> tuple[list, list]:
+        entries = []
+        try:
+            entries.append(self._journal.get(timeout=WRITER_POLL_INTERVAL))
+        except queue.Empty:
+            pass
+        deadline = time.monotonic() + self.group_wait
+        while entries and len(entries) < self.group_max:
+            remaining = deadline - time.monotonic()
+            try:
+                entries.append(self._journal.get(timeout=remaining) if remaining > 0 else self._journal.get_nowait())
+            except queue.Empty:
+                break
+        acked = []
+        while True:
+            try:
+                acked.extend(self._acks.get_nowait())
+            except queue.Empty:
+                break
+        return entries, acked
+
+    def _commit(self, entries: list, acked: list, tickets: tuple = ()) -> None:
+        started = time.monotonic()
+        items = []
+        for entry in entries:
+            if isinstance(entry, list):
+                items.extend(entry)
+            elif entry is not None:
+                items.append(entry)
+        records = [_encode(RECORD_PUT, entry) for entry in items]
+        records.extend(_encode(RECORD_ACK, item_id=item_id) for item_id in acked)
+        if records:
+            self._append(b"".join(records))
+            self._unsynced += len(records)
+            if self.sync_mode == "batch" and items:
+                self._sync()
+            elif self.sync_mode == "interval" and started - self._last_sync >= self.sync_interval:
+                self._sync()
+            for entry in items:
+                self._track(entry[4])
+            if items:
+                self.commits += 1
+                self.committed_records += len(items)
+                self.last_commit_ms = (time.monotonic() - started) * 1000
+                self.commit_seconds += self.last_commit_ms / 1000
+
+        if tickets:
+            self._publish_durable(tickets)
+        for entry in entries:
+            self.inner.put(entry)
+        for item_id in acked:
+            self._release(item_id)
+
+        if self._segment_size >= self.segment_bytes:
+            self._open_segment(self._segment_number + 1)
+        self._drop_released()
+        while len(self._live) > self.max_segments:
+            self._compact()
+
+    def _write_loop(self) -> None:
+        try:
+            for entry in self._backlog:
+                self.inner.put(entry)
+            self._backlog = []
+            while True:
+                messages, acked = self._collect()
+                if messages or acked:
+                    entries, tickets = self._claim(messages)
+                    self._commit(entries, acked, tickets)
+                elif self._stopping.is_set():
+                    break
+            if self.sync_mode != "off":
+                self._sync()
+        except Exception as e:
+            self._fail(e)
+
+    def start(self) -> None:
+        self._writer = threading.Thread(target=self._write_loop, name="wal", daemon=True)
+        self._writer.start()
+
+    def put(self, entry: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        if self._failed.value:
+            raise RuntimeError("Wątek zapisu WAL zakończył się błędem - trwała kolejka nie przyjmuje elementów")
+        deadline = time.monotonic() + timeout if block and timeout is not None else None
+        ticket = self._issue_ticket() if self.sync_mode == "batch" and entry else 0
+        self._journal.put((ticket, entry), block, timeout)
+        if ticket:
+            self._wait_durable(ticket, None if deadline is None else max(deadline - time.monotonic(), 0.0))
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        return self.inner.get(block, timeout)
+
+    def get_nowait(self) -> Any:
+        return self.inner.get(False)
+
+    def ack(self, item_ids: list[int]) -> None:
+        self._acks.put(item_ids)
+
+    def qsize(self) -> int:
+        return self.inner.qsize() + self._journal.qsize()
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "lane_stats":
+            return getattr(self.inner, name)
+        raise AttributeError(name)
+
+    def wal_stats(self) -> Dict[str, Any]:
+        return {
+            "sync_mode": self.sync_mode,
+            "failed": self._failed.value,
+            "pending": len(self._pending),
+            "segments": len(self._live),
+            "replayed": self.replayed,
+            "commits": self.commits,
+            "syncs": self.syncs,
+            "compactions": self.compactions,
+            "avg_commit_ms": round(self.commit_seconds / self.commits * 1000, 3) if self.commits else 0.0,
+            "last_commit_ms": round(self.last_commit_ms, 3),
+            "avg_sync_batch": round(self.synced_records / self.syncs, 2) if self.syncs else 0.0,
+            "last_sync_batch": self.last_sync_batch
+        }
+
+    def shutdown(self) -> None:
+        if self._writer is None or os.getpid() != self._owner_pid:
+            return
+        self._stopping.set()
+        self._writer.join()
+        self._writer = None
+        os.close(self._segment_fd)
+        self._segment_fd = None